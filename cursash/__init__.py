@@ -0,0 +1,62 @@
+"""
+Расписания городских автобусов и распределение водителей.
+
+Ядро пакета (модели, генерация расписаний, жадный алгоритм, разбиение интервалов по типам, распределение
+по участкам, скользящий горизонт, экспорт) импортирует только стандартную библиотеку. Модули на NumPy (stops, simulation,
+genetic, benchmarks) загружаются при первом обращении к их именам через пакет; DEAP, xlsxwriter, matplotlib
+и pyarrow - при первом запуске ГА, экспорте в Excel, построении графиков и записи Parquet.
+"""
+import importlib
+
+from .instrumentation import INSTRUMENTATION, Instrumentation, instrumented, print_profile, profiling
+from .models import (
+    MOSCOW_STOPS, NIGHT_SHIFT_TEMPLATE, SHIFT_TEMPLATES, SPLIT_SHIFT_TEMPLATE, STOP_TABLE, Bus, Driver,
+    IntervalSet, Route, Schedule, ScheduleView, ShiftTemplate, Stop, driver_template, intern_stop,
+    minutes_to_time, register_shift_template, time_to_minutes, trips_mask,
+)
+from .timetable import (
+    chain_vehicle_blocks, fork_fleet, generate_city_schedules, generate_random_routes, generate_route_schedule,
+    manage_buses, plan_route_departures, size_fleet,
+)
+from .assignment import (
+    BusDelta, DutyBlock, apply_bus_delta, assign_drivers_blocks, assign_drivers_greedy, assign_drivers_optimal,
+    bus_trip_intervals, can_assign, repair_assignment, shifts_allow, split_relief_blocks,
+)
+from .horizon import DriverState, HorizonWindow, plan_rolling_horizon, rolling_horizon
+from .export import (
+    COLUMNAR_TABLES, EXCEL_MAX_ROWS, assigned_bus_ids, export_columnar, export_to_excel, export_to_excel_streaming,
+    load_columnar,
+)
+from .engines import BENCHMARK_ENGINES, ENGINE_LABELS, plot_benchmark_results
+from .cli import main, run
+
+__all__ = [name for name in dir() if not name.startswith("_") and name != "importlib"]
+
+# Имена модулей с NumPy: загружаются при первом обращении cursash.<имя>
+_LAZY_MODULES = {
+    "stops": ("StopTimetable",),
+    "simulation": ("DelayModel", "build_delay_model", "simulate_delays"),
+    "genetic": ("TripTable", "build_trip_table", "driver_violations", "eval_individual", "count_drivers",
+                "group_violations", "evaluate_population", "FitnessCache", "evaluate_with_cache",
+                "RepairOperators", "genetic_driver_assignment", "idle_time", "evaluate_objectives",
+                "nsga2_driver_assignment"),
+    "benchmarks": ("benchmark_suite", "check_benchmark_regression", "benchmark_fitness_evaluation",
+                   "benchmark_parallel_ga", "benchmark_greedy_scaling", "benchmark_schedule_memory",
+                   "benchmark_fleet_memory", "benchmark_timetable_generation", "benchmark_streaming_export",
+                   "benchmark_columnar_export", "benchmark_incremental_repair", "benchmark_ga_convergence",
+                   "benchmark_rolling_horizon", "benchmark_feasibility_checks", "benchmark_block_assignment",
+                   "benchmark_stop_timetable", "benchmark_cold_start",
+                   "benchmark_delay_simulation", "benchmark_fleet_sizing", "benchmark_nsga2_convergence"),
+}
+_LAZY = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
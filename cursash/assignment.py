@@ -0,0 +1,601 @@
+"""
+Распределение водителей: жадный алгоритм и разбиение интервалов по типам, участки между пунктами смены,
+инкрементальный ремонт назначения.
+"""
+import heapq
+import random
+from bisect import bisect_right, insort
+
+from .instrumentation import INSTRUMENTATION, instrumented
+from .models import (
+    Driver, intern_stop, IntervalSet, Schedule, ScheduleView, SHIFT_TEMPLATES, trips_mask, _bits,
+)
+
+
+def bus_trip_intervals(bus):
+    """Возвращает список интервалов поездок автобуса (начало, конец) в минутах."""
+    return bus.schedule.trip_bounds()
+
+def _busy_interval(trip_start, trip_end):
+    # Поездка через полночь хранится в занятом времени без перехода через ноль
+    return trip_start, trip_end if trip_end >= trip_start else trip_end + 1440
+
+def shifts_allow(shifts, trips):
+    """
+    Проверяет, что каждая поездка целиком лежит в одной из смен и не пересекается с её перерывами.
+    """
+    for trip_bus_start, trip_bus_end in trips:
+        can_work = False
+        for shift in shifts:
+            work_start, work_end = shift.work
+            # Проверка, находится ли поездка полностью в рабочем периоде
+            if trip_bus_start >= work_start and trip_bus_end <= work_end:
+                # Проверка на пересечения с перерывами
+                if not shift.rest_index.overlaps(trip_bus_start, trip_bus_end):
+                    can_work = True
+                    break
+        if not can_work:
+            return False
+    return True
+
+def can_assign(driver, bus, trips=None, mask=None, origin=0):
+    """
+    Проверяет, можно ли назначить автобус водителю без пересечений расписаний и учитывая перерывы.
+    trips: заранее вычисленные интервалы поездок автобуса (см. bus_trip_intervals).
+    mask: заранее вычисленная маска занятости автобуса (trips_mask); проверка по шаблону смены
+    и по занятости водителя - операции над масками.
+    Для шаблонов с обедом или ограничением непрерывного вождения поездки водителя вместе
+    с поездками автобуса проверяются по ShiftTemplate.violations, как в штрафах генетического алгоритма.
+    origin: начало суток, от которого отсчитываются trips и mask (для расписаний без свёртки);
+    на него сдвигаются поездки уже назначенных водителю автобусов.
+    Водители без зарегистрированного шаблона проверяются по своим сменам (shifts_allow).
+    """
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.count("can_assign")
+    # Временные интервалы автобуса
+    if trips is None:
+        trips = bus_trip_intervals(bus)
+    if mask is None:
+        mask = trips_mask(trips)
+    template = SHIFT_TEMPLATES.get(driver.driver_type)
+    if template is not None:
+        if mask & template.forbidden:
+            return False
+    elif not shifts_allow(driver.shifts, trips):
+        return False
+    # Проверка на пересечения с уже назначенными поездками
+    if mask & driver.busy_mask:
+        return False
+    if template is None or (template.break_window is None and template.max_continuous is None):
+        return True
+    driver_trips = [(trip_start - origin, trip_end - origin) for assigned in driver.assigned_buses
+                    for trip_start, trip_end in bus_trip_intervals(assigned)]
+    return not template.violations(sorted(driver_trips + list(trips), key=lambda trip: trip[0]))
+
+def _assign_bus(driver, bus, trips, mask=None):
+    driver.assigned_buses.append(bus)
+    bus.assigned_drivers.append(driver.driver_id)
+    for trip_start, trip_end in trips:
+        driver.busy.add(*_busy_interval(trip_start, trip_end))
+    driver.busy_mask |= trips_mask(trips) if mask is None else mask
+
+def _create_driver(driver_id, driver_type=None):
+    if driver_type is None:
+        driver_type = random.choice(sorted(SHIFT_TEMPLATES))
+    driver = Driver(driver_id=driver_id, driver_type=driver_type)
+    template = SHIFT_TEMPLATES.get(driver_type)
+    if template is not None:
+        driver.shifts.extend(template.make_shifts())
+    return driver
+
+def _new_driver_type(trips, mask):
+    """
+    Случайный тип нового водителя для автобуса: из шаблонов, допускающих автобус вместе с правилами
+    (ShiftTemplate.fits), иначе из шаблонов, окна которых допускают автобус; None - любой тип.
+    """
+    allowed = ([driver_type for driver_type, template in SHIFT_TEMPLATES.items() if template.fits(trips, mask)]
+               or [driver_type for driver_type, template in SHIFT_TEMPLATES.items() if template.allows(mask)])
+    return random.choice(sorted(allowed)) if allowed else None
+
+@instrumented("assign_drivers_greedy")
+def assign_drivers_greedy(buses, initial_driver_count=10):
+    """
+    Жадный алгоритм для распределения водителей на автобусы.
+    Начинает с заданного количества водителей и добавляет новых по мере необходимости.
+    Учитывает перерывы водителей в соответствии с их типом.
+    Водители одного типа хранятся в куче по времени освобождения, поэтому для каждого
+    автобуса проверяется только водитель, освободившийся раньше всех, а не весь список.
+    В отличие от прежнего перебора всех водителей (первый подходящий), водитель, свободный раньше
+    других, но не подходящий по перерывам, не пропускается в пользу следующего водителя того же типа:
+    автобус получает водителя другого типа или нового, поэтому распределение может отличаться.
+    Новый водитель получает случайный тип из тех, чьи шаблоны допускают автобус вместе с правилами
+    обеда и непрерывного вождения (ShiftTemplate.fits), иначе из тех, чьи окна допускают автобус,
+    иначе любой.
+    """
+    drivers = []
+    # Индекс свободных окон: тип водителя -> куча (время освобождения, ID водителя)
+    free_index = {}
+    driver_id = 1
+    # Инициализация водителей
+    for _ in range(initial_driver_count):
+        driver = _create_driver(driver_id)
+        drivers.append(driver)
+        heapq.heappush(free_index.setdefault(driver.driver_type, []), (driver.busy.last_end(), driver.driver_id, driver))
+        driver_id += 1
+
+    # Сортируем автобусы по времени начала первой поездки для лучшей загрузки
+    buses_sorted = sorted(buses, key=lambda bus: bus.schedule.first_time())
+
+    for bus in buses_sorted:
+        trips = bus_trip_intervals(bus)
+        mask = trips_mask(trips)
+        bus_start = min(trip_start for trip_start, _ in trips)
+        best = None
+        for driver_type, heap in free_index.items():
+            if not heap or heap[0][0] > bus_start:
+                continue
+            driver = heap[0][2]
+            # Смены водителей одного типа одинаковы: проверка смены отсекает весь тип сразу
+            if can_assign(driver, bus, trips, mask) and (best is None or driver.driver_id < best.driver_id):
+                best = driver
+        if best is None:
+            # Создаем нового водителя типа, шаблон которого допускает автобус (если такой есть)
+            best = _create_driver(driver_id, _new_driver_type(trips, mask))
+            drivers.append(best)
+            driver_id += 1
+        else:
+            heapq.heappop(free_index[best.driver_type])
+        # Назначение автобуса
+        _assign_bus(best, bus, trips, mask)
+        heapq.heappush(free_index.setdefault(best.driver_type, []), (best.busy.last_end(), best.driver_id, best))
+    return drivers
+
+def _partition_intervals(items, fits=None, lookahead=8):
+    """
+    Разбиение интервалов на минимальное число цепочек непересекающихся интервалов (сканирующая прямая).
+    items: список (начало, конец, объект). Возвращает список цепочек объектов. O(n log n).
+    fits(chain, item): может ли объект продолжить цепочку (например, по правилам шаблона смены);
+    если освободившаяся раньше всех цепочка не подходит, проверяются ещё не более lookahead
+    свободных цепочек, после чего начинается новая. С fits минимум цепочек не гарантируется.
+    """
+    chains = []
+    heap = []  # (конец последнего интервала цепочки, номер цепочки)
+    for start, end, item in sorted(items, key=lambda x: (x[0], x[1])):
+        idx = None
+        skipped = []
+        while heap and heap[0][0] <= start and len(skipped) <= lookahead:
+            entry = heapq.heappop(heap)
+            if fits is None or fits(chains[entry[1]], item):
+                idx = entry[1]
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        if idx is None:
+            idx = len(chains)
+            chains.append([])
+        chains[idx].append(item)
+        heapq.heappush(heap, (end, idx))
+    return chains
+
+def _chain_fits(driver_type):
+    """
+    Проверка продолжения цепочки для _partition_intervals: автобус, допустимый для шаблона
+    driver_type вместе с правилами (ShiftTemplate.fits), не должен давать нарушений ShiftTemplate.violations
+    вместе с поездками цепочки. Автобусы, назначенные типу принудительно, проверяются только по интервалам.
+    """
+    template = SHIFT_TEMPLATES.get(driver_type)
+    if template is None or (template.break_window is None and template.max_continuous is None):
+        return None
+
+    def fits(chain, item):
+        bus, trips, _, fitted = item
+        if not fitted:
+            return True
+        trips = [trip for payload in chain for trip in payload[1]] + trips
+        return not template.violations(sorted(trips, key=lambda trip: trip[0]))
+    return fits
+
+def _typed_chains(by_type, typing):
+    """
+    Цепочки (тип водителя, список автобусов) при заданном типе для каждого автобуса с несколькими
+    допустимыми типами: автобусы каждого типа разбиваются на минимальное число цепочек.
+    typing: список пар (тип, элемент).
+    """
+    groups = {driver_type: list(items) for driver_type, items in by_type.items()}
+    for driver_type, item in typing:
+        groups[driver_type].append(item)
+    chains = []
+    for driver_type, items in groups.items():
+        chains.extend((driver_type, chain) for chain in _partition_intervals(items, _chain_fits(driver_type)))
+    return chains
+
+def _sweep_typing(by_type, multi, preference):
+    """
+    Типы по проходу по времени начала с отложенным выбором типа: цепочка хранит пересечение
+    допустимых типов своих автобусов, автобус продолжает освободившуюся позже других (лучшая подгонка)
+    цепочку с общим типом. После прохода цепочка получает первый из своих типов в preference.
+    """
+    events = [(item[0], item[1], item, {driver_type}) for driver_type, items in by_type.items() for item in items]
+    events += [(item[0], item[1], item, item[2][2]) for item in multi]
+    events.sort(key=lambda event: (event[0], event[1]))
+    # Набор типов цепочки -> отсортированный список (конец цепочки, номер цепочки)
+    free = {}
+    members = []
+    for start, end, item, types in events:
+        best = None
+        for chain_types, ends in free.items():
+            if chain_types & types:
+                pos = bisect_right(ends, (start, len(members))) - 1
+                if pos >= 0 and (best is None or ends[pos][0] > best[0]):
+                    best = (ends[pos][0], chain_types, pos)
+        if best is None:
+            chain_types, chain_id = frozenset(types), len(members)
+            members.append([])
+        else:
+            _, old_types, pos = best
+            chain_id = free[old_types].pop(pos)[1]
+            chain_types = old_types & types
+        members[chain_id].append(item)
+        insort(free.setdefault(chain_types, []), (end, chain_id))
+    typing = []
+    for chain_types, ends in free.items():
+        driver_type = next(t for t in preference if t in chain_types)
+        typing.extend((driver_type, item) for _, chain_id in ends for item in members[chain_id]
+                      if len(item[2][2]) > 1)
+    return typing
+
+@instrumented("assign_drivers_optimal")
+def assign_drivers_optimal(buses, infeasible_type=2):
+    """
+    Распределение водителей разбиением интервалов (сканирующая прямая), O(n log n) на тип.
+    Для каждого автобуса определяются типы водителей, смены, перерывы и правила обеда и непрерывного
+    вождения которых допускают все его поездки (ShiftTemplate.fits); если таких нет - типы, окна которых
+    допускают автобус. Цепочка продолжается автобусом, только если у водителя не возникает нарушений
+    ShiftTemplate.violations (_chain_fits).
+    Автобусы одного типа разбиваются на минимальное число цепочек непересекающихся интервалов работы,
+    поэтому если каждый автобус подходит одному типу и правила шаблонов не отклоняют ни одного
+    продолжения цепочки, число водителей минимально.
+    Автобусу, подходящему нескольким типам, назначается один тип; из нескольких вариантов назначения
+    (все такие автобусы одному типу, проходы по времени с разным порядком предпочтения типов)
+    выбирается дающий меньше водителей; каждый вариант разбивается той же сканирующей прямой,
+    поэтому время остаётся O(n log n). В этом случае минимум не гарантируется.
+    Автобусы, не подходящие ни одному типу, назначаются водителям типа infeasible_type.
+    """
+    by_type = {driver_type: [] for driver_type in SHIFT_TEMPLATES}
+    by_type.setdefault(infeasible_type, [])
+    multi = []
+    for bus in buses:
+        trips = bus_trip_intervals(bus)
+        busy = [_busy_interval(trip_start, trip_end) for trip_start, trip_end in trips]
+        span = (min(start for start, _ in busy), max(end for _, end in busy))
+        mask = trips_mask(trips)
+        types = [driver_type for driver_type, template in SHIFT_TEMPLATES.items() if template.fits(trips, mask)]
+        fitted = bool(types)
+        if not fitted:
+            types = [driver_type for driver_type, template in SHIFT_TEMPLATES.items() if template.allows(mask)]
+        if not types:
+            # Автобус вне всех смен назначается водителю типа infeasible_type принудительно,
+            # как и в жадном алгоритме; такой водитель может взять и другие подходящие автобусы
+            types = [infeasible_type]
+        item = (span[0], span[1], (bus, trips, set(types), fitted))
+        if len(types) == 1:
+            by_type[types[0]].append(item)
+        else:
+            multi.append(item)
+
+    # Цепочки (тип водителя, список автобусов)
+    chains = _typed_chains(by_type, [])
+    if multi:
+        typings = [[(driver_type, item) for item in multi] for driver_type in by_type
+                   if all(driver_type in item[2][2] for item in multi)]
+        # Шаблоны с большей продолжительностью работы предпочтительнее для новых цепочек
+        preference = sorted(by_type, key=lambda driver_type: -sum(
+            end - start for start, end in SHIFT_TEMPLATES[driver_type].work) if driver_type in SHIFT_TEMPLATES else 0)
+        typings.append(_sweep_typing(by_type, multi, preference))
+        typings.append(_sweep_typing(by_type, multi, preference[::-1]))
+        chains = min((_typed_chains(by_type, typing) for typing in typings), key=len)
+
+    drivers = []
+    for driver_id, (driver_type, chain) in enumerate(chains, start=1):
+        driver = _create_driver(driver_id, driver_type)
+        for bus, trips, _, _ in chain:
+            _assign_bus(driver, bus, trips)
+        drivers.append(driver)
+    return drivers
+
+class DutyBlock:
+    """
+    Участок работы водителя на одном автобусе: подряд идущие поездки с номерами [first_trip, last_trip].
+    start, end - минуты начала и конца участка (конец может быть больше 1440 при переходе через полночь);
+    участок начинается и заканчивается в пунктах смены водителей (конечных остановках маршрута).
+    """
+    __slots__ = ("bus", "first_trip", "last_trip", "start", "end", "driver_id")
+
+    def __init__(self, bus, first_trip, last_trip, start, end):
+        self.bus = bus
+        self.first_trip = first_trip
+        self.last_trip = last_trip
+        self.start = start
+        self.end = end
+        self.driver_id = None
+
+def _unfolded_trip_bounds(bus, slack=60):
+    """
+    Поездки автобуса с минутами без свёртки: каждая следующая поездка начинается не раньше
+    конца предыдущей (с допуском slack на отклонения времени прибытия).
+    """
+    unfolded = []
+    current = None
+    for trip_start, trip_end in bus_trip_intervals(bus):
+        if current is not None:
+            days = max(0, -((trip_start - (current - slack)) // 1440))
+            trip_start += 1440 * days
+        trip_end = trip_start + (trip_end - trip_start) % 1440
+        unfolded.append((trip_start, trip_end))
+        current = trip_end
+    return unfolded
+
+def _template_boundaries():
+    """Минуты суток, в которые начинаются или заканчиваются окна работы и перерывы шаблонов смен."""
+    boundaries = set()
+    for template in SHIFT_TEMPLATES.values():
+        for start, end in template.work + template.rests:
+            boundaries.update((start % 1440, end % 1440))
+    return sorted(boundaries)
+
+def _crosses_boundary(start, end, boundaries):
+    """Пересекает ли интервал [start, end) одну из границ (с учётом повторения по суткам)."""
+    for day_shift in range(start // 1440 * 1440, end + 1, 1440):
+        i = bisect_right(boundaries, start - day_shift)
+        if i < len(boundaries) and boundaries[i] + day_shift < end:
+            return True
+    return False
+
+def split_relief_blocks(bus, max_block_minutes=240, boundaries=None):
+    """
+    Делит день автобуса на участки не длиннее max_block_minutes (если позволяют пункты смены).
+    Участок может закончиться только после поездки, пришедшей на конечную остановку маршрута.
+    boundaries: минуты суток (начала и концы смен и перерывов, см. _template_boundaries);
+    участок также закрывается перед поездкой, пересекающей границу, чтобы участки помещались
+    между перерывами шаблонов.
+    """
+    schedule = bus.schedule
+    base = getattr(schedule, "base", schedule)
+    stops = bus.route.stops
+    relief_points = {stops[0].index, stops[-1].index}
+    trips = _unfolded_trip_bounds(bus)
+    if boundaries is None:
+        boundaries = _template_boundaries()
+    blocks = []
+    first = 0
+    for i, (trip_start, trip_end) in enumerate(trips):
+        at_relief = base.stops[base.offsets[i + 1] - 1] in relief_points
+        is_last = i == len(trips) - 1
+        # Участок закрывается, если следующая поездка не помещается в ограничение длины
+        # или пересекает границу смены либо перерыва
+        if not is_last and at_relief:
+            next_start, next_end = trips[i + 1]
+            close = (next_end - trips[first][0] > max_block_minutes
+                     or _crosses_boundary(trip_end, next_end, boundaries))
+        else:
+            close = is_last
+        if close:
+            block_start = trips[first][0]
+            shift = 1440 * (block_start // 1440)
+            blocks.append(DutyBlock(bus, first, i, block_start - shift, trip_end - shift))
+            first = i + 1
+    return blocks
+
+def _assign_block(driver, block):
+    if not driver.assigned_buses or driver.assigned_buses[-1] is not block.bus:
+        driver.assigned_buses.append(block.bus)
+    if driver.driver_id not in block.bus.assigned_drivers:
+        block.bus.assigned_drivers.append(driver.driver_id)
+    driver.busy.add(block.start, block.end)
+    driver.busy_mask |= _bits(block.start, block.end)
+    block.driver_id = driver.driver_id
+
+@instrumented("assign_drivers_blocks")
+def assign_drivers_blocks(buses, max_block_minutes=240, infeasible_type=2, return_blocks=False):
+    """
+    Распределение водителей по участкам вместо целых автобусов.
+    День каждого автобуса делится на участки в пунктах смены (split_relief_blocks), участки
+    сцепляются в работу водителей: участки перебираются по времени начала, для каждого шаблона
+    смены водители хранятся в куче по времени освобождения (конец участка + min_break шаблона),
+    и участок получает освободившийся раньше всех водитель подходящего шаблона. O(B log D).
+    Участки, не помещающиеся ни в один шаблон, назначаются новым водителям типа infeasible_type.
+    return_blocks: вернуть (drivers, blocks), у каждого участка заполнен driver_id.
+    """
+    boundaries = _template_boundaries()
+    blocks = [block for bus in buses for block in split_relief_blocks(bus, max_block_minutes, boundaries)]
+    blocks.sort(key=lambda block: (block.start, block.end))
+    # Шаблоны с большей продолжительностью работы предпочтительнее для новых водителей
+    templates = sorted(SHIFT_TEMPLATES.values(), key=lambda template: -sum(end - start for start, end in template.work))
+    free_index = {template.driver_type: [] for template in templates}
+    drivers = []
+
+    # Водители участков вне всех смен образуют отдельные цепочки, как в assign_drivers_optimal
+    forced = []
+    forced_break = SHIFT_TEMPLATES[infeasible_type].min_break if infeasible_type in SHIFT_TEMPLATES else 0
+
+    for block in blocks:
+        mask = _bits(block.start, block.end)
+        allowed = [template for template in templates if template.allows(mask)]
+        heaps = [free_index[template.driver_type] for template in allowed] if allowed else [forced]
+        best = None
+        for heap in heaps:
+            if heap and heap[0][0] <= block.start and not mask & heap[0][2].busy_mask:
+                driver = heap[0][2]
+                if best is None or driver.driver_id < best[1].driver_id:
+                    best = (heap, driver)
+        if best is not None:
+            heap, driver = best
+            heapq.heappop(heap)
+        else:
+            driver = _create_driver(len(drivers) + 1, allowed[0].driver_type if allowed else infeasible_type)
+            drivers.append(driver)
+            heap = heaps[0]
+        _assign_block(driver, block)
+        min_break = allowed and SHIFT_TEMPLATES[driver.driver_type].min_break or forced_break
+        heapq.heappush(heap, (block.end + min_break, driver.driver_id, driver))
+
+    if return_blocks:
+        return drivers, blocks
+    return drivers
+
+class BusDelta:
+    """
+    Изменение расписания одного автобуса.
+    added: новые поездки, каждая - список (название остановки, минута прибытия);
+    removed: номера удаляемых поездок; shifted: список (номер поездки, сдвиг в минутах).
+    Номера поездок относятся к расписанию до изменения.
+    """
+    __slots__ = ("bus", "added", "removed", "shifted")
+
+    def __init__(self, bus, added=(), removed=(), shifted=()):
+        self.bus = bus
+        self.added = list(added)
+        self.removed = list(removed)
+        self.shifted = list(shifted)
+
+def apply_bus_delta(delta):
+    """Применяет изменение к расписанию автобуса; общее расписание маршрута не затрагивается."""
+    view = delta.bus.schedule
+    for trip_idx, minutes in delta.shifted:
+        for pos in range(view.base.offsets[trip_idx], view.base.offsets[trip_idx + 1]):
+            view.perturb(pos, minutes)
+    if delta.added or delta.removed:
+        removed = set(delta.removed)
+        schedule = Schedule()
+        for trip_idx, trip in enumerate(view):
+            if trip_idx not in removed:
+                schedule.append_trip([intern_stop(stop) for stop, _ in trip], [minute for _, minute in trip])
+        for trip in delta.added:
+            schedule.append_trip([intern_stop(stop) for stop, _ in trip], [minute % 1440 for _, minute in trip])
+        delta.bus.schedule = ScheduleView(schedule)
+
+def _rebuild_busy(driver):
+    driver.busy = IntervalSet()
+    driver.busy_mask = 0
+    for bus in driver.assigned_buses:
+        trips = bus_trip_intervals(bus)
+        for trip_start, trip_end in trips:
+            driver.busy.add(*_busy_interval(trip_start, trip_end))
+        driver.busy_mask |= trips_mask(trips)
+
+def _release_bus(bus, driver_by_id):
+    """Снимает автобус с его водителей и возвращает этих водителей."""
+    released = []
+    for driver_id in bus.assigned_drivers:
+        driver = driver_by_id.get(driver_id)
+        if driver is not None and bus in driver.assigned_buses:
+            driver.assigned_buses.remove(bus)
+            _rebuild_busy(driver)
+            released.append(driver)
+    bus.assigned_drivers = []
+    return released
+
+def _index_driver(free_index, driver):
+    heapq.heappush(free_index.setdefault(driver.driver_type, []), (driver.busy.last_end(), driver.driver_id, driver))
+
+def _free_driver(free_index, driver_by_id, driver_types, bus, trips, mask):
+    """
+    Водитель из индекса свободных окон (тип -> куча (время освобождения, ID водителя, водитель)),
+    освободившийся раньше всех среди водителей типов driver_types и допускающий автобус (can_assign),
+    как в assign_drivers_greedy. Устаревшие записи (время освобождения изменилось или водителя
+    уже нет в driver_by_id) удаляются с вершины кучи.
+    """
+    bus_start = min(trip_start for trip_start, _ in trips)
+    best = None
+    for driver_type in driver_types:
+        heap = free_index.get(driver_type)
+        while heap and (driver_by_id.get(heap[0][1]) is not heap[0][2] or heap[0][0] != heap[0][2].busy.last_end()):
+            heapq.heappop(heap)
+        if not heap or heap[0][0] > bus_start:
+            continue
+        driver = heap[0][2]
+        if can_assign(driver, bus, trips, mask) and (best is None or driver.driver_id < best.driver_id):
+            best = driver
+    if best is not None:
+        heapq.heappop(free_index[best.driver_type])
+    return best
+
+@instrumented("repair_assignment")
+def repair_assignment(drivers, deltas=(), removed_buses=(), added_buses=(), free_index=None):
+    """
+    Инкрементальное перераспределение после изменения расписаний.
+    Затрагиваются только водители изменённых автобусов, остальные назначения сохраняются.
+    drivers: результат assign_drivers_greedy / assign_drivers_optimal / load_columnar
+             (assigned_buses содержит объекты Bus); список дополняется новыми водителями,
+             а водители, оставшиеся без автобусов, из него удаляются.
+    deltas: изменения расписаний (BusDelta); removed_buses: снятые с линии автобусы;
+    added_buses: новые автобусы, которым нужен водитель.
+    free_index: индекс свободных окон водителей по типам (пустой словарь при первом вызове),
+                который передаётся между вызовами для того же списка drivers; если None,
+                индекс строится за один проход по водителям при первой необходимости.
+    Изменённый автобус остаётся у прежнего водителя, если тот его допускает (can_assign), а также
+    если автобус не помещается ни в один шаблон (как в принудительном пути жадного алгоритма)
+    и не пересекается с занятостью прежнего водителя. Иначе автобус получает освободившегося раньше
+    всех водителя подходящего типа из индекса (в том числе оставшегося без автобусов), затем снова
+    прежнего водителя без пересечений, и только потом нового водителя.
+    Возвращает список водителей, чьи назначения изменились (включая удалённых из drivers).
+    """
+    driver_by_id = {driver.driver_id: driver for driver in drivers}
+    changed = {}
+    if free_index is not None and not free_index:
+        for driver in drivers:
+            _index_driver(free_index, driver)
+
+    for bus in removed_buses:
+        for driver in _release_bus(bus, driver_by_id):
+            changed[driver.driver_id] = driver
+
+    pending = list(added_buses)
+    for delta in deltas:
+        previous = _release_bus(delta.bus, driver_by_id)
+        apply_bus_delta(delta)
+        pending.append((delta.bus, previous))
+        for driver in previous:
+            changed[driver.driver_id] = driver
+    if free_index is not None:
+        # Освободившиеся водители снова попадают в индекс с новым временем освобождения
+        for driver in changed.values():
+            _index_driver(free_index, driver)
+
+    next_id = max(driver_by_id, default=0) + 1
+    for item in pending:
+        bus, previous = item if isinstance(item, tuple) else (item, [])
+        trips = bus_trip_intervals(bus)
+        mask = trips_mask(trips)
+        conflict_free = [driver for driver in previous if not mask & driver.busy_mask]
+        # Сначала пробуем прежнего водителя, чтобы назначение оставалось стабильным
+        target = next((driver for driver in conflict_free if can_assign(driver, bus, trips, mask)), None)
+        fitting = [driver_type for driver_type, template in SHIFT_TEMPLATES.items() if template.fits(trips, mask)]
+        if target is None and conflict_free and not fitting:
+            target = conflict_free[0]
+        if target is None:
+            if free_index is None:
+                free_index = {}
+                for driver in drivers:
+                    _index_driver(free_index, driver)
+            allowed = fitting or [driver_type for driver_type, template in SHIFT_TEMPLATES.items()
+                                  if template.allows(mask)]
+            target = _free_driver(free_index, driver_by_id, allowed, bus, trips, mask)
+        if target is None and conflict_free:
+            target = conflict_free[0]
+        if target is None:
+            target = _create_driver(next_id, _new_driver_type(trips, mask))
+            next_id += 1
+            drivers.append(target)
+            driver_by_id[target.driver_id] = target
+        _assign_bus(target, bus, trips, mask)
+        if free_index is not None:
+            _index_driver(free_index, target)
+        changed[target.driver_id] = target
+
+    # Водители, оставшиеся без автобусов, удаляются из списка
+    emptied = [driver for driver in changed.values() if not driver.assigned_buses]
+    for driver in emptied:
+        drivers.remove(driver)
+    return list(changed.values())
@@ -0,0 +1,785 @@
+"""
+Бенчмарки алгоритмов, генерации расписаний и экспорта.
+"""
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .models import Bus, MOSCOW_STOPS, SHIFT_TEMPLATES, trips_mask, _bits, _STOP_INDEX
+from .timetable import (
+    fork_fleet, generate_city_schedules, generate_random_routes, generate_route_schedule, manage_buses, size_fleet,
+    _in_peak,
+)
+from .stops import StopTimetable
+from .assignment import (
+    assign_drivers_blocks, assign_drivers_greedy, bus_trip_intervals, BusDelta, can_assign,
+    repair_assignment, shifts_allow, _busy_interval, _create_driver,
+)
+from .horizon import plan_rolling_horizon
+from .simulation import simulate_delays
+from .genetic import (
+    build_trip_table, eval_individual, evaluate_population, genetic_driver_assignment, nsga2_driver_assignment,
+    _random_driver_types,
+)
+from .export import export_columnar, export_to_excel, export_to_excel_streaming, load_columnar, _pyarrow
+from .engines import (
+    BENCHMARK_ENGINES, plot_benchmark_results, _GA_ENGINES, _run_engine, _seed_everything, _summarize_records,
+)
+
+
+def benchmark_suite(route_counts=(10, 20, 40), buses_per_route=(5, 10), population_sizes=(50, 100),
+                    generations_list=(50, 100), seeds=(0, 1, 2), engines=("greedy", "optimal", "genetic"),
+                    trace_memory=True, output="benchmark_results.json", plot_prefix="benchmark"):
+    """
+    Набор бенчмарков масштабирования всех алгоритмов распределения водителей.
+    Перебирает число маршрутов, автобусов на маршрут и (для ГА) размер популяции и число поколений;
+    каждая конфигурация повторяется для всех seeds. Для каждого запуска записываются время,
+    пик памяти (tracemalloc, первый seed) и число водителей.
+    Результаты сохраняются в JSON (output), графики масштабирования - в файлы plot_prefix_*.png.
+    """
+    records = []
+    for num_routes in route_counts:
+        for per_route in buses_per_route:
+            for seed_index, seed in enumerate(seeds):
+                # Один и тот же парк для всех алгоритмов при данном seed
+                _seed_everything(seed)
+                routes = generate_random_routes(num_routes=num_routes)
+                buses = manage_buses(routes, min_buses_per_route=per_route)
+                for engine in engines:
+                    if engine in _GA_ENGINES:
+                        configs = [{"population_size": population_size, "generations": generations}
+                                   for population_size in population_sizes for generations in generations_list]
+                    else:
+                        configs = [{"population_size": None, "generations": None}]
+                    for config in configs:
+                        drivers, wall_time, peak_mb = _run_engine(engine, buses, config, seed,
+                                                                  trace_memory=trace_memory and seed_index == 0)
+                        records.append({
+                            "engine": engine,
+                            "num_routes": num_routes,
+                            "min_buses_per_route": per_route,
+                            "num_buses": len(buses),
+                            "seed": seed,
+                            "wall_time": wall_time,
+                            "peak_memory_mb": peak_mb,
+                            "drivers": len(drivers),
+                            **config,
+                        })
+                        print(f"{engine} маршрутов={num_routes} автобусов={len(buses)} seed={seed} "
+                              f"{config if engine in _GA_ENGINES else ''}: {wall_time:.3f} сек, водителей {len(drivers)}")
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "cpu_count": os.cpu_count(),
+        },
+        "records": records,
+        "summary": _summarize_records(records),
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {output}")
+    if plot_prefix:
+        plot_benchmark_results(results, prefix=plot_prefix)
+    return results
+
+def check_benchmark_regression(baseline, results, time_tolerance=0.2, drivers_tolerance=0.0):
+    """
+    Сравнивает сводку с базовыми результатами (словарь или путь к JSON).
+    Возвращает список регрессий: конфигурации, где среднее время выросло больше чем на time_tolerance
+    или среднее число водителей - больше чем на drivers_tolerance (доли от базового значения).
+    """
+    if isinstance(baseline, str):
+        with open(baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    def key(row):
+        return (row["engine"], row["num_routes"], row["min_buses_per_route"], row["population_size"], row["generations"])
+
+    base_rows = {key(row): row for row in baseline["summary"]}
+    regressions = []
+    for row in results["summary"]:
+        base = base_rows.get(key(row))
+        if base is None:
+            continue
+        for metric, tolerance in (("wall_time_mean", time_tolerance), ("drivers_mean", drivers_tolerance)):
+            if row[metric] > base[metric] * (1 + tolerance):
+                regressions.append({"config": key(row), "metric": metric,
+                                    "baseline": base[metric], "current": row[metric]})
+    for regression in regressions:
+        print(f"Регрессия {regression['metric']} для {regression['config']}: "
+              f"{regression['baseline']:.4f} -> {regression['current']:.4f}")
+    return regressions
+
+def benchmark_fitness_evaluation(num_routes=20, min_buses_per_route=10, population_size=100, repeats=3):
+    """
+    Сравнивает скорость построчной (eval_individual) и пакетной (evaluate_population) оценки.
+    Проверяет совпадение значений приспособленности при фиксированных типах водителей.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+    max_drivers = len(buses)
+    population = [[random.randint(0, max_drivers - 1) for _ in range(len(buses))] for _ in range(population_size)]
+    driver_types = np.array([random.choice([1, 2]) for _ in range(max_drivers)])
+
+    start = time.time()
+    for _ in range(repeats):
+        scalar = [eval_individual(individual, buses, driver_types)[0] for individual in population]
+    scalar_time = time.time() - start
+
+    start = time.time()
+    for _ in range(repeats):
+        trip_table = build_trip_table(buses)
+        batched = evaluate_population(population, trip_table, driver_types)
+    batched_time = time.time() - start
+
+    if not np.array_equal(np.array(scalar, dtype=float), batched):
+        raise AssertionError("Пакетная оценка не совпадает с построчной")
+
+    evaluations = population_size * repeats
+    result = {
+        "scalar_evals_per_sec": evaluations / scalar_time,
+        "batched_evals_per_sec": evaluations / batched_time,
+    }
+    print(f"Построчная оценка: {result['scalar_evals_per_sec']:.1f} оценок/сек")
+    print(f"Пакетная оценка: {result['batched_evals_per_sec']:.1f} оценок/сек")
+    return result
+
+def benchmark_parallel_ga(num_routes=20, min_buses_per_route=10, population_size=100, generations=20,
+                          worker_counts=(1, 2, 4, 8)):
+    """
+    Измеряет ускорение генетического алгоритма в зависимости от числа процессов:
+    параллельная оценка популяции и островная модель.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+    results = []
+    baseline = None
+    for workers in worker_counts:
+        start = time.time()
+        genetic_driver_assignment(buses, population_size=population_size, generations=generations, workers=workers)
+        pool_time = time.time() - start
+        if baseline is None:
+            baseline = pool_time
+
+        start = time.time()
+        genetic_driver_assignment(buses, population_size=population_size, generations=generations,
+                                  workers=workers, islands=max(workers, 2))
+        island_time = time.time() - start
+
+        results.append({"workers": workers, "pool_time": pool_time, "island_time": island_time,
+                        "pool_speedup": baseline / pool_time, "island_speedup": baseline / island_time})
+        print(f"Процессов: {workers}, пул: {pool_time:.2f} сек (x{baseline / pool_time:.2f}), "
+              f"острова: {island_time:.2f} сек (x{baseline / island_time:.2f})")
+    return results
+
+# Окна работы дневного парка (начало в минутах, часы) между перерывами шаблонов смен
+_SHIFT_WINDOWS = ((480, 1), (615, 1.5), (845, 0.5), (915, 3))
+
+def _shift_window_fleet(num_routes, windows=_SHIFT_WINDOWS, headway=30):
+    """
+    Парк из коротких дневных выходов (size_fleet для каждого окна), которые помещаются в шаблоны
+    смен, так что один водитель последовательно получает несколько автобусов.
+    Около 10 автобусов на маршрут при окнах и интервале по умолчанию.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = []
+    for start_time_min, hours in windows:
+        for bus in size_fleet(routes, peak_headway=headway, offpeak_headway=headway,
+                              start_time_min=start_time_min, operation_hours=hours):
+            bus.bus_id = len(buses) + 1
+            buses.append(bus)
+    return buses
+
+def benchmark_greedy_scaling(fleet_sizes=(200, 2000, 20000), buses_per_route=10):
+    """
+    Измеряет время жадного распределения водителей для парков разного размера.
+    Используется парк из дневных выходов (_shift_window_fleet): автобусы круглосуточного
+    manage_buses не помещаются ни в один шаблон смены, и каждый получал бы нового водителя,
+    минуя проверки по кучам и занятости водителей.
+    shared_drivers: водителей с несколькими автобусами.
+    """
+    results = []
+    for fleet_size in fleet_sizes:
+        buses = _shift_window_fleet(max(fleet_size // buses_per_route, 1))
+        start = time.time()
+        drivers = assign_drivers_greedy(buses, initial_driver_count=10)
+        elapsed = time.time() - start
+        shared = sum(1 for driver in drivers if len(driver.assigned_buses) > 1)
+        results.append({"buses": len(buses), "drivers": len(drivers), "shared_drivers": shared, "time": elapsed})
+        print(f"Автобусов: {len(buses)}, водителей: {len(drivers)} (с несколькими автобусами {shared}), "
+              f"время: {elapsed:.3f} сек")
+    return results
+
+def benchmark_schedule_memory(num_routes=2000, min_buses_per_route=10, sample_buses=200):
+    """
+    Сравнивает память на автобус для компактного расписания и прежнего списка кортежей
+    (остановка, 'HH:MM'), а также измеряет полное время генерации и жадного распределения.
+    """
+    start = time.time()
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+    assign_drivers_greedy(buses, initial_driver_count=10)
+    total_time = time.time() - start
+
+    sample = buses[:sample_buses]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    compact = [copy.deepcopy(bus.schedule) for bus in sample]
+    compact_bytes = tracemalloc.get_traced_memory()[0] - before
+    before = tracemalloc.get_traced_memory()[0]
+    legacy = [bus.schedule.to_tuples() for bus in sample]
+    legacy_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del compact, legacy
+
+    result = {
+        "buses": len(buses),
+        "compact_bytes_per_bus": compact_bytes / len(sample),
+        "legacy_bytes_per_bus": legacy_bytes / len(sample),
+        "total_time": total_time,
+    }
+    print(f"Автобусов: {len(buses)}, время генерации и распределения: {total_time:.2f} сек")
+    print(f"Память на автобус: компактно {result['compact_bytes_per_bus']:.0f} Б, "
+          f"кортежи строк {result['legacy_bytes_per_bus']:.0f} Б")
+    return result
+
+def benchmark_fleet_memory(route_counts=(20, 2000), min_buses_per_route=10):
+    """
+    Сравнивает время и пиковую память построения парка и его копии для второго алгоритма:
+    прежний способ (расписание на каждый автобус и deepcopy) и общие расписания со сдвигом.
+    """
+    def legacy_fleet(routes):
+        buses = []
+        bus_id = 1
+        for route in routes:
+            interval_min = 1440 / min_buses_per_route
+            for i in range(min_buses_per_route):
+                bus = Bus(bus_id=bus_id, route=route)
+                bus.schedule = copy.deepcopy(generate_route_schedule(route, 480 + int(i * interval_min)))
+                buses.append(bus)
+                bus_id += 1
+        return buses, copy.deepcopy(buses)
+
+    def shared_fleet(routes):
+        buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+        return buses, fork_fleet(buses)
+
+    results = []
+    for num_routes in route_counts:
+        routes = generate_random_routes(num_routes=num_routes)
+        for name, build in (("deepcopy", legacy_fleet), ("shared", shared_fleet)):
+            tracemalloc.start()
+            start = time.time()
+            fleet = build(routes)
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            del fleet
+            results.append({"routes": num_routes, "mode": name, "time": elapsed, "peak_bytes": peak})
+            print(f"Маршрутов: {num_routes}, {name}: {elapsed:.2f} сек, пик памяти {peak / 2**20:.1f} МБ")
+    return results
+
+def benchmark_timetable_generation(num_routes=2000, seed=0):
+    """
+    Сравнивает скорость и статистику построчного и пакетного генераторов расписаний:
+    среднее число поездок на маршрут и средняя длительность поездки (от первой до последней остановки).
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+
+    def summary(schedules):
+        durations = [(end - start) % 1440 for schedule in schedules for start, end in schedule.trip_bounds()]
+        return np.mean([len(schedule) for schedule in schedules]), np.mean(durations), np.std(durations)
+
+    start = time.time()
+    scalar = [generate_route_schedule(route, 0) for route in routes]
+    scalar_time = time.time() - start
+
+    start = time.time()
+    batched = generate_city_schedules(routes, seed=seed)
+    batched_time = time.time() - start
+
+    result = {"scalar_time": scalar_time, "batched_time": batched_time,
+              "scalar_stats": summary(scalar), "batched_stats": summary(batched)}
+    for name, elapsed, stats in (("Построчный", scalar_time, result["scalar_stats"]),
+                                 ("Пакетный", batched_time, result["batched_stats"])):
+        print(f"{name}: {elapsed:.3f} сек, поездок на маршрут {stats[0]:.2f}, "
+              f"длительность поездки {stats[1]:.2f} ± {stats[2]:.2f} мин")
+    return result
+
+def benchmark_streaming_export(route_counts=(200, 2000), min_buses_per_route=10, filename="schedule_stream.xlsx"):
+    """
+    Измеряет скорость потокового экспорта (строк в секунду) и пиковый RSS процесса
+    для парков разного размера; при постоянном расходе памяти RSS не растёт с числом строк.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    def max_rss_kb():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None
+
+    results = []
+    for num_routes in route_counts:
+        routes = generate_random_routes(num_routes=num_routes)
+        buses = manage_buses(routes, min_buses_per_route=min_buses_per_route, vectorized=True)
+        drivers = assign_drivers_greedy(buses)
+        rss_before = max_rss_kb()
+        start = time.time()
+        rows = export_to_excel_streaming(drivers, routes, buses, filename=filename)
+        elapsed = time.time() - start
+        rss_after = max_rss_kb()
+        results.append({"routes": num_routes, "rows": rows, "rows_per_sec": rows / elapsed,
+                        "max_rss_kb_before": rss_before, "max_rss_kb_after": rss_after})
+        print(f"Маршрутов: {num_routes}, строк: {rows}, {rows / elapsed:.0f} строк/сек, "
+              f"пиковый RSS {rss_before} -> {rss_after} КБ")
+    return results
+
+def benchmark_columnar_export(num_routes=200, min_buses_per_route=10, directory="schedule_data",
+                              excel_filename="schedule_bench.xlsx"):
+    """
+    Сравнивает скорость записи и чтения колоночных таблиц (Parquet и CSV) с экспортом в Excel.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route, vectorized=True)
+    drivers = assign_drivers_greedy(buses)
+    results = {}
+
+    start = time.time()
+    export_to_excel(drivers, routes, buses, filename=excel_filename)
+    results["excel_write_time"] = time.time() - start
+    print(f"Excel: запись {results['excel_write_time']:.2f} сек")
+
+    for fmt in ("parquet", "csv"):
+        if fmt == "parquet" and _pyarrow()[1] is None:
+            continue
+        fmt_dir = os.path.join(directory, fmt)
+        start = time.time()
+        rows = export_columnar(drivers, routes, buses, directory=fmt_dir, fmt=fmt)
+        write_time = time.time() - start
+        start = time.time()
+        load_columnar(fmt_dir)
+        read_time = time.time() - start
+        results[fmt] = {"rows": rows, "write_rows_per_sec": rows / write_time, "read_rows_per_sec": rows / read_time}
+        print(f"{fmt}: {rows} строк, запись {rows / write_time:.0f} строк/сек, чтение {rows / read_time:.0f} строк/сек")
+    return results
+
+def benchmark_incremental_repair(num_routes=500, min_buses_per_route=10, changes=20):
+    """
+    Измеряет задержку инкрементального перераспределения после изменения одного автобуса
+    (сдвиг поездки, удаление поездки, снятие автобуса) на парке из num_routes * min_buses_per_route автобусов.
+    Индекс свободных водителей передаётся между вызовами; выводится число водителей до и после изменений.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route, vectorized=True)
+    drivers = assign_drivers_greedy(buses)
+    drivers_before = len(drivers)
+    free_index = {}
+    latencies = {"shift": [], "remove_trip": [], "remove_bus": []}
+    for _ in range(changes):
+        bus = random.choice(buses)
+        start = time.time()
+        repair_assignment(drivers, deltas=[BusDelta(bus, shifted=[(0, random.randint(5, 30))])], free_index=free_index)
+        latencies["shift"].append(time.time() - start)
+
+        bus = random.choice(buses)
+        start = time.time()
+        repair_assignment(drivers, deltas=[BusDelta(bus, removed=[len(bus.schedule) - 1])], free_index=free_index)
+        latencies["remove_trip"].append(time.time() - start)
+
+        bus = buses.pop(random.randrange(len(buses)))
+        start = time.time()
+        repair_assignment(drivers, removed_buses=[bus], free_index=free_index)
+        latencies["remove_bus"].append(time.time() - start)
+
+    result = {name: 1000 * sum(values) / len(values) for name, values in latencies.items()}
+    for name, value in result.items():
+        print(f"{name}: {value:.2f} мс в среднем")
+    print(f"Водителей до изменений {drivers_before}, после {len(drivers)}")
+    result["drivers_before"], result["drivers_after"] = drivers_before, len(drivers)
+    return result
+
+def benchmark_ga_convergence(num_routes=20, min_buses_per_route=10, population_size=100, generations=100):
+    """
+    Сравнивает сходимость стандартных операторов и операторов с восстановлением допустимости:
+    поколение и время до наименьшего достигнутого числа нарушений, итоговое число водителей.
+    Часть автобусов может нарушать правила перерывов при любом водителе, поэтому целевым
+    считается лучшее число нарушений, найденное любым из вариантов.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+    driver_types = _random_driver_types(len(buses))
+    logbooks = {}
+    results = {}
+    for name, repair in (("standard", False), ("repair", True)):
+        start = time.time()
+        drivers, logbook = genetic_driver_assignment(fork_fleet(buses), population_size=population_size,
+                                                     generations=generations, return_logbook=True,
+                                                     repair=repair, driver_types=driver_types)
+        logbooks[name] = logbook
+        results[name] = {
+            "best_fitness": logbook[-1]["min"][0],
+            "violations": int(logbook[-1]["min"][0] // 1000),
+            "drivers": len(drivers),
+            "total_time": time.time() - start,
+        }
+    target = min(result["violations"] for result in results.values())
+    print(f"Целевое число нарушений: {target}")
+    for name, result in results.items():
+        first = next((record for record in logbooks[name] if record["min"][0] // 1000 <= target), None)
+        result["generation_to_target"] = first["gen"] if first else None
+        result["seconds_to_target"] = first["elapsed"] if first else None
+        if first:
+            reached = f"поколение {first['gen']} ({first['elapsed']:.2f} сек)"
+        else:
+            reached = f"не достигнуто за {generations} поколений"
+        print(f"{name}: {reached}, итог {result['best_fitness']:.0f}, "
+              f"водителей {result['drivers']}, всего {result['total_time']:.2f} сек")
+    return results
+
+def _best_feasible_series(points):
+    """(оценок с начала запуска, водителей лучшего допустимого решения поколения или None) -> то же с лучшим найденным."""
+    series, best = [], None
+    for evaluations, drivers in points:
+        if drivers is not None and (best is None or drivers < best):
+            best = drivers
+        series.append((evaluations, best))
+    return series
+
+def benchmark_nsga2_convergence(num_routes=20, min_buses_per_route=10, population_size=100, generations=150,
+                                seeds=(0, 1, 2, 3), feasible_seeds=(0.0, 0.2), budgets=(2000, 5000, 10000)):
+    """
+    Сравнивает скалярную приспособленность (водители + 1000 * нарушения) и NSGA-II при одинаковой
+    начальной популяции: для каждой доли feasible_seeds обе версии получают одну и ту же затравку
+    из RepairOperators.initial_genes (0 - без затравки).
+    Для каждого запуска выводятся число оценок до первого допустимого решения (без нарушений)
+    и наименьшее число водителей допустимого решения, найденного за budgets оценок.
+    Скалярный ГА запускается без кэша, чтобы число оценок было сопоставимо.
+    Для NSGA-II также выводится размер итогового фронта Парето.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+    driver_types = _random_driver_types(len(buses))
+    summary = {}
+    for share in feasible_seeds:
+        runs = {"scalar": [], "nsga2": []}
+        for seed in seeds:
+            random.seed(seed)
+            np.random.seed(seed)
+            start = time.time()
+            _, logbook = genetic_driver_assignment(fork_fleet(buses), population_size=population_size,
+                                                   generations=generations, return_logbook=True, cache_size=0,
+                                                   driver_types=driver_types, feasible_seeds=share)
+            points, evaluations = [], 0
+            for record in logbook:
+                evaluations += record["nevals"]
+                best = record["min"][0]
+                points.append((evaluations, int(best) if best < 1000 else None))
+            runs["scalar"].append({"series": _best_feasible_series(points), "seconds": time.time() - start})
+
+            random.seed(seed)
+            np.random.seed(seed)
+            start = time.time()
+            front, logbook = nsga2_driver_assignment(fork_fleet(buses), population_size=population_size,
+                                                     generations=generations, driver_types=driver_types,
+                                                     feasible_seeds=share, return_logbook=True)
+            points = [(record["evaluations"], record["feasible_drivers"] and int(record["feasible_drivers"]))
+                      for record in logbook]
+            runs["nsga2"].append({"series": _best_feasible_series(points), "front_size": len(front),
+                                  "seconds": time.time() - start})
+
+        print(f"Доля допустимой затравки {share}:")
+        summary[share] = {}
+        for name, algorithm_runs in runs.items():
+            for run in algorithm_runs:
+                series = run["series"]
+                run["evaluations_to_feasible"] = next((evals for evals, best in series if best is not None), None)
+                run["drivers_at"] = {budget: next((best for evals, best in reversed(series) if evals <= budget), None)
+                                     for budget in budgets}
+                run["drivers"] = series[-1][1]
+                run["evaluations"] = series[-1][0]
+            reached = [run["evaluations_to_feasible"] for run in algorithm_runs
+                       if run["evaluations_to_feasible"] is not None]
+            at_budget = {budget: [run["drivers_at"][budget] for run in algorithm_runs
+                                  if run["drivers_at"][budget] is not None] for budget in budgets}
+            summary[share][name] = {
+                "runs": algorithm_runs,
+                "feasible_runs": len(reached),
+                "mean_evaluations_to_feasible": statistics.mean(reached) if reached else None,
+                "mean_drivers_at": {budget: statistics.mean(values) if values else None
+                                    for budget, values in at_budget.items()},
+            }
+            evaluations = ", ".join(str(run["evaluations_to_feasible"]) for run in algorithm_runs)
+            drivers = "; ".join(f"{budget} оценок: [{', '.join(str(run['drivers_at'][budget]) for run in algorithm_runs)}]"
+                                for budget in budgets)
+            print(f"  {name}: допустимое решение в {len(reached)}/{len(algorithm_runs)} запусках, "
+                  f"оценок до него [{evaluations}]; водителей после {drivers}")
+        sizes = [run["front_size"] for run in runs["nsga2"]]
+        print(f"  Размер фронта NSGA-II: {min(sizes)}-{max(sizes)} решений")
+    return summary
+
+def benchmark_rolling_horizon(num_routes=20, min_buses_per_route=10, horizons=(1, 7, 28, 56), operation_hours=2,
+                              departure_window=(480, 720)):
+    """
+    Время и пик памяти скользящего горизонта для разной длины горизонта в днях.
+    Время растёт линейно; расписания хранятся только для текущего окна, а маски занятости
+    водителей - от начала окна, поэтому рост пика памяти определяется только пулом водителей.
+    Дневной парк (выходы в departure_window, operation_hours часов работы) помещается в шаблоны смен,
+    так что водители переходят из окна в окно с учётом отдыха (DriverState): круглосуточные автобусы
+    не подходят ни одному шаблону, и каждый день нанимались бы только новые водители.
+    reused_drivers: назначений водителей, работавших в предыдущие дни.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    results = {}
+    for days in horizons:
+        tracemalloc.start()
+        start = time.time()
+        summary = plan_rolling_horizon(routes, days=days, min_buses_per_route=min_buses_per_route,
+                                       operation_hours=operation_hours, departure_window=departure_window, seed=0)
+        elapsed = time.time() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        new_drivers = sum(day["new_drivers"] for day in summary)
+        reused = sum(day["drivers_used"] - day["new_drivers"] for day in summary)
+        results[days] = {"seconds": elapsed, "seconds_per_day": elapsed / days, "peak_mb": peak / 2**20,
+                         "new_drivers": new_drivers, "reused_drivers": reused,
+                         "last_day_new_drivers": summary[-1]["new_drivers"]}
+        print(f"{days} дн.: {elapsed:.3f} сек ({elapsed / days:.3f} сек/день), пик памяти {peak / 2**20:.2f} МБ, "
+              f"водителей {new_drivers}, повторных назначений {reused}, "
+              f"новых в последний день {summary[-1]['new_drivers']}")
+        if days > 1 and not reused:
+            print("Водители не переходят между днями: парк не помещается в шаблоны смен")
+    return results
+
+def benchmark_feasibility_checks(num_routes=20, min_buses_per_route=10, drivers_per_type=20, repeats=5):
+    """
+    Сравнивает проверку назначения по сменам (shifts_allow и занятость по поездкам) с проверкой
+    по скомпилированным маскам шаблонов (can_assign с маской автобуса, вычисляемой один раз на автобус).
+    Проверяются все пары (автобус, водитель) для водителей всех шаблонов с частично занятым временем:
+    для полных суточных расписаний (обычно отсекаются первой же поездкой) и для дневных участков
+    расписаний (08:00-20:00), где старая проверка проходит все поездки.
+    Обе проверки включают правила обеда и непрерывного вождения шаблона (ShiftTemplate.violations);
+    у водителей нет назначенных автобусов, поэтому правила проверяются по поездкам автобуса.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route, bus_variation=5)
+    bus_trips = [bus_trip_intervals(bus) for bus in buses]
+    drivers = []
+    for driver_type in SHIFT_TEMPLATES:
+        for _ in range(drivers_per_type):
+            driver = _create_driver(len(drivers) + 1, driver_type)
+            busy_trips = random.choice(bus_trips)[:3]
+            for trip_start, trip_end in busy_trips:
+                driver.busy.add(*_busy_interval(trip_start, trip_end))
+            driver.busy_mask = trips_mask(busy_trips)
+            drivers.append(driver)
+
+    def legacy_check(driver, trips):
+        if not shifts_allow(driver.shifts, trips):
+            return False
+        if any(driver.busy.overlaps(*_busy_interval(trip_start, trip_end)) for trip_start, trip_end in trips):
+            return False
+        return not SHIFT_TEMPLATES[driver.driver_type].violations(sorted(trips, key=lambda trip: trip[0]))
+
+    day_pieces = [[(trip_start, trip_end) for trip_start, trip_end in trips if 480 <= trip_start <= trip_end <= 1200]
+                  for trips in bus_trips]
+    scenarios = {"сутки": bus_trips, "дневные участки": [trips for trips in day_pieces if trips]}
+    results = {}
+    for name, trip_lists in scenarios.items():
+        start = time.perf_counter()
+        for _ in range(repeats):
+            legacy = [legacy_check(driver, trips) for trips in trip_lists for driver in drivers]
+        legacy_time = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            compiled = []
+            for bus, trips in zip(buses, trip_lists):
+                mask = trips_mask(trips)
+                compiled.extend(can_assign(driver, bus, trips, mask) for driver in drivers)
+        compiled_time = (time.perf_counter() - start) / repeats
+
+        checks = len(trip_lists) * len(drivers)
+        mismatches = sum(a != b for a, b in zip(legacy, compiled))
+        print(f"{name}: проверок {checks}")
+        print(f"  Смены и интервалы: {legacy_time:.4f} сек ({checks / legacy_time:.0f} проверок/сек)")
+        print(f"  Маски шаблонов: {compiled_time:.4f} сек ({checks / compiled_time:.0f} проверок/сек), "
+              f"ускорение {legacy_time / compiled_time:.1f}x")
+        # Расхождения возможны только для поездок через полночь: маски проверяют их без свёртки
+        print(f"  Расхождений: {mismatches}")
+        results[name] = {"checks": checks, "legacy_time": legacy_time, "compiled_time": compiled_time,
+                         "mismatches": mismatches}
+    return results
+
+def _duty_hours(drivers):
+    """Среднее занятое время водителя в часах (по объединённым интервалам занятости)."""
+    total = sum(end - start for driver in drivers for start, end in zip(driver.busy.starts, driver.busy.ends))
+    return total / 60 / max(len(drivers), 1)
+
+def benchmark_block_assignment(fleet_sizes=(200, 2000, 10000), min_buses_per_route=10, max_block_minutes=240):
+    """
+    Сравнивает распределение по участкам (assign_drivers_blocks) с жадным распределением целых
+    автобусов: число водителей, среднее занятое время водителя и время решения.
+    Жадный алгоритм принудительно отдаёт круглосуточный автобус одному водителю вне смен,
+    поэтому его число водителей занижено; по участкам большинство водителей укладывается в шаблоны.
+    """
+    results = []
+    for fleet_size in fleet_sizes:
+        routes = generate_random_routes(num_routes=max(fleet_size // min_buses_per_route, 1))
+        buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+        start = time.perf_counter()
+        greedy = assign_drivers_greedy(fork_fleet(buses), initial_driver_count=10)
+        greedy_time = time.perf_counter() - start
+        start = time.perf_counter()
+        drivers, blocks = assign_drivers_blocks(fork_fleet(buses), max_block_minutes=max_block_minutes, return_blocks=True)
+        blocks_time = time.perf_counter() - start
+        infeasible = sum(1 for block in blocks if not any(template.allows(_bits(block.start, block.end))
+                                                          for template in SHIFT_TEMPLATES.values()))
+        results.append({"buses": len(buses), "blocks": len(blocks), "infeasible_blocks": infeasible,
+                        "greedy_drivers": len(greedy), "greedy_time": greedy_time,
+                        "greedy_duty_hours": _duty_hours(greedy),
+                        "block_drivers": len(drivers), "block_time": blocks_time,
+                        "block_duty_hours": _duty_hours(drivers)})
+        print(f"Автобусов: {len(buses)}, участков: {len(blocks)} (вне смен: {infeasible})")
+        print(f"  Целые автобусы: водителей {len(greedy)}, в среднем {_duty_hours(greedy):.1f} ч, {greedy_time:.3f} сек")
+        print(f"  По участкам: водителей {len(drivers)}, в среднем {_duty_hours(drivers):.1f} ч, {blocks_time:.3f} сек")
+    return results
+
+def benchmark_stop_timetable(route_counts=(20, 2000), min_buses_per_route=10, queries=200):
+    """
+    Время построения расписания по остановкам и запросов: ближайшие отправления (двоичный поиск)
+    и самое раннее прибытие (сканирование связей) между случайными остановками.
+    """
+    results = {}
+    for num_routes in route_counts:
+        routes = generate_random_routes(num_routes=num_routes)
+        buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+        start = time.perf_counter()
+        timetable = StopTimetable(buses)
+        build_time = time.perf_counter() - start
+
+        stop_names = [name for name in MOSCOW_STOPS if name in _STOP_INDEX]
+        pairs = [(random.choice(stop_names), random.choice(stop_names), random.randrange(1440)) for _ in range(queries)]
+        start = time.perf_counter()
+        for origin, _, minute in pairs:
+            timetable.next_departures(origin, minute, n=5)
+        departures_time = (time.perf_counter() - start) / queries
+
+        start = time.perf_counter()
+        found = sum(timetable.earliest_arrival(origin, destination, minute) is not None
+                    for origin, destination, minute in pairs)
+        journey_time = (time.perf_counter() - start) / queries
+
+        results[num_routes] = {"buses": len(buses), "connections": len(timetable.conn_dep), "build_time": build_time,
+                               "next_departures_us": departures_time * 1e6, "earliest_arrival_ms": journey_time * 1e3,
+                               "found": found}
+        print(f"Маршрутов: {num_routes}, автобусов: {len(buses)}, связей: {len(timetable.conn_dep)}, "
+              f"построение {build_time:.2f} сек")
+        print(f"  Ближайшие отправления: {departures_time * 1e6:.1f} мкс на запрос")
+        print(f"  Самое раннее прибытие: {journey_time * 1e3:.2f} мс на запрос (найдено {found} из {queries})")
+    return results
+
+def benchmark_cold_start(repeats=5, cwd=None):
+    """
+    Время холодного запуска в отдельном процессе: импорт пакета и запуск CLI только с жадным алгоритмом
+    (без экспорта и графиков). Показывает, какие тяжёлые зависимости при этом загружаются.
+    cwd: каталог, из которого импортируется пакет (по умолчанию - родительский каталог пакета).
+    """
+    cwd = cwd or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    heavy = ("numpy", "deap", "xlsxwriter", "matplotlib", "pyarrow", "pandas")
+    commands = {
+        "import": "import cursash",
+        "greedy_cli": "from cursash.cli import run; run(['--engines', 'greedy', '--no-export', '--no-plot'])",
+    }
+    results = {}
+    for name, code in commands.items():
+        probe = f"{code}\nimport sys\nprint(','.join(m for m in {heavy!r} if m in sys.modules), file=sys.stderr)"
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", probe], cwd=cwd, capture_output=True, text=True, check=True)
+            times.append(time.perf_counter() - start)
+        loaded = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else ""
+        results[name] = {"median_seconds": statistics.median(times), "heavy_modules": loaded.split(",") if loaded else []}
+        print(f"{name}: {statistics.median(times):.3f} сек (медиана из {repeats}), "
+              f"тяжёлые модули: {loaded or 'нет'}")
+    return results
+
+def benchmark_delay_simulation(num_routes=200, min_buses_per_route=10, scenarios=10000, workers=None,
+                               min_changeover=5, seed=0):
+    """
+    Монте-Карло моделирование задержек для назначения по участкам (2000 автобусов при параметрах
+    по умолчанию): время моделирования, число сценариев в секунду и вероятности опоздания водителя
+    на пересадку и пропуска перерыва.
+    """
+    routes = generate_random_routes(num_routes=num_routes)
+    buses = manage_buses(routes, min_buses_per_route=min_buses_per_route)
+    drivers, blocks = assign_drivers_blocks(buses, return_blocks=True)
+    result = simulate_delays(drivers, buses, scenarios=scenarios, blocks=blocks, workers=workers,
+                             seed=seed, min_changeover=min_changeover)
+    print(f"Автобусов: {len(buses)}, поездок: {result['trips']}, водителей: {result['drivers']}, "
+          f"сценариев: {scenarios}, процессов: {workers or 1}")
+    print(f"  Время: {result['elapsed']:.1f} сек ({scenarios / result['elapsed']:.0f} сценариев/сек)")
+    print(f"  Вероятность опоздания на пересадку: {result['conflict_probability']:.3f} "
+          f"(в среднем {result['expected_conflict_drivers']:.2f} водителей)")
+    print(f"  Вероятность пропуска перерыва: {result['missed_break_probability']:.3f} "
+          f"(в среднем {result['expected_missed_break_drivers']:.2f} водителей)")
+    print(f"  Нарушений в плане без задержек: пересадок {result['planned_conflicts']}, "
+          f"перерывов {result['planned_missed_breaks']}; максимальное опоздание {result['max_lateness']} мин")
+    return result
+
+def _peak_headway(buses, peak_hours=((7, 10), (17, 20))):
+    """Средний интервал отправлений с начальной остановки в часы пик (по маршрутам)."""
+    departures = {}
+    for bus in buses:
+        forward = bus.schedule.trip_bounds()[0::2]
+        departures[bus.route.route_id] = departures.get(bus.route.route_id, 0) + sum(
+            1 for trip_start, _ in forward if _in_peak(trip_start, peak_hours))
+    peak_minutes = sum(peak_end - peak_start for peak_start, peak_end in peak_hours) * 60
+    return statistics.mean(peak_minutes / count for count in departures.values() if count)
+
+def benchmark_fleet_sizing(route_counts=(10, 20, 40), buses_per_route=(5, 10), headways=(12, 20),
+                           engines=("greedy", "optimal", "blocks"), seed=0):
+    """
+    Сравнивает фиксированный парк (min_buses_per_route автобусов на маршрут весь день) с парком по спросу
+    (manage_buses(headways=...)) на конфигурациях benchmark_suite: число автобусов и поездок, средний
+    интервал в часы пик, время построения парка, число водителей и время распределения каждым алгоритмом.
+    """
+    results = []
+    for num_routes in route_counts:
+        _seed_everything(seed)
+        routes = generate_random_routes(num_routes=num_routes)
+        fleets = {f"фикс. {per_route}": lambda per_route=per_route: manage_buses(routes, min_buses_per_route=per_route)
+                  for per_route in buses_per_route}
+        fleets[f"спрос {headways[0]}/{headways[1]}"] = lambda: manage_buses(routes, headways=headways)
+        for label, build in fleets.items():
+            start = time.perf_counter()
+            buses = build()
+            build_time = time.perf_counter() - start
+            row = {"num_routes": num_routes, "fleet": label, "buses": len(buses),
+                   "trips": sum(len(bus.schedule.trip_bounds()) for bus in buses),
+                   "peak_headway": _peak_headway(buses), "build_time": build_time}
+            for engine in engines:
+                fleet = fork_fleet(buses)
+                start = time.perf_counter()
+                row[f"{engine}_drivers"] = len(BENCHMARK_ENGINES[engine](fleet, {}))
+                row[f"{engine}_time"] = time.perf_counter() - start
+            results.append(row)
+            print(f"Маршрутов: {num_routes}, парк {label}: автобусов {row['buses']}, поездок {row['trips']}, "
+                  f"интервал в пик {row['peak_headway']:.1f} мин, построение {build_time:.3f} сек")
+            print("  " + ", ".join(f"{engine}: водителей {row[f'{engine}_drivers']}, {row[f'{engine}_time']:.3f} сек"
+                                   for engine in engines))
+    return results
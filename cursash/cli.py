@@ -0,0 +1,79 @@
+"""
+Запуск из командной строки: python -m cursash.
+"""
+import argparse
+import time
+from contextlib import nullcontext
+
+from .instrumentation import INSTRUMENTATION, print_profile, profiling
+from .timetable import fork_fleet, generate_random_routes, manage_buses
+from .export import export_to_excel
+from .engines import (
+    BENCHMARK_ENGINES, ENGINE_LABELS, plot_benchmark_results, _GA_ENGINES, _seed_everything,
+    _summarize_records,
+)
+
+
+def main(profile=False, engines=("greedy", "genetic", "optimal"), export=True, plot=True):
+    """
+    profile: включить инструментирование и cProfile; сводка записывается в profile.json,
+             статистика cProfile - в profile.pstats.
+    engines: алгоритмы из BENCHMARK_ENGINES; DEAP загружается, только если среди них есть ГА.
+    export, plot: экспорт в Excel (xlsxwriter) и графики сравнения (matplotlib).
+    """
+    with profiling(json_path="profile.json", pstats_path="profile.pstats") if profile else nullcontext():
+        # Инициализация данных
+        routes = generate_random_routes(num_routes=20)
+
+        # Управление автобусами: минимум 10 автобусов на маршрут
+        buses = manage_buses(routes, min_buses_per_route=10)  # 20 маршрутов * 10 автобусов = 200 автобусов
+
+        # Один запуск каждого алгоритма на своей копии парка (чтобы водители не назначались одновременно)
+        seed = 0
+        config = {"population_size": 100, "generations": 100}
+        records = []
+        results = {}
+        for engine in engines:
+            _seed_everything(seed, engine)
+            fleet = fork_fleet(buses)
+            start = time.perf_counter()
+            drivers = BENCHMARK_ENGINES[engine](fleet, config)
+            wall_time = time.perf_counter() - start
+            results[engine] = (drivers, fleet)
+            records.append({"engine": engine, "num_routes": len(routes), "min_buses_per_route": 10,
+                            "num_buses": len(buses), "seed": seed, "wall_time": wall_time,
+                            "peak_memory_mb": None, "drivers": len(drivers),
+                            **(config if engine in _GA_ENGINES else {"population_size": None, "generations": None})})
+
+            # Вывод результатов
+            print(f"{ENGINE_LABELS[engine]} алгоритм:")
+            print(f"Количество необходимых водителей: {len(drivers)}")
+            print(f"Время выполнения: {wall_time:.4f} сек\n")
+
+        # Экспорт результатов в Excel
+        if export:
+            for engine, (drivers, fleet) in results.items():
+                export_to_excel(drivers, routes, fleet, filename=f"schedule_{engine}.xlsx")
+
+        # Графики сравнения алгоритмов; полный перебор конфигураций - benchmark_suite()
+        if plot:
+            plot_benchmark_results({"summary": _summarize_records(records)}, prefix="algorithm_comparison")
+
+    if profile:
+        report = INSTRUMENTATION.report()
+        print(f"Вызовов can_assign: {report['counters'].get('can_assign', 0)}")
+        if report["evaluations_per_second"]:
+            print(f"Оценок приспособленности в секунду: {report['evaluations_per_second']:.1f}")
+        for name, timer in sorted(report["timers"].items(), key=lambda item: -item[1]["total_seconds"]):
+            print(f"{name}: {timer['calls']} вызовов, {timer['total_seconds']:.4f} сек")
+        print_profile("profile.pstats", limit=15)
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m cursash", description="Распределение водителей по автобусам городских маршрутов")
+    parser.add_argument("--engines", nargs="+", default=["greedy", "genetic", "optimal"],
+                        choices=sorted(BENCHMARK_ENGINES), help="алгоритмы распределения")
+    parser.add_argument("--no-export", action="store_true", help="не экспортировать результаты в Excel")
+    parser.add_argument("--no-plot", action="store_true", help="не строить графики сравнения")
+    parser.add_argument("--profile", action="store_true", help="инструментирование и cProfile")
+    args = parser.parse_args(argv)
+    main(profile=args.profile, engines=args.engines, export=not args.no_export, plot=not args.no_plot)
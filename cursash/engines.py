@@ -0,0 +1,133 @@
+"""
+Реестр алгоритмов распределения, запуск с замером времени и памяти, сводка и графики.
+ГА и matplotlib загружаются только при использовании.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+
+from .timetable import fork_fleet
+from .assignment import assign_drivers_blocks, assign_drivers_greedy, assign_drivers_optimal
+
+
+def _genetic_engine(buses, config):
+    # NumPy и DEAP загружаются только при первом запуске ГА
+    from .genetic import genetic_driver_assignment
+    return genetic_driver_assignment(buses, population_size=config["population_size"],
+                                     generations=config["generations"])
+
+# Алгоритмы распределения для набора бенчмарков: имя -> функция(автобусы, конфигурация) -> водители
+BENCHMARK_ENGINES = {
+    "greedy": lambda buses, config: assign_drivers_greedy(buses, initial_driver_count=10),
+    "optimal": lambda buses, config: assign_drivers_optimal(buses),
+    "blocks": lambda buses, config: assign_drivers_blocks(buses),
+    "genetic": _genetic_engine,
+}
+
+# Алгоритмы, результат которых зависит от параметров ГА
+_GA_ENGINES = {"genetic"}
+
+ENGINE_LABELS = {"greedy": "Жадный", "optimal": "Разбиение интервалов", "genetic": "Генетический", "blocks": "По участкам"}
+
+def _seed_everything(seed, engine=None):
+    """
+    Фиксирует генераторы случайных чисел перед запуском алгоритма engine.
+    Генератор NumPy используют только алгоритмы из _GA_ENGINES, поэтому для остальных NumPy не загружается.
+    """
+    random.seed(seed)
+    if engine in _GA_ENGINES:
+        import numpy as np
+        np.random.seed(seed)
+
+def _run_engine(engine, buses, config, seed, trace_memory=False):
+    """
+    Запускает алгоритм на копии парка. Возвращает (водители, время в секундах, пик памяти в МБ или None).
+    Пик памяти измеряется отдельным запуском под tracemalloc, чтобы трассировка не искажала время.
+    """
+    _seed_everything(seed, engine)
+    fleet = fork_fleet(buses)
+    start = time.perf_counter()
+    drivers = BENCHMARK_ENGINES[engine](fleet, config)
+    wall_time = time.perf_counter() - start
+
+    peak_mb = None
+    if trace_memory:
+        _seed_everything(seed, engine)
+        fleet = fork_fleet(buses)
+        tracemalloc.start()
+        BENCHMARK_ENGINES[engine](fleet, config)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / 2**20
+    return drivers, wall_time, peak_mb
+
+def _summarize_records(records):
+    """Среднее и стандартное отклонение по повторам с разными seed для каждой конфигурации."""
+    groups = {}
+    for record in records:
+        key = (record["engine"], record["num_routes"], record["min_buses_per_route"],
+               record["population_size"], record["generations"])
+        groups.setdefault(key, []).append(record)
+    summary = []
+    for (engine, num_routes, buses_per_route, population_size, generations), group in groups.items():
+        times = [record["wall_time"] for record in group]
+        memory = [record["peak_memory_mb"] for record in group if record["peak_memory_mb"] is not None]
+        summary.append({
+            "engine": engine,
+            "num_routes": num_routes,
+            "min_buses_per_route": buses_per_route,
+            "population_size": population_size,
+            "generations": generations,
+            "num_buses": statistics.mean(record["num_buses"] for record in group),
+            "runs": len(group),
+            "wall_time_mean": statistics.mean(times),
+            "wall_time_stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+            "peak_memory_mb": max(memory) if memory else None,
+            "drivers_mean": statistics.mean(record["drivers"] for record in group),
+        })
+    return summary
+
+def plot_benchmark_results(results, prefix="benchmark", show=False):
+    """
+    Строит графики масштабирования по сводке benchmark_suite: время, пик памяти и число водителей
+    в зависимости от размера парка. Для ГА строится отдельная линия на каждую пару (популяция, поколения).
+    """
+    metrics = [("wall_time_mean", "Время выполнения (сек)", "time"),
+               ("peak_memory_mb", "Пик памяти (МБ)", "memory"),
+               ("drivers_mean", "Количество водителей", "drivers")]
+    series = {}
+    for row in results["summary"]:
+        label = ENGINE_LABELS.get(row["engine"], row["engine"])
+        if row["engine"] in _GA_ENGINES:
+            label += f" (поп. {row['population_size']}, пок. {row['generations']})"
+        series.setdefault(label, []).append(row)
+
+    import matplotlib.pyplot as plt
+
+    filenames = []
+    for key, ylabel, suffix in metrics:
+        if all(row[key] is None for row in results["summary"]):
+            continue
+        plt.figure(figsize=(8, 6))
+        for label, rows in series.items():
+            # Усреднение по конфигурациям с одинаковым размером парка
+            by_size = {}
+            for row in rows:
+                if row[key] is not None:
+                    by_size.setdefault(row["num_buses"], []).append(row[key])
+            if not by_size:
+                continue
+            sizes = sorted(by_size)
+            plt.plot(sizes, [statistics.mean(by_size[size]) for size in sizes], marker="o", label=label)
+        plt.xlabel("Количество автобусов")
+        plt.ylabel(ylabel)
+        plt.title("Масштабирование алгоритмов распределения водителей")
+        plt.legend()
+        filename = f"{prefix}_{suffix}.png"
+        plt.savefig(filename)
+        filenames.append(filename)
+        if show:
+            plt.show()
+        plt.close()
+    return filenames
@@ -0,0 +1,471 @@
+"""
+Экспорт и загрузка результатов: Excel (xlsxwriter) и колоночные форматы (Parquet/CSV).
+xlsxwriter и pyarrow загружаются только при соответствующем экспорте.
+"""
+import csv
+import functools
+import os
+
+from .instrumentation import instrumented
+from .models import Bus, Driver, intern_stop, minutes_to_time, Route, Schedule, ScheduleView, Stop
+from .assignment import bus_trip_intervals, _assign_bus
+
+
+def _bus_id(bus):
+    # Жадный алгоритм хранит в assigned_buses объекты Bus, генетический - их ID
+    return bus.bus_id if isinstance(bus, Bus) else bus
+
+def assigned_bus_ids(driver):
+    """ID автобусов водителя в порядке назначения (assigned_buses может содержать объекты Bus или ID)."""
+    return [_bus_id(bus) for bus in driver.assigned_buses]
+
+def _export_indexes(drivers, buses):
+    """Индексы ID -> объект для экспорта без вложенных циклов по всем водителям и автобусам."""
+    driver_by_id = {driver.driver_id: driver for driver in drivers}
+    bus_by_id = {bus.bus_id: bus for bus in buses}
+    buses_by_route = {}
+    for bus in buses:
+        buses_by_route.setdefault(bus.route.route_id, []).append(bus.bus_id)
+    return driver_by_id, bus_by_id, buses_by_route
+
+@instrumented("export_to_excel")
+def export_to_excel(drivers, routes, buses, filename="schedule.xlsx"):
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(filename)
+    driver_by_id, bus_by_id, buses_by_route = _export_indexes(drivers, buses)
+
+    # Лист водителей
+    driver_sheet = workbook.add_worksheet("Водители")
+    driver_sheet.write(0, 0, "ID водителя")
+    driver_sheet.write(0, 1, "Тип водителя")
+    driver_sheet.write(0, 2, "Назначенные автобусы")
+    driver_sheet.write(0, 3, "График работы")
+    driver_sheet.write(0, 4, "График отдыха")
+
+    for i, driver in enumerate(drivers, start=1):
+        driver_sheet.write(i, 0, driver.driver_id)
+        driver_sheet.write(i, 1, driver.driver_type)
+        driver_sheet.write(i, 2, ", ".join(map(str, assigned_bus_ids(driver))))
+
+        # Форматирование рабочих периодов
+        working_periods = ", ".join([f"{minutes_to_time(shift.work[0])}-{minutes_to_time(shift.work[1])}" for shift in driver.shifts if shift.work[0] != 0 and shift.work[1] != 0])
+        driver_sheet.write(i, 3, working_periods)
+
+        # Форматирование перерывов
+        resting_periods = ", ".join([f"{minutes_to_time(rest[0])}-{minutes_to_time(rest[1])}" for shift in driver.shifts for rest in shift.rest])
+        driver_sheet.write(i, 4, resting_periods)
+
+    # Лист маршрутов
+    route_sheet = workbook.add_worksheet("Маршруты")
+    route_sheet.write(0, 0, "ID маршрута")
+    route_sheet.write(0, 1, "Остановки")
+    route_sheet.write(0, 2, "Расписание")
+    route_sheet.write(0, 3, "Назначенные автобусы")
+
+    for i, route in enumerate(routes, start=1):
+        route_sheet.write(i, 0, route.route_id)
+        route_sheet.write(i, 1, ", ".join([stop.name for stop in route.stops]))
+        # Форматирование расписания: каждая поездка в новой строке
+        formatted_schedule = ""
+        for trip in route.schedule:
+            trip_str = ", ".join([f"{stop} {minutes_to_time(minute)}" for stop, minute in trip])
+            formatted_schedule += trip_str + "\n"
+        route_sheet.write(i, 2, formatted_schedule.strip())
+        # Список автобусов на маршруте
+        buses_on_route = buses_by_route.get(route.route_id, [])
+        route_sheet.write(i, 3, ", ".join(map(str, buses_on_route)))
+
+    # Лист автобусов
+    bus_sheet = workbook.add_worksheet("Автобусы")
+    bus_sheet.write(0, 0, "ID автобуса")
+    bus_sheet.write(0, 1, "ID маршрута")
+    bus_sheet.write(0, 2, "Назначенные водители")
+    bus_sheet.write(0, 3, "Расписание")
+
+    for i, bus in enumerate(buses, start=1):
+        bus_sheet.write(i, 0, bus.bus_id)
+        bus_sheet.write(i, 1, bus.route.route_id)
+        assigned_driver_ids = [driver_id for driver_id in bus.assigned_drivers if driver_id in driver_by_id]
+        bus_sheet.write(i, 2, ", ".join(map(str, assigned_driver_ids)))
+        # Форматирование расписания: каждая поездка в новой строке
+        formatted_bus_schedule = ""
+        for trip in bus.schedule:
+            trip_str = ", ".join([f"{stop} {minutes_to_time(minute)}" for stop, minute in trip])
+            formatted_bus_schedule += trip_str + "\n"
+        bus_sheet.write(i, 3, formatted_bus_schedule.strip())
+
+    # Лист остановок
+    stops_sheet = workbook.add_worksheet("Остановки")
+    stops_sheet.write(0, 0, "ID маршрута")
+    stops_sheet.write(0, 1, "Остановка")
+    stops_sheet.write(0, 2, "ID водителя")
+    stops_sheet.write(0, 3, "ID автобуса")
+    stops_sheet.write(0, 4, "Время прибытия")
+
+    # Инициализируем счетчик строк
+    current_row = 1
+    for bus in buses:
+        for trip in bus.schedule:
+            end_flag = 0
+            route_id = bus.route.route_id
+            drivers_list = [driver_by_id[driver_id] for driver_id in bus.assigned_drivers if driver_id in driver_by_id]
+            driver_ids = [driver.driver_id for driver in drivers_list]
+            # Обычно один водитель на автобус, но на всякий случай берем первого
+            if driver_ids:
+              driver_id = driver_ids[0]
+              driver = drivers_list[0]
+            else:
+              continue
+            bus_id = bus.bus_id
+            for stop, minute in trip:
+                for shift in driver.shifts:
+                  if shift.work[0] < minute < shift.work[1]:
+                    stops_sheet.write(current_row, 0, route_id)
+                    stops_sheet.write(current_row, 1, stop)
+                    stops_sheet.write(current_row, 2, driver_id)
+                    stops_sheet.write(current_row, 3, bus_id)
+                    stops_sheet.write(current_row, 4, minutes_to_time(minute))
+                    current_row += 1
+                    end_flag = 1
+                    break
+            if end_flag == 1:
+              break
+
+    # Лист расписания водителей
+    driver_schedule_sheet = workbook.add_worksheet("Расписание водителей")
+    driver_schedule_sheet.write(0, 0, "ID водителя")
+    driver_schedule_sheet.write(0, 1, "Работает/отдыхает")
+    driver_schedule_sheet.write(0, 2, "Начало смены")
+    driver_schedule_sheet.write(0, 3, "Конец смены")
+    driver_schedule_sheet.write(0, 4, "ID автобуса(если работает)")
+
+    current_row = 1
+    # Функция для поиска автобуса, которому соответствует рабочий интервал
+    def find_bus_for_interval(driver, work_start, work_end):
+        # Проверяем все автобусы, назначенные водителю
+        for bus_id in map(_bus_id, driver.assigned_buses):
+            bus = bus_by_id.get(bus_id)
+            if bus is None:
+                continue
+            for trip_start_min, trip_end_min in bus.schedule.trip_bounds():
+                # Проверяем пересечение временного интервала рабочей смены с поездкой
+                # Если поездка пересекается с рабочим интервалом, считаем, что водитель работает на этом автобусе
+                if (trip_start_min <= work_end and trip_end_min >= work_start):
+                    return bus.bus_id
+        return "отдыхает"
+
+    for driver in drivers:
+        for shift in driver.shifts:
+            work_start, work_end = shift.work
+            # Если рабочий интервал определён
+            if work_start != 0 and work_end != 0:
+                # Рабочий интервал
+                driver_schedule_sheet.write(current_row, 0, driver.driver_id)
+                driver_schedule_sheet.write(current_row, 1, "Работает")
+                driver_schedule_sheet.write(current_row, 2, minutes_to_time(work_start))
+                driver_schedule_sheet.write(current_row, 3, minutes_to_time(work_end))
+
+                # Поиск автобуса для этого интервала
+                bus_id = find_bus_for_interval(driver, work_start, work_end)
+                driver_schedule_sheet.write(current_row, 4, bus_id)
+                current_row += 1
+
+            # Перерывы
+            for rest in shift.rest:
+                rest_start, rest_end = rest
+                driver_schedule_sheet.write(current_row, 0, driver.driver_id)
+                driver_schedule_sheet.write(current_row, 1, "Отдыхает")
+                driver_schedule_sheet.write(current_row, 2, minutes_to_time(rest_start))
+                driver_schedule_sheet.write(current_row, 3, minutes_to_time(rest_end))
+                # В этот период водитель не работает, пишем "отдыхает"
+                driver_schedule_sheet.write(current_row, 4, "Отдыхает")
+                current_row += 1
+
+    workbook.close()
+
+# Ограничение числа строк на листе Excel
+EXCEL_MAX_ROWS = 1048576
+
+def _write_sheet_rows(workbook, name, header, rows):
+    """
+    Записывает строки из генератора на лист по порядку (требование режима constant_memory).
+    При превышении лимита строк Excel продолжает запись на листе "name (2)" и т.д.
+    Возвращает число записанных строк данных.
+    """
+    sheet = workbook.add_worksheet(name)
+    sheet.write_row(0, 0, header)
+    row_idx = 1
+    part = 1
+    written = 0
+    for row in rows:
+        if row_idx == EXCEL_MAX_ROWS:
+            part += 1
+            sheet = workbook.add_worksheet(f"{name} ({part})")
+            sheet.write_row(0, 0, header)
+            row_idx = 1
+        sheet.write_row(row_idx, 0, row)
+        row_idx += 1
+        written += 1
+    return written
+
+def _driver_rows(drivers):
+    for driver in drivers:
+        yield (driver.driver_id, driver.driver_type,
+               ", ".join(map(str, assigned_bus_ids(driver))),
+               ", ".join(f"{minutes_to_time(shift.work[0])}-{minutes_to_time(shift.work[1])}"
+                         for shift in driver.shifts if shift.work[0] != 0 and shift.work[1] != 0),
+               ", ".join(f"{minutes_to_time(rest[0])}-{minutes_to_time(rest[1])}"
+                         for shift in driver.shifts for rest in shift.rest))
+
+def _route_rows(routes, buses_by_route):
+    for route in routes:
+        yield (route.route_id, ", ".join(stop.name for stop in route.stops),
+               ", ".join(map(str, buses_by_route.get(route.route_id, []))))
+
+def _route_timetable_rows(routes):
+    for route in routes:
+        for trip_idx, trip in enumerate(route.schedule, start=1):
+            for stop, minute in trip:
+                yield (route.route_id, trip_idx, stop, minutes_to_time(minute))
+
+def _bus_rows(buses, driver_by_id):
+    for bus in buses:
+        yield (bus.bus_id, bus.route.route_id,
+               ", ".join(str(driver_id) for driver_id in bus.assigned_drivers if driver_id in driver_by_id))
+
+def _stop_rows(buses, driver_by_id):
+    # Одна строка на каждую остановку каждой поездки; водитель указывается, если остановка в его смене
+    for bus in buses:
+        driver = next((driver_by_id[driver_id] for driver_id in bus.assigned_drivers if driver_id in driver_by_id), None)
+        for trip_idx, trip in enumerate(bus.schedule, start=1):
+            for stop, minute in trip:
+                on_shift = driver is not None and any(shift.work[0] < minute < shift.work[1] for shift in driver.shifts)
+                yield (bus.route.route_id, stop, driver.driver_id if on_shift else "", bus.bus_id,
+                       trip_idx, minutes_to_time(minute))
+
+def _driver_schedule_rows(drivers, bus_by_id):
+    for driver in drivers:
+        buses_of_driver = [bus_by_id[bus_id] for bus_id in map(_bus_id, driver.assigned_buses) if bus_id in bus_by_id]
+        for shift in driver.shifts:
+            work_start, work_end = shift.work
+            if work_start != 0 and work_end != 0:
+                bus_id = next((bus.bus_id for bus in buses_of_driver
+                               for trip_start, trip_end in bus.schedule.trip_bounds()
+                               if trip_start <= work_end and trip_end >= work_start), "отдыхает")
+                yield (driver.driver_id, "Работает", minutes_to_time(work_start), minutes_to_time(work_end), bus_id)
+            for rest_start, rest_end in shift.rest:
+                yield (driver.driver_id, "Отдыхает", minutes_to_time(rest_start), minutes_to_time(rest_end), "Отдыхает")
+
+@instrumented("export_to_excel_streaming")
+def export_to_excel_streaming(drivers, routes, buses, filename="schedule.xlsx"):
+    """
+    Потоковый экспорт в Excel с постоянным расходом памяти (режим constant_memory xlsxwriter).
+    Расписания пишутся по одной строке на остановку, строки формируются генераторами.
+    Возвращает общее число записанных строк данных.
+    """
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(filename, {"constant_memory": True})
+    driver_by_id, bus_by_id, buses_by_route = _export_indexes(drivers, buses)
+    rows = 0
+    rows += _write_sheet_rows(workbook, "Водители",
+                              ["ID водителя", "Тип водителя", "Назначенные автобусы", "График работы", "График отдыха"],
+                              _driver_rows(drivers))
+    rows += _write_sheet_rows(workbook, "Маршруты", ["ID маршрута", "Остановки", "Назначенные автобусы"],
+                              _route_rows(routes, buses_by_route))
+    rows += _write_sheet_rows(workbook, "Расписание маршрутов", ["ID маршрута", "Поездка", "Остановка", "Время прибытия"],
+                              _route_timetable_rows(routes))
+    rows += _write_sheet_rows(workbook, "Автобусы", ["ID автобуса", "ID маршрута", "Назначенные водители"],
+                              _bus_rows(buses, driver_by_id))
+    rows += _write_sheet_rows(workbook, "Остановки",
+                              ["ID маршрута", "Остановка", "ID водителя", "ID автобуса", "Поездка", "Время прибытия"],
+                              _stop_rows(buses, driver_by_id))
+    rows += _write_sheet_rows(workbook, "Расписание водителей",
+                              ["ID водителя", "Работает/отдыхает", "Начало смены", "Конец смены", "ID автобуса(если работает)"],
+                              _driver_schedule_rows(drivers, bus_by_id))
+    workbook.close()
+    return rows
+
+# Схемы колоночных таблиц: имя таблицы -> список (столбец, тип)
+COLUMNAR_TABLES = {
+    "routes": [("route_id", int), ("stop_seq", int), ("stop", str), ("average_time_between_stops", int),
+               ("peak_variation", int), ("offpeak_variation", int)],
+    "stops": [("bus_id", int), ("route_id", int), ("trip", int), ("stop_seq", int), ("stop", str), ("minute", int)],
+    "buses": [("bus_id", int), ("route_id", int)],
+    "drivers": [("driver_id", int), ("driver_type", int), ("bus_id", int)],
+    "driver_schedule": [("driver_id", int), ("shift", int), ("kind", str), ("start", int), ("end", int)],
+}
+
+def _columnar_rows(drivers, routes, buses):
+    """Генераторы строк для каждой колоночной таблицы."""
+    def route_rows():
+        for route in routes:
+            for seq, stop in enumerate(route.stops):
+                yield (route.route_id, seq, stop.name, route.average_time_between_stops,
+                       route.peak_variation, route.offpeak_variation)
+
+    def stop_rows():
+        for bus in buses:
+            for trip_idx, trip in enumerate(bus.schedule):
+                for seq, (stop, minute) in enumerate(trip):
+                    yield (bus.bus_id, bus.route.route_id, trip_idx, seq, stop, minute)
+
+    def driver_rows():
+        for driver in drivers:
+            if not driver.assigned_buses:
+                yield (driver.driver_id, driver.driver_type, -1)
+            for bus in driver.assigned_buses:
+                yield (driver.driver_id, driver.driver_type, _bus_id(bus))
+
+    def driver_schedule_rows():
+        for driver in drivers:
+            for shift_idx, shift in enumerate(driver.shifts):
+                yield (driver.driver_id, shift_idx, "work", shift.work[0], shift.work[1])
+                for rest_start, rest_end in shift.rest:
+                    yield (driver.driver_id, shift_idx, "rest", rest_start, rest_end)
+
+    return {
+        "routes": route_rows(),
+        "stops": stop_rows(),
+        "buses": ((bus.bus_id, bus.route.route_id) for bus in buses),
+        "drivers": driver_rows(),
+        "driver_schedule": driver_schedule_rows(),
+    }
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+@functools.lru_cache(maxsize=None)
+def _pyarrow():
+    """Загружает pyarrow при первом колоночном экспорте; (None, None), если он не установлен."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:  # Без pyarrow колоночный экспорт использует CSV
+        return None, None
+    return pa, pq
+
+@instrumented("export_columnar")
+def export_columnar(drivers, routes, buses, directory="schedule_data", fmt="auto", chunk_size=100000):
+    """
+    Колоночный экспорт таблиц routes, stops, buses, drivers и driver_schedule.
+    fmt: "parquet" (нужен pyarrow), "csv" или "auto" - Parquet при наличии pyarrow, иначе CSV.
+    Строки пишутся порциями по chunk_size (группы строк Parquet / блоки CSV).
+    Возвращает число записанных строк.
+    """
+    pa, pq = _pyarrow()
+    if fmt == "auto":
+        fmt = "parquet" if pq is not None else "csv"
+    if fmt == "parquet" and pq is None:
+        raise ImportError("Для экспорта в Parquet требуется pyarrow")
+    os.makedirs(directory, exist_ok=True)
+    total = 0
+    for table, rows in _columnar_rows(drivers, routes, buses).items():
+        columns = COLUMNAR_TABLES[table]
+        names = [name for name, _ in columns]
+        if fmt == "parquet":
+            schema = pa.schema([(name, pa.string() if kind is str else pa.int64()) for name, kind in columns])
+            with pq.ParquetWriter(os.path.join(directory, f"{table}.parquet"), schema) as writer:
+                empty = True
+                for chunk in _chunks(rows, chunk_size):
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)], schema=schema))
+                    total += len(chunk)
+                    empty = False
+                if empty:
+                    writer.write_table(schema.empty_table())
+        else:
+            with open(os.path.join(directory, f"{table}.csv"), "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(names)
+                for chunk in _chunks(rows, chunk_size):
+                    writer.writerows(chunk)
+                    total += len(chunk)
+    return total
+
+def _read_columnar_table(directory, table):
+    """Читает таблицу в виде списка кортежей, выбирая Parquet или CSV по наличию файла."""
+    columns = COLUMNAR_TABLES[table]
+    parquet_path = os.path.join(directory, f"{table}.parquet")
+    if os.path.exists(parquet_path):
+        _, pq = _pyarrow()
+        if pq is None:
+            raise ImportError("Для чтения Parquet требуется pyarrow")
+        data = pq.read_table(parquet_path).to_pydict()
+        return list(zip(*(data[name] for name, _ in columns)))
+    with open(os.path.join(directory, f"{table}.csv"), newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [tuple(kind(value) for (_, kind), value in zip(columns, row)) for row in reader]
+
+def load_columnar(directory="schedule_data"):
+    """
+    Восстанавливает маршруты, автобусы и водителей из колоночных таблиц без повторной генерации расписаний.
+    Расписание маршрута берётся у его первого автобуса; занятость водителей восстанавливается,
+    поэтому результат можно сразу передавать в алгоритмы распределения.
+    Возвращает (drivers, routes, buses).
+    """
+    routes_by_id = {}
+    for route_id, _, stop, average_time, peak_variation, offpeak_variation in _read_columnar_table(directory, "routes"):
+        route = routes_by_id.get(route_id)
+        if route is None:
+            route = Route(route_id=route_id, stops=[], average_time_between_stops=average_time,
+                          peak_duration_variation=peak_variation, offpeak_duration_variation=offpeak_variation)
+            routes_by_id[route_id] = route
+        route.stops.append(Stop(name=stop))
+
+    buses = []
+    bus_by_id = {}
+    for bus_id, route_id in _read_columnar_table(directory, "buses"):
+        bus = Bus(bus_id=bus_id, route=routes_by_id[route_id])
+        buses.append(bus)
+        bus_by_id[bus_id] = bus
+
+    # Строки остановок записаны по автобусам и поездкам подряд
+    schedules = {}
+    current_key = None
+    trip_stops, trip_times = [], []
+    for bus_id, _, trip_idx, _, stop, minute in _read_columnar_table(directory, "stops"):
+        if (bus_id, trip_idx) != current_key:
+            if trip_stops:
+                schedules.setdefault(current_key[0], Schedule()).append_trip(trip_stops, trip_times)
+            current_key = (bus_id, trip_idx)
+            trip_stops, trip_times = [], []
+        trip_stops.append(intern_stop(stop))
+        trip_times.append(minute)
+    if trip_stops:
+        schedules.setdefault(current_key[0], Schedule()).append_trip(trip_stops, trip_times)
+    for bus in buses:
+        bus.schedule = ScheduleView(schedules.get(bus.bus_id, Schedule()))
+        if len(bus.route.schedule) == 0:
+            bus.route.schedule = bus.schedule
+
+    drivers_by_id = {}
+    for driver_id, shift_idx, kind, start, end in _read_columnar_table(directory, "driver_schedule"):
+        driver = drivers_by_id.get(driver_id)
+        if driver is None:
+            driver = drivers_by_id[driver_id] = Driver(driver_id=driver_id, driver_type=0)
+        if kind == "work":
+            driver.shifts.append(Driver.Shift(work=(start, end), rests=[]))
+        else:
+            driver.shifts[shift_idx].rest.append((start, end))
+            driver.shifts[shift_idx].rest_index.add(start, end)
+
+    drivers = []
+    for driver_id, driver_type, bus_id in _read_columnar_table(directory, "drivers"):
+        driver = drivers_by_id.get(driver_id)
+        if driver is None:
+            driver = drivers_by_id[driver_id] = Driver(driver_id=driver_id, driver_type=driver_type)
+        if not drivers or drivers[-1] is not driver:
+            driver.driver_type = driver_type
+            drivers.append(driver)
+        if bus_id in bus_by_id:
+            bus = bus_by_id[bus_id]
+            _assign_bus(driver, bus, bus_trip_intervals(bus))
+    return drivers, list(routes_by_id.values()), buses
@@ -0,0 +1,1006 @@
+"""
+Генетический алгоритм распределения водителей (NumPy; DEAP загружается при первом запуске ГА).
+"""
+import functools
+import hashlib
+import os
+import pickle
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .instrumentation import INSTRUMENTATION, instrumented
+from .models import IntervalSet, SHIFT_TEMPLATES
+from .assignment import _busy_interval, _create_driver
+
+
+class TripTable:
+    """
+    Предварительно вычисленная таблица поездок всех автобусов.
+    bus_idx: индекс автобуса в списке buses, start/end: начало и конец поездки в минутах.
+    """
+    def __init__(self, bus_idx, start, end, num_buses):
+        self.bus_idx = bus_idx
+        self.start = start
+        self.end = end
+        self.num_buses = num_buses
+
+def build_trip_table(buses):
+    """
+    Строит таблицу поездок (индекс автобуса, минута начала, минута окончания) один раз за запуск.
+    """
+    bus_idx, starts, ends = [], [], []
+    for idx, bus in enumerate(buses):
+        for trip_start, trip_end in bus.schedule.trip_bounds():
+            bus_idx.append(idx)
+            starts.append(trip_start)
+            ends.append(trip_end)
+    return TripTable(
+        bus_idx=np.array(bus_idx, dtype=np.int64),
+        start=np.array(starts, dtype=np.int64),
+        end=np.array(ends, dtype=np.int64),
+        num_buses=len(buses)
+    )
+
+def driver_violations(trips_sorted, driver_type):
+    """
+    Число нарушений правил шаблона смены для одного водителя по его поездкам,
+    отсортированным по началу.
+    """
+    return SHIFT_TEMPLATES[driver_type].violations(trips_sorted)
+
+@instrumented("eval_individual")
+def eval_individual(individual, buses, driver_types):
+    """
+    Оценка одной особи (исходная построчная логика) при фиксированных типах водителей.
+    driver_types[driver] задаёт тип водителя для каждого номера водителя в генотипе.
+    """
+    driver_assignments = {}
+    penalty = 0
+    for bus_idx, driver in enumerate(individual):
+        if driver not in driver_assignments:
+            driver_assignments[driver] = []
+        driver_assignments[driver].append(buses[bus_idx])
+
+    num_drivers = len(driver_assignments)
+
+    # Проверка на пересечения расписаний и перерывы
+    for driver, assigned_buses in driver_assignments.items():
+        trips = []
+        for bus in assigned_buses:
+            trips.extend(bus.schedule.trip_bounds())
+        # Сортировка поездок по времени начала
+        trips_sorted = sorted(trips, key=lambda x: x[0])
+        penalty += 1000 * driver_violations(trips_sorted, driver_types[driver])
+
+    return (num_drivers + penalty, )
+
+def count_drivers(genes):
+    """Количество водителей каждой особи: число различных номеров в строке генотипа."""
+    sorted_genes = np.sort(genes, axis=1)
+    return np.count_nonzero(np.diff(sorted_genes, axis=1), axis=1) + (genes.shape[1] > 0)
+
+def _template_rule_arrays():
+    """Параметры правил шаблонов смен в массивах, индексируемых типом водителя."""
+    size = max(SHIFT_TEMPLATES) + 1
+    rules = {
+        "has_window": np.zeros(size, dtype=bool),
+        "window_start": np.zeros(size, dtype=np.int64),
+        "window_end": np.full(size, -1, dtype=np.int64),
+        "max_continuous": np.zeros(size, dtype=np.int64),
+        "min_break": np.zeros(size, dtype=np.int64),
+    }
+    for driver_type, template in SHIFT_TEMPLATES.items():
+        if template.break_window is not None:
+            rules["has_window"][driver_type] = True
+            rules["window_start"][driver_type], rules["window_end"][driver_type] = template.break_window
+        if template.max_continuous is not None:
+            rules["max_continuous"][driver_type] = template.max_continuous
+            rules["min_break"][driver_type] = template.min_break
+    return rules
+
+def group_violations(population, trip_table, driver_types, slot_mask=None):
+    """
+    Число нарушений перерывов для каждой пары (особь, номер водителя).
+    slot_mask: матрица (число особей x число номеров водителей); если задана, считаются только
+    отмеченные водители и их поездки (для пересчёта части водителей).
+    Возвращает матрицу (число особей x число номеров водителей).
+    """
+    genes = np.asarray(population, dtype=np.int64)
+    if genes.ndim == 1:
+        genes = genes[None, :]
+    driver_types = np.asarray(driver_types)
+    num_individuals = genes.shape[0]
+    num_slots = len(driver_types)
+
+    # Группа = (особь, водитель); номер группы одинаков для всех автобусов водителя
+    bus_group = genes + (np.arange(num_individuals) * num_slots)[:, None]
+    num_groups = num_individuals * num_slots
+    group_type = np.tile(driver_types, num_individuals)
+    has_bus = np.zeros(num_groups, dtype=bool)
+    has_bus[bus_group.ravel()] = True
+
+    num_trips = len(trip_table.start)
+    trip_group = bus_group[:, trip_table.bus_idx].ravel()
+    starts = np.tile(trip_table.start, num_individuals)
+    ends = np.tile(trip_table.end, num_individuals)
+    trip_order = np.tile(np.arange(num_trips), num_individuals)
+    if slot_mask is not None:
+        slot_mask = np.asarray(slot_mask, dtype=bool).ravel()
+        has_bus &= slot_mask
+        selected = slot_mask[trip_group]
+        trip_group, starts, ends, trip_order = trip_group[selected], starts[selected], ends[selected], trip_order[selected]
+
+    rules = _template_rule_arrays()
+
+    # Обеденное окно: штраф, если ни одна поездка водителя не касается окна его шаблона
+    trip_type = group_type[trip_group]
+    window_start, window_end = rules["window_start"][trip_type], rules["window_end"][trip_type]
+    lunch = ((starts >= window_start) & (starts <= window_end)) | ((ends >= window_start) & (ends <= window_end))
+    has_lunch = np.zeros(num_groups, dtype=bool)
+    has_lunch[trip_group[lunch]] = True
+    violations = (has_bus & rules["has_window"][group_type] & ~has_lunch).astype(np.int64)
+
+    # Непрерывное вождение: накопление работы по отсортированным поездкам каждой группы
+    continuous = rules["max_continuous"][trip_type] > 0
+    if np.any(continuous):
+        group = trip_group[continuous]
+        trip_start = starts[continuous]
+        trip_end = ends[continuous]
+        trip_order = trip_order[continuous]
+        # Устойчивая сортировка по (группа, начало поездки, исходный порядок)
+        order = np.lexsort((trip_order, trip_start, group))
+        group, trip_start, trip_end = group[order], trip_start[order], trip_end[order]
+
+        first = np.ones(len(group), dtype=bool)
+        first[1:] = group[1:] != group[:-1]
+        group_begin = np.flatnonzero(first)
+        group_len = np.diff(np.append(group_begin, len(group)))
+        # Группы по убыванию длины: на k-м шаге активные группы образуют префикс
+        by_len = np.argsort(-group_len, kind="stable")
+        group_begin, group_len = group_begin[by_len], group_len[by_len]
+        group_ids = group[group_begin]
+        active_counts = np.searchsorted(-group_len, -np.arange(group_len[0]), side="left")
+        limit = rules["max_continuous"][group_type[group_ids]]
+        min_break = rules["min_break"][group_type[group_ids]]
+
+        work = np.zeros(len(group_begin), dtype=np.int64)
+        last_end = np.zeros(len(group_begin), dtype=np.int64)
+        exceeded = np.zeros(len(group_begin), dtype=np.int64)
+        for k, active in enumerate(active_counts):
+            pos = group_begin[:active] + k
+            cur_start, cur_end = trip_start[pos], trip_end[pos]
+            cur_work = work[:active]
+            if k:
+                prev_end = last_end[:active]
+                # Перерыв не короче min_break обнуляет накопленное время работы
+                cur_work = np.where((prev_end != 0) & (cur_start - prev_end >= min_break[:active]), 0, cur_work)
+            cur_work = cur_work + (cur_end - cur_start)
+            over = cur_work > limit[:active]
+            exceeded[:active] += over
+            cur_work[over] = 0
+            work[:active] = cur_work
+            last_end[:active] = cur_end
+        violations[group_ids] += exceeded
+
+    return violations.reshape(num_individuals, num_slots)
+
+def evaluate_population(population, trip_table, driver_types):
+    """
+    Пакетная оценка всей популяции за один проход.
+    population: матрица (число особей x число автобусов) с номерами водителей.
+    driver_types: массив типов водителей (ключей SHIFT_TEMPLATES) для каждого номера водителя.
+    Возвращает массив значений приспособленности, совпадающих с eval_individual.
+    """
+    genes = np.asarray(population, dtype=np.int64)
+    if genes.ndim == 1:
+        genes = genes[None, :]
+    violations = group_violations(genes, trip_table, driver_types)
+    return (count_drivers(genes) + 1000 * violations.sum(axis=1)).astype(float)
+
+def _bus_spans(trip_table):
+    """
+    Начало первой поездки, конец последней поездки (без свёртки в сутки) и суммарное время
+    вождения каждого автобуса; вычисляется один раз за запуск.
+    """
+    num_buses = trip_table.num_buses
+    bus_idx = trip_table.bus_idx
+    duration = (trip_table.end - trip_table.start) % 1440
+    driving = np.bincount(bus_idx, weights=duration, minlength=num_buses).astype(np.int64)
+    # Стоянки между соседними поездками одного автобуса
+    same_bus = bus_idx[1:] == bus_idx[:-1]
+    layover = (trip_table.start[1:] - trip_table.end[:-1]) % 1440
+    layovers = np.bincount(bus_idx[1:][same_bus], weights=layover[same_bus], minlength=num_buses).astype(np.int64)
+    begin = np.zeros(num_buses, dtype=np.int64)
+    first = np.ones(len(bus_idx), dtype=bool)
+    first[1:] = ~same_bus
+    begin[bus_idx[first]] = trip_table.start[first]
+    return begin, begin + driving + layovers, driving
+
+def idle_time(population, trip_table, bus_spans=None):
+    """
+    Суммарный простой водителей каждой особи: для каждого водителя время от начала первой
+    до конца последней поездки его автобусов за вычетом времени вождения.
+    bus_spans: результат _bus_spans(trip_table), чтобы не пересчитывать его при каждой оценке.
+    """
+    genes = np.asarray(population, dtype=np.int64)
+    if genes.ndim == 1:
+        genes = genes[None, :]
+    begin, finish, driving = bus_spans if bus_spans is not None else _bus_spans(trip_table)
+    num_individuals = genes.shape[0]
+    num_slots = int(genes.max()) + 1 if genes.size else 0
+    # Группа = (особь, водитель), как в group_violations
+    bus_group = (genes + (np.arange(num_individuals) * num_slots)[:, None]).ravel()
+    num_groups = num_individuals * num_slots
+    group_begin = np.full(num_groups, np.iinfo(np.int64).max)
+    group_finish = np.zeros(num_groups, dtype=np.int64)
+    np.minimum.at(group_begin, bus_group, np.tile(begin, num_individuals))
+    np.maximum.at(group_finish, bus_group, np.tile(finish, num_individuals))
+    group_driving = np.bincount(bus_group, weights=np.tile(driving, num_individuals), minlength=num_groups)
+    # Простой пустых групп равен нулю. Пересечения автобусов одного водителя group_violations не считает
+    # (штрафуется только непрерывное вождение); при пересечении вождение может превысить длительность
+    # работы, поэтому простой ограничен снизу нулём
+    idle = np.maximum(group_finish - group_begin - group_driving, 0)
+    return idle.reshape(num_individuals, num_slots).sum(axis=1).astype(np.int64)
+
+def evaluate_objectives(population, trip_table, driver_types, bus_spans=None, violations=None):
+    """
+    Многокритериальная оценка популяции: матрица (число особей x 3) со столбцами
+    число водителей, число нарушений перерывов и суммарный простой в минутах.
+    violations: готовая матрица group_violations (например, посчитанная в пуле процессов).
+    """
+    genes = np.asarray(population, dtype=np.int64)
+    if genes.ndim == 1:
+        genes = genes[None, :]
+    if violations is None:
+        violations = group_violations(genes, trip_table, driver_types)
+    return np.column_stack((count_drivers(genes), violations.sum(axis=1),
+                            idle_time(genes, trip_table, bus_spans))).astype(float)
+
+class FitnessCache:
+    """
+    Ограниченный LRU-кэш приспособленности, ключ - хэш генотипа.
+    Вместе со значением хранятся нарушения по каждому номеру водителя, чтобы потомки
+    могли пересчитывать только водителей с изменившимся набором автобусов.
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.delta_evaluations = 0
+        self._last = (0, 0, 0)
+
+    @staticmethod
+    def key(genes):
+        return hashlib.blake2b(np.ascontiguousarray(genes, dtype=np.int32).tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, fitness, slot_violations):
+        self.entries[key] = (fitness, slot_violations)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def generation_stats(self):
+        """Статистика с момента предыдущего вызова: доля попаданий, сэкономленные и частичные оценки."""
+        hits, misses, delta = self.hits - self._last[0], self.misses - self._last[1], self.delta_evaluations - self._last[2]
+        self._last = (self.hits, self.misses, self.delta_evaluations)
+        lookups = hits + misses
+        return {"hit_rate": hits / lookups if lookups else 0.0, "evals_saved": hits, "delta_evals": delta}
+
+def evaluate_with_cache(individuals, trip_table, driver_types, cache, full_evaluator=None, delta_fraction=0.1):
+    """
+    Оценка списка особей с кэшем и дельта-оценкой.
+    Особь хранит генотип и нарушения по водителям на момент последней оценки (eval_genes, slot_violations);
+    клоны DEAP наследуют их от родителя, поэтому после скрещивания и мутации пересчитываются только
+    водители, чьи наборы автобусов изменились (если изменено не более delta_fraction генов).
+    Полные и частичные оценки выполняются пакетно, одним вызовом на каждый вид.
+    full_evaluator(genes) -> матрица нарушений; по умолчанию group_violations.
+    """
+    num_slots = len(driver_types)
+    fitnesses = [None] * len(individuals)
+    full, delta = [], []
+    for i, individual in enumerate(individuals):
+        genes = np.asarray(individual, dtype=np.int64)
+        key = cache.key(genes)
+        entry = cache.get(key)
+        if entry is not None:
+            fitnesses[i] = entry[0]
+            individual.eval_genes = genes
+            individual.slot_violations = entry[1]
+            continue
+        snapshot = getattr(individual, "eval_genes", None)
+        if snapshot is not None and len(snapshot) == len(genes):
+            changed = np.flatnonzero(snapshot != genes)
+            if len(changed) <= delta_fraction * len(genes):
+                # Затронутые водители: прежние и новые номера изменённых генов
+                affected = np.zeros(num_slots, dtype=bool)
+                affected[snapshot[changed]] = True
+                affected[genes[changed]] = True
+                delta.append((i, key, genes, affected))
+                continue
+        full.append((i, key, genes))
+
+    def store(i, key, genes, slot_violations):
+        fitnesses[i] = float(count_drivers(genes[None, :])[0] + 1000 * slot_violations.sum())
+        cache.put(key, fitnesses[i], slot_violations)
+        individuals[i].eval_genes = genes
+        individuals[i].slot_violations = slot_violations
+
+    if delta:
+        masks = np.array([item[3] for item in delta])
+        partial = group_violations(np.array([item[2] for item in delta]), trip_table, driver_types, slot_mask=masks)
+        for (i, key, genes, affected), row in zip(delta, partial):
+            slot_violations = individuals[i].slot_violations.copy()
+            slot_violations[affected] = row[affected]
+            store(i, key, genes, slot_violations)
+        cache.delta_evaluations += len(delta)
+
+    if full:
+        genes = np.array([item[2] for item in full])
+        if full_evaluator is None:
+            violations = group_violations(genes, trip_table, driver_types)
+        else:
+            violations = full_evaluator(genes)
+        for (i, key, row), slot_violations in zip(full, violations):
+            store(i, key, row, slot_violations)
+    return np.array(fitnesses)
+
+def _random_driver_types(max_drivers):
+    # Случайный тип водителя для каждого номера водителя
+    types = sorted(SHIFT_TEMPLATES)
+    return np.array([random.choice(types) for _ in range(max_drivers)])
+
+class RepairOperators:
+    """
+    Операторы генетического алгоритма, сохраняющие допустимость решений.
+    Автобус переносится к водителю, только если у водителя не возникает пересечений поездок
+    разных автобусов и нарушений перерывов его типа (driver_violations).
+    Начальные особи - перестановки (у каждого автобуса свой водитель), далее мутация
+    объединяет автобусы, а скрещивание исправляет недопустимых водителей после обмена участками.
+    """
+    def __init__(self, trip_table, driver_types, candidates=5):
+        self.driver_types = [int(driver_type) for driver_type in driver_types]
+        self.max_drivers = len(self.driver_types)
+        self.candidates = candidates
+        self.alone_types = None
+        # Поездки каждого автобуса в порядке таблицы поездок и занятость автобуса
+        self.bus_trips = [[] for _ in range(trip_table.num_buses)]
+        for bus_idx, trip_start, trip_end in zip(trip_table.bus_idx.tolist(), trip_table.start.tolist(), trip_table.end.tolist()):
+            self.bus_trips[bus_idx].append((trip_start, trip_end))
+        self.bus_busy = []
+        for trips in self.bus_trips:
+            busy = IntervalSet()
+            for trip_start, trip_end in trips:
+                busy.add(*_busy_interval(trip_start, trip_end))
+            self.bus_busy.append(busy)
+
+    def _overlap(self, bus_a, bus_b):
+        """Пересекаются ли поездки двух разных автобусов."""
+        busy_a, busy_b = self.bus_busy[bus_a], self.bus_busy[bus_b]
+        if len(busy_a) > len(busy_b):
+            busy_a, busy_b = busy_b, busy_a
+        return any(busy_b.overlaps(start, end) for start, end in zip(busy_a.starts, busy_a.ends))
+
+    def _breaks_ok(self, bus_list, driver_type):
+        trips = sorted((trip for bus_idx in sorted(bus_list) for trip in self.bus_trips[bus_idx]), key=lambda x: x[0])
+        return not driver_violations(trips, driver_type)
+
+    def can_join(self, bus_list, bus_idx, driver_type):
+        """Можно ли добавить автобус к допустимому водителю с набором bus_list."""
+        if any(self._overlap(other, bus_idx) for other in bus_list):
+            return False
+        return self._breaks_ok(bus_list + [bus_idx], driver_type)
+
+    def group_ok(self, bus_list, driver_type):
+        """Допустим ли водитель данного типа с этим набором автобусов."""
+        for pos, bus_idx in enumerate(bus_list):
+            if any(self._overlap(other, bus_idx) for other in bus_list[:pos]):
+                return False
+        return self._breaks_ok(bus_list, driver_type)
+
+    def _groups(self, individual):
+        groups = {}
+        for bus_idx, slot in enumerate(individual):
+            groups.setdefault(slot, []).append(bus_idx)
+        return groups
+
+    def _move(self, individual, groups, bus_idx, slot):
+        old = individual[bus_idx]
+        groups[old].remove(bus_idx)
+        if not groups[old]:
+            del groups[old]
+        groups.setdefault(slot, []).append(bus_idx)
+        individual[bus_idx] = slot
+
+    def _find_slot(self, individual, groups, bus_idx, use_empty=True):
+        """Ищет допустимого водителя среди случайных занятых номеров или свободный номер."""
+        current = individual[bus_idx]
+        for _ in range(self.candidates):
+            slot = individual[random.randrange(len(individual))]
+            if slot != current and self.can_join(groups[slot], bus_idx, self.driver_types[slot]):
+                return slot
+        if use_empty:
+            for _ in range(self.candidates):
+                slot = random.randrange(self.max_drivers)
+                if slot not in groups and self._breaks_ok([bus_idx], self.driver_types[slot]):
+                    return slot
+        return None
+
+    def initial_genes(self):
+        """
+        Каждый автобус получает собственного водителя. Номера раздаются по типам: сначала автобусам,
+        допустимым в одиночку только для одного типа, затем допустимым для нескольких типов (из типа
+        с наибольшим запасом свободных номеров). Особь допустима (без нарушений group_violations),
+        если каждый автобус допустим хотя бы для одного типа и номеров каждого типа хватает;
+        автобусы, недопустимые ни для одного типа, получают оставшиеся номера.
+        """
+        if self.alone_types is None:
+            # Типы, для которых автобус в одиночку не нарушает правил, считаются один раз
+            types = sorted(set(self.driver_types))
+            self.alone_types = [[driver_type for driver_type in types if self._breaks_ok([bus_idx], driver_type)]
+                                for bus_idx in range(len(self.bus_trips))]
+        free = {}
+        for slot in random.sample(range(self.max_drivers), self.max_drivers):
+            free.setdefault(self.driver_types[slot], []).append(slot)
+        order = random.sample(range(len(self.bus_trips)), len(self.bus_trips))
+        order.sort(key=lambda bus_idx: len(self.alone_types[bus_idx]) or len(free) + 1)
+        genes = [None] * len(self.bus_trips)
+        for bus_idx in order:
+            types = [driver_type for driver_type in self.alone_types[bus_idx] if free[driver_type]]
+            if not types:
+                types = [driver_type for driver_type, slots in free.items() if slots]
+            driver_type = max(types, key=lambda driver_type: len(free[driver_type]))
+            genes[bus_idx] = free[driver_type].pop()
+        return genes
+
+    def mutate(self, individual, indpb):
+        """Переносит автобусы к другим допустимым водителям, не нарушая прежнего водителя."""
+        groups = self._groups(individual)
+        for bus_idx in range(len(individual)):
+            if random.random() >= indpb:
+                continue
+            old = individual[bus_idx]
+            rest = [other for other in groups[old] if other != bus_idx]
+            # Подмножество автобусов без пересечений остается без пересечений, проверяем только перерывы
+            if rest and not self._breaks_ok(rest, self.driver_types[old]):
+                continue
+            slot = self._find_slot(individual, groups, bus_idx, use_empty=random.random() < 0.1)
+            if slot is not None:
+                self._move(individual, groups, bus_idx, slot)
+        return (individual,)
+
+    def _repair(self, individual, positions):
+        groups = self._groups(individual)
+        for slot in {individual[bus_idx] for bus_idx in positions}:
+            if slot not in groups or self.group_ok(groups[slot], self.driver_types[slot]):
+                continue
+            # Выносим полученные при обмене автобусы, пока водитель не станет допустимым
+            for bus_idx in [other for other in groups[slot] if other in positions]:
+                target = self._find_slot(individual, groups, bus_idx)
+                if target is not None:
+                    self._move(individual, groups, bus_idx, target)
+                if slot not in groups or self.group_ok(groups[slot], self.driver_types[slot]):
+                    break
+
+    def mate(self, ind1, ind2):
+        """Двухточечное скрещивание с исправлением водителей в обменянном участке."""
+        size = len(ind1)
+        if size < 3:
+            return ind1, ind2
+        a, b = sorted(random.sample(range(1, size), 2))
+        ind1[a:b], ind2[a:b] = ind2[a:b], ind1[a:b]
+        positions = set(range(a, b))
+        self._repair(ind1, positions)
+        self._repair(ind2, positions)
+        return ind1, ind2
+
+def _constrained_dominates(self, other, obj=slice(None)):
+    """
+    Доминирование с ограничениями (правило Деба): решение с меньшим числом нарушений доминирует,
+    при равном числе нарушений - обычное доминирование по Парето.
+    """
+    if self.wvalues[1] != other.wvalues[1]:
+        return self.wvalues[1] > other.wvalues[1]
+    base = _deap()[0]
+    return base.Fitness.dominates(self, other, obj)
+
+@functools.lru_cache(maxsize=None)
+def _deap():
+    """
+    Загружает DEAP при первом запуске ГА и один раз за процесс создаёт классы FitnessMin и Individual,
+    а для многокритериального режима - FitnessPareto/ParetoIndividual и FitnessConstrained/ConstrainedIndividual.
+    Возвращает модули (base, creator, tools, algorithms).
+    """
+    from deap import algorithms, base, creator, tools
+    # В процессе-воркере (spawn) или после повторного импорта классы могут уже существовать
+    if not hasattr(creator, "Individual"):
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+        creator.create("Individual", list, fitness=creator.FitnessMin)
+    if not hasattr(creator, "ParetoIndividual"):
+        # Водители, нарушения, простой - все критерии минимизируются
+        creator.create("FitnessPareto", base.Fitness, weights=(-1.0, -1.0, -1.0))
+        creator.create("ParetoIndividual", list, fitness=creator.FitnessPareto)
+        creator.create("FitnessConstrained", creator.FitnessPareto, dominates=_constrained_dominates)
+        creator.create("ConstrainedIndividual", list, fitness=creator.FitnessConstrained)
+    return base, creator, tools, algorithms
+
+def _fitness_values(fitness):
+    # Строка матрицы критериев или скалярная приспособленность -> кортеж для DEAP
+    return tuple(float(value) for value in np.atleast_1d(fitness))
+
+def _build_toolbox(num_buses, max_drivers, evaluate_batch, operators=None, individual_class=None):
+    """
+    Регистрирует операторы DEAP. evaluate_batch оценивает список особей целиком и возвращает
+    вектор приспособленности или матрицу (число особей x число критериев).
+    operators: RepairOperators для допустимых начальных особей, скрещивания и мутации.
+    individual_class: класс особи (по умолчанию creator.Individual).
+    """
+    base, creator, tools, _ = _deap()
+    individual_class = individual_class or creator.Individual
+    toolbox = base.Toolbox()
+    # Генерация атрибутов: номер водителя для каждого автобуса
+    toolbox.register("attr_driver", random.randint, 0, max_drivers-1)
+    # Индивидуум: список водителей для каждого автобуса
+    if operators is None:
+        toolbox.register("individual", tools.initRepeat, individual_class, toolbox.attr_driver, n=num_buses)
+    else:
+        toolbox.register("individual", tools.initIterate, individual_class, operators.initial_genes)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+
+    def batch_map(func, individuals):
+        # Оценка всей популяции одной матрицей вместо вызова функции для каждой особи
+        individuals = list(individuals)
+        if func is not toolbox.evaluate or not individuals:
+            return list(map(func, individuals))
+        return [_fitness_values(fitness) for fitness in evaluate_batch(individuals)]
+
+    toolbox.register("evaluate", lambda individual: _fitness_values(evaluate_batch([individual])[0]))
+    toolbox.register("map", batch_map)
+    if operators is None:
+        toolbox.register("mate", tools.cxTwoPoint)
+        toolbox.register("mutate", tools.mutUniformInt, low=0, up=max_drivers-1, indpb=0.05)
+    else:
+        toolbox.register("mate", operators.mate)
+        toolbox.register("mutate", operators.mutate, indpb=0.05)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+    return toolbox
+
+# Таблица поездок в процессе-воркере: передаётся один раз при запуске процесса
+_WORKER_TRIP_TABLE = None
+
+def _init_worker(trip_table):
+    global _WORKER_TRIP_TABLE
+    _WORKER_TRIP_TABLE = trip_table
+    # При запуске через spawn классы DEAP нужно создать до получения первых особей
+    _deap()
+
+def _evaluate_chunk(genes, driver_types):
+    return group_violations(genes, _WORKER_TRIP_TABLE, driver_types)
+
+def _violations_evaluator(trip_table, driver_types, executor=None, workers=None):
+    """Функция genes -> матрица group_violations; при заданном пуле популяция делится между воркерами."""
+    def evaluate_violations(genes):
+        if executor is None:
+            return group_violations(genes, trip_table, driver_types)
+        chunks = np.array_split(np.asarray(genes, dtype=np.int32), workers)
+        futures = [executor.submit(_evaluate_chunk, chunk, driver_types) for chunk in chunks if len(chunk)]
+        return np.concatenate([future.result() for future in futures])
+    return evaluate_violations
+
+def _build_drivers(individual, buses, driver_types):
+    """Создаёт объекты Driver по генотипу особи."""
+    # Построение распределения водителей
+    driver_assignments = {}
+    for bus_idx, driver in enumerate(individual):
+        if driver not in driver_assignments:
+            driver_assignments[driver] = []
+        driver_assignments[driver].append(buses[bus_idx])
+
+    # Создание объектов Driver
+    drivers = []
+    driver_id = 1
+    for driver_key, assigned_buses in driver_assignments.items():
+        # Тип водителя совпадает с тем, что использовался при оценке
+        driver = _create_driver(driver_id, int(driver_types[driver_key]))
+        driver.assigned_buses = [bus.bus_id for bus in assigned_buses]
+        drivers.append(driver)
+        driver_id += 1
+    return drivers
+
+def _evolve(population, toolbox, cxpb, mutpb, generations, stats=None, halloffame=None, logbook=None,
+            start_gen=0, deadline=None, stall_generations=None, on_generation=None):
+    """
+    Цикл эволюции по схеме eaSimple с остановкой по времени и по застою.
+    deadline: момент time.time(), после которого новые поколения не начинаются.
+    stall_generations: остановка, если лучшая приспособленность не улучшалась столько поколений подряд.
+    on_generation(gen, population): вызывается после каждого поколения (например, для контрольных точек).
+    Возвращает (population, logbook, последнее поколение).
+    """
+    _, _, tools, algorithms = _deap()
+    if logbook is None:
+        logbook = tools.Logbook()
+        logbook.header = ["gen", "nevals"] + (stats.fields if stats else [])
+
+    def evaluate_invalid(individuals):
+        invalid = [ind for ind in individuals if not ind.fitness.valid]
+        start = time.perf_counter()
+        for ind, fit in zip(invalid, toolbox.map(toolbox.evaluate, invalid)):
+            ind.fitness.values = fit
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.count("evaluations", len(invalid))
+            INSTRUMENTATION.add_time("evaluation", time.perf_counter() - start)
+        return len(invalid)
+
+    def best_of(individuals):
+        return min(ind.fitness.values[0] for ind in individuals)
+
+    gen = start_gen
+    if start_gen == 0:
+        nevals = evaluate_invalid(population)
+        if halloffame is not None:
+            halloffame.update(population)
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=0, nevals=nevals, **record)
+
+    best = best_of(population)
+    stall = 0
+    while gen < generations:
+        if deadline is not None and time.time() >= deadline:
+            break
+        gen += 1
+        gen_start = time.perf_counter()
+        offspring = toolbox.select(population, len(population))
+        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        eval_start = time.perf_counter()
+        nevals = evaluate_invalid(offspring)
+        eval_seconds = time.perf_counter() - eval_start
+        if halloffame is not None:
+            halloffame.update(offspring)
+        population[:] = offspring
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=gen, nevals=nevals, **record)
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.record_generation(gen, time.perf_counter() - gen_start, nevals, eval_seconds)
+        if on_generation is not None:
+            on_generation(gen, population)
+
+        current = best_of(population)
+        if current < best:
+            best, stall = current, 0
+        else:
+            stall += 1
+        if stall_generations and stall >= stall_generations:
+            break
+    return population, logbook, gen
+
+def _seeded_population(toolbox, size, operators=None, feasible_seeds=0.0, individual_class=None):
+    """
+    Начальная популяция: доля feasible_seeds особей строится RepairOperators.initial_genes
+    (у каждого автобуса свой водитель подходящего типа), остальные - toolbox.population.
+    """
+    _, creator, tools, _ = _deap()
+    num_seeds = 0 if operators is None else int(round(size * feasible_seeds))
+    population = [tools.initIterate(individual_class or creator.Individual, operators.initial_genes)
+                  for _ in range(num_seeds)]
+    return population + toolbox.population(n=size - num_seeds)
+
+def _save_checkpoint(path, state):
+    """Атомарная запись контрольной точки: сначала во временный файл, затем замена."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def _load_checkpoint(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def _evolve_island(population, generations, cxpb, mutpb, seed, driver_types, operators=None,
+                   deadline=None, stall_generations=None):
+    """
+    Эволюция одного острова в процессе-воркере на заданное число поколений.
+    """
+    random.seed(seed)
+    max_drivers = _WORKER_TRIP_TABLE.num_buses
+    toolbox = _build_toolbox(len(population[0]), max_drivers,
+                             lambda individuals: evaluate_population(individuals, _WORKER_TRIP_TABLE, driver_types),
+                             operators)
+    _evolve(population, toolbox, cxpb, mutpb, generations, deadline=deadline, stall_generations=stall_generations)
+    return population
+
+@instrumented("genetic_driver_assignment")
+def genetic_driver_assignment(buses, population_size=50, generations=100, cxpb=0.7, mutpb=0.2,
+                              workers=None, islands=None, migration_interval=10, migration_size=2,
+                              cache_size=4096, return_logbook=False, repair=False, driver_types=None,
+                              time_budget=None, stall_generations=None, checkpoint_path=None,
+                              checkpoint_every=10, resume=False, feasible_seeds=0.0):
+    """
+    Генетический алгоритм для распределения водителей на автобусы.
+    Цель: минимизировать количество водителей при отсутствии пересечений расписаний.
+    Учитывает перерывы водителей в соответствии с их типом.
+    workers: число процессов для параллельной оценки популяции (None - без пула процессов).
+    islands: число островов; каждый остров эволюционирует в отдельном процессе,
+             каждые migration_interval поколений migration_size лучших особей переходят на соседний остров.
+    cache_size: размер LRU-кэша приспособленности (0 - без кэша и дельта-оценки).
+    return_logbook: вернуть (drivers, logbook); статистика кэша по поколениям находится в разделе
+                    logbook.chapters["cache"] (hit_rate, evals_saved, delta_evals).
+    repair: использовать операторы RepairOperators, которые переносят автобусы только к допустимым водителям.
+    driver_types: типы водителей для каждого номера (по умолчанию выбираются случайно).
+    time_budget: ограничение времени работы в секундах; новые поколения после него не начинаются.
+    stall_generations: ранняя остановка, если лучшая приспособленность не улучшалась столько поколений.
+    checkpoint_path: файл контрольной точки (популяция, HallOfFame, logbook, состояние генераторов
+                     random и numpy, номер поколения); записывается каждые checkpoint_every поколений
+                     и в конце работы. resume=True продолжает работу с сохранённой точки, если файл существует.
+    feasible_seeds: доля начальной популяции (каждого острова) из особей RepairOperators.initial_genes,
+                    как в nsga2_driver_assignment; по умолчанию вся популяция случайная.
+    Тип водителя фиксируется для каждого номера водителя на весь запуск, поэтому
+    приспособленность особи детерминирована.
+    """
+    # Определение максимального количества водителей (каждый автобус имеет уникального водителя)
+    max_drivers = len(buses)
+
+    # Классы DEAP создаются один раз за процесс (до загрузки особей из контрольной точки)
+    _, _, tools, _ = _deap()
+
+    # Таблица поездок строится один раз за запуск, а не при каждой оценке
+    trip_table = build_trip_table(buses)
+
+    # Продолжение с контрольной точки: типы водителей берутся из неё, чтобы приспособленность совпадала;
+    # точка проверяется до создания пула процессов, чтобы ошибка не оставляла процессы-воркеры
+    checkpoint = None
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = _load_checkpoint(checkpoint_path)
+        if checkpoint["islands"] != bool(islands) or checkpoint["num_buses"] != len(buses):
+            raise ValueError("Контрольная точка не соответствует параметрам запуска")
+        driver_types = checkpoint["driver_types"]
+        random.setstate(checkpoint["random_state"])
+        np.random.set_state(checkpoint["numpy_state"])
+
+    if islands:
+        workers = workers or islands
+    executor = None
+    if islands or (workers and workers > 1):
+        # Данные поездок передаются воркерам один раз через initializer, а не с каждой особью
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(trip_table,))
+
+    deadline = time.time() + time_budget if time_budget is not None else None
+
+    # Тип водителя для каждого номера выбирается один раз за запуск
+    if driver_types is None:
+        driver_types = _random_driver_types(max_drivers)
+    driver_types = np.asarray(driver_types)
+    operators = RepairOperators(trip_table, driver_types) if repair or feasible_seeds else None
+    cache = FitnessCache(cache_size) if cache_size else None
+
+    evaluate_violations = _violations_evaluator(trip_table, driver_types, executor, workers)
+
+    def evaluate_batch(individuals):
+        if cache is not None:
+            return evaluate_with_cache(individuals, trip_table, driver_types, cache, evaluate_violations)
+        genes = np.asarray(individuals, dtype=np.int64)
+        return (count_drivers(genes) + 1000 * evaluate_violations(genes).sum(axis=1)).astype(float)
+
+    def save(gen, population, logbook):
+        if checkpoint_path:
+            _save_checkpoint(checkpoint_path, {
+                "islands": bool(islands),
+                "num_buses": len(buses),
+                "generation": gen,
+                "population": population,
+                "halloffame": hof,
+                "logbook": logbook,
+                "driver_types": driver_types,
+                "random_state": random.getstate(),
+                "numpy_state": np.random.get_state(),
+            })
+
+    toolbox = _build_toolbox(len(buses), max_drivers, evaluate_batch, operators if repair else None)
+    hof = checkpoint["halloffame"] if checkpoint else tools.HallOfFame(1)
+    logbook = None
+
+    try:
+        if islands:
+            # Островная модель: популяция делится между островами
+            island_size = max(population_size // islands, 2)
+            if checkpoint:
+                populations, done = checkpoint["population"], checkpoint["generation"]
+            else:
+                populations = [_seeded_population(toolbox, island_size, operators, feasible_seeds)
+                               for _ in range(islands)]
+                done = 0
+            best, stall = (hof[0].fitness.values[0] if len(hof) else None), 0
+            while done < generations and (deadline is None or time.time() < deadline):
+                step = min(migration_interval, generations - done)
+                futures = [executor.submit(_evolve_island, population, step, cxpb, mutpb, random.randrange(2**32), driver_types,
+                                           operators if repair else None,
+                                           deadline, stall_generations)
+                           for population in populations]
+                populations = [future.result() for future in futures]
+                for population in populations:
+                    hof.update(population)
+                done += step
+                # Застой считается по эпохам миграции, переведённым в поколения
+                if best is None or hof[0].fitness.values[0] < best:
+                    best, stall = hof[0].fitness.values[0], 0
+                else:
+                    stall += step
+                if done < generations:
+                    # Миграция по кольцу: лучшие особи заменяют худших на соседнем острове
+                    tools.migRing(populations, migration_size, tools.selBest, replacement=tools.selWorst)
+                if checkpoint_every and done % checkpoint_every < step:
+                    save(done, populations, None)
+                if stall_generations and stall >= stall_generations:
+                    break
+            save(done, populations, None)
+        else:
+            stats = tools.Statistics(lambda ind: ind.fitness.values)
+            stats.register("min", min)
+            stats.register("avg", lambda fits: sum(f[0] for f in fits) / len(fits))
+            start_time = time.time()
+            stats.register("elapsed", lambda fits: time.time() - start_time)
+            if cache is not None:
+                # Статистика кэша за поколение (вызывается один раз при сборе статистики)
+                stats.register("cache", lambda fits: cache.generation_stats())
+
+            if checkpoint:
+                population, logbook, start_gen = checkpoint["population"], checkpoint["logbook"], checkpoint["generation"]
+            else:
+                population, start_gen = _seeded_population(toolbox, population_size, operators, feasible_seeds), 0
+                logbook = tools.Logbook()
+                logbook.header = ["gen", "nevals"] + stats.fields
+
+            def on_generation(gen, population):
+                if checkpoint_every and gen % checkpoint_every == 0:
+                    save(gen, population, logbook)
+
+            # Запуск эволюции
+            population, logbook, gen = _evolve(population, toolbox, cxpb, mutpb, generations, stats=stats,
+                                               halloffame=hof, logbook=logbook, start_gen=start_gen,
+                                               deadline=deadline, stall_generations=stall_generations,
+                                               on_generation=on_generation)
+            save(gen, population, logbook)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    drivers = _build_drivers(hof[0], buses, driver_types)
+
+    if return_logbook:
+        return drivers, logbook
+    return drivers
+
+def _evolve_nsga2(population, toolbox, cxpb, mutpb, generations, stats=None, logbook=None, deadline=None):
+    """
+    Цикл NSGA-II: турнир по доминированию и скученности (selTournamentDCD), скрещивание и мутация,
+    затем отбор selNSGA2 из объединения родителей и потомков (элитизм по фронтам Парето).
+    Размер популяции должен быть кратен четырём.
+    Возвращает (population, logbook, последнее поколение).
+    """
+    _, _, tools, algorithms = _deap()
+    if logbook is None:
+        logbook = tools.Logbook()
+        logbook.header = ["gen", "nevals", "evaluations"] + (stats.fields if stats else [])
+
+    def evaluate_invalid(individuals):
+        invalid = [ind for ind in individuals if not ind.fitness.valid]
+        start = time.perf_counter()
+        for ind, fit in zip(invalid, toolbox.map(toolbox.evaluate, invalid)):
+            ind.fitness.values = fit
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.count("evaluations", len(invalid))
+            INSTRUMENTATION.add_time("evaluation", time.perf_counter() - start)
+        return len(invalid)
+
+    nevals = evaluate_invalid(population)
+    evaluations = nevals
+    # Начальный отбор назначает ранги и расстояния скученности для турнира
+    population = toolbox.select(population, len(population))
+    record = stats.compile(population) if stats else {}
+    logbook.record(gen=0, nevals=nevals, evaluations=evaluations, **record)
+
+    gen = 0
+    while gen < generations:
+        if deadline is not None and time.time() >= deadline:
+            break
+        gen += 1
+        offspring = tools.selTournamentDCD(population, len(population))
+        offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+        nevals = evaluate_invalid(offspring)
+        evaluations += nevals
+        population = toolbox.select(population + offspring, len(population))
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=gen, nevals=nevals, evaluations=evaluations, **record)
+    return population, logbook, gen
+
+@instrumented("nsga2_driver_assignment")
+def nsga2_driver_assignment(buses, population_size=100, generations=100, cxpb=0.7, mutpb=0.2, workers=None,
+                            repair=False, driver_types=None, time_budget=None, constrained=None,
+                            feasible_seeds=0.2, return_logbook=False):
+    """
+    Многокритериальный генетический алгоритм (NSGA-II) распределения водителей.
+    Вместо скалярной приспособленности (водители + 1000 * нарушения) критерии минимизируются
+    раздельно: число водителей, число нарушений перерывов и суммарный простой водителей в минутах.
+    Оценка пакетная, по таблице поездок (group_violations, idle_time).
+    constrained: сравнение по правилу Деба - меньшее число нарушений доминирует, среди решений
+                 с равным числом нарушений действует доминирование по Парето; при False нарушения -
+                 обычный третий критерий, и фронт содержит компромиссы с недопустимыми решениями.
+                 Правило Деба быстро вытесняет недопустимые особи, и фронт сжимается до 1-2 решений;
+                 без него и без затравки допустимые решения могут не найтись. None - правило Деба,
+                 только если начальная популяция не содержит затравки (feasible_seeds = 0).
+    population_size округляется вверх до кратного четырём (требование selTournamentDCD).
+    feasible_seeds: доля начальной популяции из особей RepairOperators.initial_genes (у каждого автобуса
+                    свой водитель подходящего типа; особь допустима, если каждый автобус допустим
+                    хотя бы для одного типа); остальные особи случайные и сохраняют разнообразие фронта.
+    workers, repair, driver_types, time_budget - как в genetic_driver_assignment.
+    Возвращает фронт Парето последнего поколения: список (drivers, (водители, нарушения, простой))
+    (по одному решению на вектор критериев), упорядоченный по числу нарушений, затем водителей и простою,
+    так что первым идёт лучшее допустимое решение, если оно найдено.
+    return_logbook: вернуть (front, logbook); в logbook поля evaluations (оценок с начала запуска),
+                    min (минимум каждого критерия), feasible (особей без нарушений) и feasible_drivers
+                    (наименьшее число водителей среди них, None - допустимых нет).
+    """
+    _, creator, tools, _ = _deap()
+    population_size += -population_size % 4
+    max_drivers = len(buses)
+    trip_table = build_trip_table(buses)
+    bus_spans = _bus_spans(trip_table)
+    if driver_types is None:
+        driver_types = _random_driver_types(max_drivers)
+    driver_types = np.asarray(driver_types)
+    operators = RepairOperators(trip_table, driver_types) if repair or feasible_seeds else None
+
+    executor = None
+    if workers and workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(trip_table,))
+    evaluate_violations = _violations_evaluator(trip_table, driver_types, executor, workers)
+    deadline = time.time() + time_budget if time_budget is not None else None
+
+    def evaluate_batch(individuals):
+        genes = np.asarray(individuals, dtype=np.int64)
+        return evaluate_objectives(genes, trip_table, driver_types, bus_spans, evaluate_violations(genes))
+
+    if constrained is None:
+        constrained = not feasible_seeds
+    individual_class = creator.ConstrainedIndividual if constrained else creator.ParetoIndividual
+    toolbox = _build_toolbox(len(buses), max_drivers, evaluate_batch, operators if repair else None, individual_class)
+    toolbox.register("select", tools.selNSGA2)
+    population = _seeded_population(toolbox, population_size, operators, feasible_seeds, individual_class)
+
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("min", lambda fits: tuple(float(value) for value in np.min(fits, axis=0)))
+    stats.register("feasible", lambda fits: sum(1 for fit in fits if fit[1] == 0))
+    stats.register("feasible_drivers", lambda fits: min((fit[0] for fit in fits if fit[1] == 0), default=None))
+    start_time = time.time()
+    stats.register("elapsed", lambda fits: time.time() - start_time)
+
+    try:
+        population, logbook, _ = _evolve_nsga2(population, toolbox, cxpb, mutpb, generations, stats=stats,
+                                               deadline=deadline)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    front = tools.sortNondominated(population, len(population), first_front_only=True)[0]
+    # Одно решение на каждый вектор критериев
+    unique = {}
+    for ind in front:
+        unique.setdefault(ind.fitness.values, ind)
+    front = sorted(unique.values(), key=lambda ind: (ind.fitness.values[1], ind.fitness.values[0], ind.fitness.values[2]))
+    result = [(_build_drivers(ind, buses, driver_types), tuple(int(value) for value in ind.fitness.values))
+              for ind in front]
+    if return_logbook:
+        return result, logbook
+    return result
@@ -0,0 +1,189 @@
+"""
+Многодневное планирование со скользящим горизонтом.
+"""
+import heapq
+import random
+import time
+
+from .models import Bus, Driver, ScheduleView, SHIFT_TEMPLATES, trips_mask
+from .timetable import generate_route_schedule
+from .assignment import bus_trip_intervals, can_assign, _assign_bus, _create_driver
+
+
+class DriverState:
+    """
+    Состояние водителя, переносимое между окнами скользящего горизонта:
+    отработанное время, конец последней поездки (начало отдыха) и число назначенных автобусов.
+    """
+    __slots__ = ("worked_minutes", "last_trip_end", "duty_day", "assignments")
+
+    def __init__(self):
+        self.worked_minutes = 0
+        self.last_trip_end = None
+        self.duty_day = None  # Последний день, в который водитель работал
+        self.assignments = 0
+
+class HorizonWindow:
+    """
+    Результат одного окна скользящего горизонта: автобусы окна с расписаниями в минутах от начала
+    горизонта и задействованные в окне водители (assigned_buses содержит только автобусы окна).
+    """
+    __slots__ = ("day", "buses", "drivers", "new_drivers", "elapsed")
+
+    def __init__(self, day, buses, drivers, new_drivers, elapsed):
+        self.day = day
+        self.buses = buses
+        self.drivers = drivers
+        self.new_drivers = new_drivers
+        self.elapsed = elapsed
+
+def _day_shifts(templates, driver_type, day):
+    """Смены шаблона типа driver_type, сдвинутые на day суток."""
+    key = (driver_type, day)
+    if key not in templates:
+        shift_by = day * 1440
+        templates[key] = [Driver.Shift(work=(shift.work[0] + shift_by, shift.work[1] + shift_by),
+                                       rests=[(start + shift_by, end + shift_by) for start, end in shift.rest])
+                          for shift in SHIFT_TEMPLATES[driver_type].make_shifts()]
+    return templates[key]
+
+def _window_buses(routes, day, min_buses_per_route, operation_hours, bus_id_base=1, departure_window=(480, 1920)):
+    """
+    Автобусы одного дня горизонта: расписание маршрута генерируется заново на этот день,
+    минуты отсчитываются от начала горизонта без свёртки в сутки.
+    departure_window: (начало, конец) в минутах от начала дня, между которыми равномерно
+    распределяются выходы автобусов маршрута.
+    """
+    buses = []
+    bus_id = bus_id_base
+    first_departure, last_departure = departure_window
+    interval_min = (last_departure - first_departure) / min_buses_per_route
+    day_start = day * 1440
+    for route in routes:
+        base = generate_route_schedule(route, 0, operation_hours=operation_hours, fold=False)
+        route.schedule = ScheduleView(base, day_start + first_departure, fold=False)
+        for i in range(min_buses_per_route):
+            bus = Bus(bus_id=bus_id, route=route)
+            bus.schedule = ScheduleView(base, day_start + first_departure + int(i * interval_min), fold=False)
+            buses.append(bus)
+            bus_id += 1
+    return buses
+
+def rolling_horizon(routes, days=7, min_buses_per_route=10, operation_hours=24, min_rest=None,
+                    max_worked_minutes=None, lookahead=8, seed=None, departure_window=(480, 1920)):
+    """
+    Генерация расписаний и распределение водителей на несколько суток окнами по одному дню.
+    Генератор: для каждого дня выдаёт HorizonWindow; в памяти находится только текущее окно,
+    между окнами переносятся водители с их состоянием (DriverState) и занятость после начала следующего дня;
+    маски занятости водителей хранятся в минутах от начала текущего окна.
+    min_rest: минимальный отдых в минутах между последней поездкой и первой поездкой нового рабочего дня
+              (None - min_rest шаблона смены водителя).
+    max_worked_minutes: ограничение суммарного времени за рулём на весь горизонт (None - без ограничения).
+    departure_window: (начало, конец) выходов автобусов в минутах от начала дня (по умолчанию
+                      выходы распределены по суткам начиная с 08:00).
+    lookahead: сколько водителей каждого типа с вершины кучи проверяется, если первый не подходит по состоянию.
+    Назначение в окне следует жадному алгоритму; смены водителей сдвигаются на день окна.
+    """
+    if seed is not None:
+        random.seed(seed)
+    drivers = []
+    states = {}
+    templates = {}
+    free_index = {}
+    driver_id = 1
+
+    def state_allows(driver, trips, bus_start, day):
+        state = states[driver.driver_id]
+        if state.duty_day is not None and state.duty_day != day and state.last_trip_end is not None:
+            rest = min_rest if min_rest is not None else SHIFT_TEMPLATES[driver.driver_type].min_rest
+            if bus_start - state.last_trip_end < rest:
+                return False
+        if max_worked_minutes is not None:
+            work = sum(trip_end - trip_start for trip_start, trip_end in trips)
+            if state.worked_minutes + work > max_worked_minutes:
+                return False
+        return True
+
+    for day in range(days):
+        start = time.perf_counter()
+        buses = _window_buses(routes, day, min_buses_per_route, operation_hours, departure_window=departure_window)
+        for driver in drivers:
+            driver.shifts = _day_shifts(templates, driver.driver_type, day)
+        used = {}
+        new_drivers = 0
+        # Маски занятости отсчитываются от начала окна, поэтому их длина не растёт с номером дня
+        origin = day * 1440
+
+        for bus in sorted(buses, key=lambda bus: bus.schedule.first_time()):
+            trips = bus_trip_intervals(bus)
+            day_trips = [(trip_start - origin, trip_end - origin) for trip_start, trip_end in trips]
+            mask = trips_mask(day_trips)
+            bus_start = min(trip_start for trip_start, _ in trips)
+            best = None
+            best_item = None
+            for driver_type, heap in free_index.items():
+                # Водители с вершины кучи, не подходящие по состоянию, временно откладываются
+                skipped = []
+                while heap and heap[0][0] <= bus_start and len(skipped) < lookahead:
+                    driver = heap[0][2]
+                    if state_allows(driver, trips, bus_start, day):
+                        # Смены шаблона, поездки и маска отсчитываются от начала дня окна
+                        if can_assign(driver, bus, day_trips, mask, origin) and (best is None or driver.driver_id < best.driver_id):
+                            best, best_item = driver, heap[0]
+                        break
+                    skipped.append(heapq.heappop(heap))
+                for item in skipped:
+                    heapq.heappush(heap, item)
+            if best is None:
+                best = _create_driver(driver_id)
+                best.shifts = _day_shifts(templates, best.driver_type, day)
+                states[driver_id] = DriverState()
+                drivers.append(best)
+                driver_id += 1
+                new_drivers += 1
+            else:
+                heap = free_index[best.driver_type]
+                heap.remove(best_item)
+                heapq.heapify(heap)
+            _assign_bus(best, bus, trips, mask)
+            heapq.heappush(free_index.setdefault(best.driver_type, []), (best.busy.last_end(), best.driver_id, best))
+
+            state = states[best.driver_id]
+            state.worked_minutes += sum(trip_end - trip_start for trip_start, trip_end in trips)
+            state.last_trip_end = max(state.last_trip_end or 0, max(trip_end for _, trip_end in trips))
+            state.duty_day = day
+            state.assignments += 1
+            used[best.driver_id] = best
+
+        yield HorizonWindow(day, buses, list(used.values()), new_drivers, time.perf_counter() - start)
+
+        # Окно обработано: освобождаем автобусы окна и прошедшую занятость
+        next_day_start = (day + 1) * 1440
+        for key in [key for key in templates if key[1] == day]:
+            del templates[key]
+        for driver in used.values():
+            driver.assigned_buses = []
+        for driver in drivers:
+            if driver.busy_mask:
+                # Маска переносится к началу следующего окна; у водителей без занятости после
+                # начала следующего дня маска и интервалы становятся пустыми
+                driver.busy.discard_before(next_day_start)
+                driver.busy_mask >>= 1440
+
+def plan_rolling_horizon(routes, days=7, on_window=None, **kwargs):
+    """
+    Проходит все окна rolling_horizon и возвращает сводку по дням.
+    on_window(window): вызывается для каждого окна, пока его автобусы в памяти (например, для экспорта).
+    """
+    summary = []
+    for window in rolling_horizon(routes, days=days, **kwargs):
+        if on_window is not None:
+            on_window(window)
+        summary.append({
+            "day": window.day + 1,
+            "buses": len(window.buses),
+            "drivers_used": len(window.drivers),
+            "new_drivers": window.new_drivers,
+            "seconds": window.elapsed,
+        })
+    return summary
@@ -0,0 +1,111 @@
+"""
+Счётчики, таймеры и профилирование этапов работы (выключены по умолчанию).
+"""
+import cProfile
+import functools
+import json
+import pstats
+import time
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """
+    Счётчики и таймеры по этапам работы. По умолчанию выключены: инструментированные функции
+    проверяют один флаг и вызываются напрямую.
+    """
+    __slots__ = ('enabled', 'counters', 'timers', 'generations')
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.counters = {}
+        self.timers = {}  # имя -> [число вызовов, суммарное время в секундах]
+        self.generations = []  # по поколению ГА: номер, время, число оценок
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_time(self, name, seconds):
+        timer = self.timers.setdefault(name, [0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Замер времени произвольного участка кода."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def record_generation(self, gen, seconds, nevals, eval_seconds):
+        self.generations.append({"gen": gen, "seconds": seconds, "nevals": nevals, "eval_seconds": eval_seconds})
+
+    def report(self):
+        """Сводка в виде словаря, пригодного для JSON."""
+        evaluations = self.counters.get("evaluations", 0)
+        eval_time = self.timers.get("evaluation", [0, 0.0])[1]
+        return {
+            "counters": dict(self.counters),
+            "timers": {name: {"calls": calls, "total_seconds": total, "mean_seconds": total / calls if calls else 0.0}
+                       for name, (calls, total) in self.timers.items()},
+            "evaluations_per_second": evaluations / eval_time if eval_time else None,
+            "generations": list(self.generations),
+        }
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+# Общий объект инструментирования модуля
+INSTRUMENTATION = Instrumentation()
+
+def instrumented(name):
+    """Декоратор: при включённом INSTRUMENTATION считает вызовы и время функции под именем name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTATION.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                INSTRUMENTATION.add_time(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+@contextmanager
+def profiling(json_path=None, pstats_path=None, reset=True):
+    """
+    Включает инструментирование на время блока; при pstats_path дополнительно запускает cProfile.
+    По выходу сводка записывается в json_path (если задан), статистика cProfile - в pstats_path.
+    Возвращает объект Instrumentation (в конструкции with ... as).
+    """
+    if reset:
+        INSTRUMENTATION.reset()
+    previous = INSTRUMENTATION.enabled
+    INSTRUMENTATION.enabled = True
+    profiler = cProfile.Profile() if pstats_path else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield INSTRUMENTATION
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(pstats_path)
+        INSTRUMENTATION.enabled = previous
+        if json_path:
+            INSTRUMENTATION.dump_json(json_path)
+
+def print_profile(pstats_path, sort="cumulative", limit=20):
+    """Печатает самые затратные функции из файла статистики cProfile."""
+    pstats.Stats(pstats_path).sort_stats(sort).print_stats(limit)
@@ -0,0 +1,395 @@
+"""
+Модели данных: остановки, компактные расписания, автобусы, водители и шаблоны смен.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+# Список реальных остановок Москвы
+MOSCOW_STOPS = [
+    "Белорусская", "Новокузнецкая", "Киевская", "Павелецкая", "Тверская",
+    "Чистые пруды", "Лубянка", "Охотный ряд", "Красные Ворота", "Чёрная речка",
+    "Арбатская", "Смоленская", "Таганская", "Курская", "Краснопресненская",
+    "Китай-город", "Третьяковская", "Воробьёвы горы", "Баррикадная", "Кропоткинская",
+    "Парк культуры", "Нахимовский проспект", "Трубная", "Водный стадион", "ВДНХ",
+    "Проспект Вернадского", "Юго-Западная", "Филёвский парк", "Пионерская", "Мякинино",
+    "Новослободская"
+]
+
+def time_to_minutes(time_str):
+    """Конвертирует строку времени 'HH:MM' в количество минут с полуночи."""
+    h, m = map(int, time_str.split(':'))
+    return h * 60 + m
+
+def minutes_to_time(minutes, with_day=False):
+    """
+    Конвертирует количество минут с полуночи в строку времени 'HH:MM'.
+    with_day: для минут от начала горизонта планирования добавляет номер дня ('Д2 08:00').
+    """
+    h = (minutes // 60) % 24
+    m = minutes % 60
+    if with_day:
+        return f"Д{minutes // 1440 + 1} {h:02d}:{m:02d}"
+    return f"{h:02d}:{m:02d}"
+
+# Таблица интернированных названий остановок: расписания хранят индексы в этой таблице
+STOP_TABLE = []
+_STOP_INDEX = {}
+
+def intern_stop(name):
+    """Возвращает индекс остановки в STOP_TABLE, добавляя её при первом обращении."""
+    index = _STOP_INDEX.get(name)
+    if index is None:
+        index = len(STOP_TABLE)
+        STOP_TABLE.append(name)
+        _STOP_INDEX[name] = index
+    return index
+
+class Schedule:
+    """
+    Компактное расписание: поездки хранятся подряд в массивах индексов остановок и минут прибытия.
+    offsets[i]:offsets[i+1] - диапазон i-й поездки. Строки 'HH:MM' формируются только при экспорте.
+    """
+    __slots__ = ("stops", "times", "offsets")
+
+    def __init__(self):
+        self.stops = array("H")  # Индексы остановок в STOP_TABLE
+        self.times = array("H")  # Минуты с полуночи
+        self.offsets = array("I", [0])
+
+    @classmethod
+    def from_arrays(cls, stops, times, offsets):
+        """Создаёт расписание из массивов NumPy (индексы остановок, минуты, границы поездок)."""
+        import numpy as np  # Нужен только векторизованной генерации расписаний
+        schedule = cls()
+        schedule.stops = array("H", np.asarray(stops, dtype=np.uint16).tobytes())
+        schedule.times = array("H", np.asarray(times, dtype=np.uint16).tobytes())
+        schedule.offsets = array("I", np.asarray(offsets, dtype=np.uint32).tobytes())
+        return schedule
+
+    def append_trip(self, stop_indices, minutes):
+        self.stops.extend(stop_indices)
+        self.times.extend(minutes)
+        self.offsets.append(len(self.times))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def trip(self, i):
+        """Возвращает поездку как список (название остановки, минута прибытия)."""
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return [(STOP_TABLE[stop], minute) for stop, minute in zip(self.stops[lo:hi], self.times[lo:hi])]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.trip(i)
+
+    def trip_bounds(self):
+        """Возвращает список интервалов поездок (начало, конец) в минутах."""
+        times, offsets = self.times, self.offsets
+        return [(times[offsets[i]], times[offsets[i + 1] - 1]) for i in range(len(offsets) - 1)]
+
+    def first_time(self):
+        return self.times[0]
+
+    def to_tuples(self):
+        """Прежнее представление: список поездок [(остановка, 'HH:MM'), ...]."""
+        return [[(stop, minutes_to_time(minute)) for stop, minute in trip] for trip in self]
+
+class ScheduleView:
+    """
+    Расписание автобуса как представление общего неизменяемого расписания маршрута:
+    минуты base сдвигаются на offset и на вектор возмущений perturbation.
+    Вектор возмущений создаётся (или копируется, если он общий) только при изменении расписания.
+    """
+    __slots__ = ("base", "offset", "perturbation", "owns_perturbation", "fold")
+
+    def __init__(self, base, offset=0, perturbation=None, fold=True):
+        self.base = base  # Общее расписание маршрута (Schedule), не изменяется
+        self.offset = offset  # Сдвиг стартового времени автобуса в минутах
+        self.perturbation = perturbation  # array('h') отклонений по каждой остановке или None
+        self.owns_perturbation = False
+        # fold=False: минуты от начала горизонта планирования без свёртки в сутки
+        self.fold = fold
+
+    def _minute(self, pos):
+        minute = self.base.times[pos] + self.offset
+        if self.perturbation is not None:
+            minute += self.perturbation[pos]
+        return minute % 1440 if self.fold else minute
+
+    def __len__(self):
+        return len(self.base)
+
+    def trip(self, i):
+        """Возвращает поездку как список (название остановки, минута прибытия)."""
+        lo, hi = self.base.offsets[i], self.base.offsets[i + 1]
+        return [(STOP_TABLE[self.base.stops[pos]], self._minute(pos)) for pos in range(lo, hi)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.trip(i)
+
+    def trip_bounds(self):
+        """Возвращает список интервалов поездок (начало, конец) в минутах."""
+        offsets = self.base.offsets
+        if self.perturbation is None:
+            times, offset = self.base.times, self.offset
+            if not self.fold:
+                return [(times[offsets[i]] + offset, times[offsets[i + 1] - 1] + offset)
+                        for i in range(len(offsets) - 1)]
+            return [((times[offsets[i]] + offset) % 1440, (times[offsets[i + 1] - 1] + offset) % 1440)
+                    for i in range(len(offsets) - 1)]
+        return [(self._minute(offsets[i]), self._minute(offsets[i + 1] - 1)) for i in range(len(offsets) - 1)]
+
+    def first_time(self):
+        return self._minute(0)
+
+    def to_tuples(self):
+        """Прежнее представление: список поездок [(остановка, 'HH:MM'), ...]."""
+        return [[(stop, minutes_to_time(minute, with_day=not self.fold)) for stop, minute in trip] for trip in self]
+
+    def perturb(self, pos, delta):
+        """Сдвигает прибытие на остановку с позиции pos на delta минут (копирование при записи)."""
+        if self.perturbation is None:
+            self.perturbation = array("h", bytes(2 * len(self.base.times)))
+            self.owns_perturbation = True
+        elif not self.owns_perturbation:
+            self.perturbation = array("h", self.perturbation)
+            self.owns_perturbation = True
+        self.perturbation[pos] += delta
+
+    def materialize(self):
+        """Возвращает самостоятельное расписание Schedule с итоговыми минутами прибытия."""
+        schedule = Schedule()
+        schedule.stops = array("H", self.base.stops)
+        # Минуты без свёртки могут превышать диапазон 'H' на длинном горизонте
+        schedule.times = array("H" if self.fold else "I", (self._minute(pos) for pos in range(len(self.base.times))))
+        schedule.offsets = array("I", self.base.offsets)
+        return schedule
+
+    def fork(self):
+        """Дешёвая копия: общее расписание и вектор возмущений разделяются до первого изменения."""
+        return ScheduleView(self.base, self.offset, self.perturbation, self.fold)
+
+class IntervalSet:
+    """
+    Отсортированный набор непересекающихся интервалов (start, end) с поиском через bisect.
+    Пересекающиеся интервалы при добавлении объединяются, поэтому проверка занимает O(log n).
+    """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in intervals:
+            self.add(start, end)
+
+    def overlaps(self, start, end):
+        """Проверяет, пересекается ли интервал (start, end) хотя бы с одним интервалом набора."""
+        # Кандидат только один: последний интервал, начинающийся раньше конца запроса
+        i = bisect_left(self.starts, end) - 1
+        return i >= 0 and self.ends[i] > start
+
+    def add(self, start, end):
+        """Добавляет интервал, объединяя его с пересекающимися."""
+        lo = bisect_right(self.ends, start)
+        hi = bisect_left(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def last_end(self):
+        return self.ends[-1] if self.ends else -1
+
+    def discard_before(self, moment):
+        """Удаляет интервалы, закончившиеся не позже moment (прошедшее время горизонта)."""
+        i = bisect_right(self.ends, moment)
+        del self.starts[:i]
+        del self.ends[:i]
+
+    def __len__(self):
+        return len(self.starts)
+
+class Bus:
+    __slots__ = ("bus_id", "route", "schedule", "assigned_drivers")
+
+    def __init__(self, bus_id, route):
+        self.bus_id = bus_id
+        self.route = route
+        self.schedule = Schedule()  # Поездки: остановки с минутами прибытия
+        self.assigned_drivers = []  # Список водителей
+
+class Driver:
+    __slots__ = ("driver_id", "driver_type", "shifts", "assigned_buses", "busy", "busy_mask")
+
+    class Shift:
+        __slots__ = ("work", "rest", "rest_index")
+
+        def __init__(self, work, rests):
+            self.work = work  # tuple (start_min, end_min)
+            self.rest = rests  # list of tuples [(start_min, end_min), ...]
+            self.rest_index = IntervalSet(rests)  # Перерывы для быстрой проверки пересечений
+
+    def __init__(self, driver_id, driver_type):
+        self.driver_id = driver_id
+        self.driver_type = driver_type  # Ключ шаблона смены в SHIFT_TEMPLATES (1 или 2)
+        self.shifts = []  # Список смен: list of Shift objects
+        self.assigned_buses = []  # Список автобусов
+        self.busy = IntervalSet()  # Занятое время: поездки уже назначенных автобусов
+        self.busy_mask = 0  # То же занятое время битовой маской по минутам (trips_mask)
+
+def _bits(start, end):
+    """Битовая маска минут [start, end); минуты до нуля отбрасываются."""
+    start = max(start, 0)
+    if end <= start:
+        return 0
+    return (1 << end) - (1 << start)
+
+def trips_mask(trips):
+    """
+    Битовая маска занятости по поездкам (начало, конец): бит m установлен, если минута m занята.
+    Поездка через полночь продолжается после 1440 (как в _busy_interval), поездка нулевой длины
+    занимает одну минуту.
+    """
+    mask = 0
+    for trip_start, trip_end in trips:
+        if trip_end < trip_start:
+            trip_end += 1440
+        elif trip_end == trip_start:
+            trip_end += 1
+        mask |= (1 << trip_end) - (1 << trip_start)
+    return mask
+
+class ShiftTemplate:
+    """
+    Шаблон смены водителя и правила труда для его типа.
+    work: рабочие окна (начало, конец) в минутах от полуночи; несколько окон - разрывная смена,
+          конец после 1440 - ночная смена. rests: перерывы внутри окон.
+    break_window: окно, которого должна касаться хотя бы одна поездка (обед), или None.
+    max_continuous: максимум непрерывного вождения в минутах (None - без ограничения);
+    min_break: перерыв, обнуляющий непрерывное вождение; min_rest: отдых между рабочими днями.
+    Окна и перерывы компилируются в битовую маску разрешённых минут (allowed), поэтому
+    проверка автобуса сводится к одной операции над масками.
+    """
+    __slots__ = ("driver_type", "name", "work", "rests", "break_window", "max_continuous",
+                 "min_break", "min_rest", "allowed", "forbidden")
+
+    def __init__(self, driver_type, name, work, rests=(), break_window=None, max_continuous=None,
+                 min_break=10, min_rest=660):
+        self.driver_type = driver_type
+        self.name = name
+        self.work = list(work)
+        self.rests = list(rests)
+        self.break_window = break_window
+        self.max_continuous = max_continuous
+        self.min_break = min_break
+        self.min_rest = min_rest
+        self.compile()
+
+    def compile(self):
+        """
+        Строит маски доступности. Окна повторяются для соседних суток, чтобы поездки через полночь,
+        ночные смены (окна после 24:00) и расписания на следующие сутки проверялись без свёртки.
+        """
+        allowed = 0
+        for day_shift in (-1440, 0, 1440, 2880):
+            for start, end in self.work:
+                allowed |= _bits(start + day_shift, end + day_shift)
+            for start, end in self.rests:
+                allowed &= ~_bits(start + day_shift, end + day_shift)
+        self.allowed = allowed
+        # Отрицательное число: все минуты за пределами оси тоже запрещены
+        self.forbidden = ~allowed
+
+    def allows(self, mask):
+        """Все занятые минуты маски попадают в рабочие окна вне перерывов."""
+        return not mask & self.forbidden
+
+    def violations(self, trips_sorted):
+        """
+        Число нарушений правил шаблона (обед в break_window, непрерывное вождение не дольше
+        max_continuous) для поездок водителя, отсортированных по началу.
+        Общая проверка для распределения водителей и штрафов генетического алгоритма.
+        """
+        violations = 0
+        if self.break_window is not None:
+            # Проверяем наличие обеденного перерыва
+            window_start, window_end = self.break_window
+            lunch_break = False
+            for trip_start, trip_end in trips_sorted:
+                if window_start <= trip_start <= window_end or window_start <= trip_end <= window_end:
+                    lunch_break = True
+                    break
+            if not lunch_break:
+                violations += 1  # Отсутствие обеденного перерыва
+        if self.max_continuous is not None:
+            # Проверяем, что непрерывное вождение прерывается перерывами не короче min_break
+            work_time = 0
+            last_trip_end = None
+            for trip_start, trip_end in trips_sorted:
+                if last_trip_end:
+                    gap = trip_start - last_trip_end
+                    if gap >= self.min_break:
+                        work_time = 0  # Перерыв
+                work_time += trip_end - trip_start
+                if work_time > self.max_continuous:  # Превышение непрерывного вождения
+                    violations += 1
+                    work_time = 0
+                last_trip_end = trip_end
+        return violations
+
+    def fits(self, trips, mask=None):
+        """Поездки одного водителя помещаются в окна шаблона и не нарушают его правил (violations)."""
+        if mask is None:
+            mask = trips_mask(trips)
+        return self.allows(mask) and not self.violations(sorted(trips, key=lambda trip: trip[0]))
+
+    def make_shifts(self):
+        """Смены Driver.Shift для водителя: каждому окну достаются перерывы внутри него."""
+        return [Driver.Shift(work=(start, end),
+                             rests=[rest for rest in self.rests if start <= rest[0] and rest[1] <= end])
+                for start, end in self.work]
+
+# Шаблоны смен по типу водителя; новые правила подключаются через register_shift_template
+SHIFT_TEMPLATES = {
+    # Тип 1: Рабочий промежуток 08:00-16:00 с обедом 13:00-14:00
+    1: ShiftTemplate(1, "Дневная 8 ч", work=[(480, 960)], rests=[(780, 840)], break_window=(780, 840)),
+    # Тип 2: Рабочий промежуток 08:00-20:00 с перерывами 10:00-10:10 и 15:00-15:10,
+    # не более 4 часов вождения без 10-минутного перерыва
+    2: ShiftTemplate(2, "Дневная 12 ч", work=[(480, 1200)], rests=[(600, 610), (900, 910)],
+                     max_continuous=240, min_break=10),
+}
+
+# Дополнительные шаблоны, не подключённые по умолчанию
+NIGHT_SHIFT_TEMPLATE = ShiftTemplate(3, "Ночная", work=[(1320, 1800)], rests=[(1560, 1590)],
+                                     max_continuous=240, min_break=10)
+SPLIT_SHIFT_TEMPLATE = ShiftTemplate(4, "Разрывная", work=[(360, 600), (960, 1200)],
+                                     max_continuous=240, min_break=10)
+
+def register_shift_template(template):
+    """Добавляет (или заменяет) шаблон смены для типа template.driver_type."""
+    SHIFT_TEMPLATES[template.driver_type] = template
+
+def driver_template(driver):
+    return SHIFT_TEMPLATES.get(driver.driver_type)
+
+class Route:
+    __slots__ = ("route_id", "stops", "average_time_between_stops", "peak_variation", "offpeak_variation", "schedule")
+
+    def __init__(self, route_id, stops, average_time_between_stops, peak_duration_variation, offpeak_duration_variation):
+        self.route_id = route_id
+        self.stops = stops  # Список остановок
+        self.average_time_between_stops = average_time_between_stops  # Среднее время между остановками (минуты)
+        self.peak_variation = peak_duration_variation  # Вариация времени в пиковое время
+        self.offpeak_variation = offpeak_duration_variation  # Вариация времени в непиковое время
+        self.schedule = Schedule()  # Расписание поездок
+
+class Stop:
+    __slots__ = ("name", "index")
+
+    def __init__(self, name):
+        self.name = name
+        self.index = intern_stop(name)  # Индекс в STOP_TABLE
@@ -0,0 +1,326 @@
+"""
+Моделирование устойчивости назначения водителей к задержкам методом Монте-Карло (NumPy).
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .instrumentation import instrumented
+from .models import SHIFT_TEMPLATES
+from .assignment import _unfolded_trip_bounds
+from .export import _bus_id
+
+
+class DelayModel:
+    """
+    Плановые поездки и структура назначения в массивах для пакетного моделирования сценариев.
+    start, duration, variation: плановое начало, длительность и допустимое отклонение длительности
+    каждой поездки (пиковое или непиковое значение маршрута) на оси автобуса;
+    shift: сдвиг поездки на ось её водителя (время водителя = время автобуса - shift).
+    bus_steps: позиции k-х поездок автобусов и их предшественников для распространения опозданий.
+    pair_prev, pair_next: последовательные поездки водителя на разных автобусах (пересадки).
+    rest_trip, rest_start, rest_end: поездки, которые при опоздании могут зайти в перерыв шаблона водителя.
+    continuous_trips: поездки водителей с ограничением непрерывного вождения (строка на водителя, -1 - пусто).
+    planned_*: число нарушений каждого водителя в плане без задержек.
+    """
+    __slots__ = ("driver_ids", "start", "duration", "variation", "shift", "min_turnaround", "min_changeover",
+                 "bus_steps", "pair_prev", "pair_next", "pair_bounds", "pair_driver",
+                 "rest_trip", "rest_start", "rest_end", "rest_bounds", "rest_driver",
+                 "continuous_trips", "continuous_driver", "continuous_active", "max_continuous", "min_break",
+                 "planned_conflicts", "planned_missed")
+
+    @property
+    def num_trips(self):
+        return len(self.start)
+
+def _trip_owners(bus, trips, owner_by_bus, bus_blocks=None):
+    """
+    Водитель каждой поездки автобуса и сдвиг её времени на оси водителя.
+    С участками (DutyBlock) поездки [first_trip, last_trip] принадлежат водителю участка, а сдвиг совпадает
+    со сдвигом участка; целый автобус проверялся при назначении по поездкам в пределах суток.
+    owner_by_bus: ID автобуса -> ID первого водителя, в assigned_buses которого есть автобус.
+    """
+    if bus_blocks:
+        owners = [(None, 0)] * len(trips)
+        for block in bus_blocks:
+            shift = trips[block.first_trip][0] - block.start
+            for i in range(block.first_trip, block.last_trip + 1):
+                owners[i] = (block.driver_id, shift)
+        return owners
+    owner = owner_by_bus.get(bus.bus_id)
+    return [(owner, trip_start - trip_start % 1440) for trip_start, _ in trips]
+
+def _group_bounds(keys):
+    """Начала групп одинаковых ключей в отсортированном массиве и ключ каждой группы."""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    bounds = np.flatnonzero(first)
+    return bounds, keys[bounds]
+
+def build_delay_model(drivers, buses, blocks=None, peak_hours=((7, 10), (17, 20)), min_turnaround=0,
+                      min_changeover=0, rest_margin=120):
+    """
+    Строит DelayModel по назначению водителей целыми автобусами или по участкам
+    (blocks - участки из assign_drivers_blocks(..., return_blocks=True)).
+    min_turnaround: минимальная стоянка автобуса между поездками при опоздании;
+    min_changeover: минимальное время пересадки водителя с автобуса на автобус;
+    rest_margin: поездки, закончившиеся раньше перерыва больше чем на столько минут, не проверяются на заход в него.
+    """
+    driver_by_id = {driver.driver_id: driver for driver in drivers}
+    # Владелец автобуса берётся из assigned_buses водителей: генетический алгоритм хранит там ID автобусов
+    # и не заполняет bus.assigned_drivers
+    owner_by_bus = {}
+    for driver in drivers:
+        for bus in driver.assigned_buses:
+            owner_by_bus.setdefault(_bus_id(bus), driver.driver_id)
+    peak_mask = np.zeros(1440, dtype=bool)
+    for peak_start, peak_end in peak_hours:
+        peak_mask[peak_start * 60:peak_end * 60] = True
+
+    blocks_by_bus = {}
+    for block in blocks or ():
+        blocks_by_bus.setdefault(id(block.bus), []).append(block)
+
+    starts, ends, shifts, variations, trip_bus, trip_driver, position = [], [], [], [], [], [], []
+    for bus_index, bus in enumerate(buses):
+        trips = _unfolded_trip_bounds(bus)
+        owners = _trip_owners(bus, trips, owner_by_bus, blocks_by_bus.get(id(bus)))
+        for k, ((trip_start, trip_end), (owner, shift)) in enumerate(zip(trips, owners)):
+            starts.append(trip_start)
+            ends.append(trip_end)
+            shifts.append(shift)
+            in_peak = peak_mask[trip_start % 1440]
+            variations.append(bus.route.peak_variation if in_peak else bus.route.offpeak_variation)
+            trip_bus.append(bus_index)
+            trip_driver.append(owner if owner is not None else -1)
+            position.append(k)
+
+    model = DelayModel()
+    model.start = np.array(starts, dtype=np.int32)
+    model.duration = np.array(ends, dtype=np.int32) - model.start
+    model.variation = np.array(variations, dtype=np.int32)
+    model.shift = np.array(shifts, dtype=np.int32)
+    model.min_turnaround = min_turnaround
+    model.min_changeover = min_changeover
+    trip_bus = np.array(trip_bus, dtype=np.int64)
+    trip_driver = np.array(trip_driver, dtype=np.int64)
+    position = np.array(position, dtype=np.int64)
+
+    # Распространение опозданий: k-е поездки всех автобусов обрабатываются одним шагом
+    model.bus_steps = []
+    for k in range(int(position.max()) + 1 if len(position) else 0):
+        pos = np.flatnonzero(position == k)
+        model.bus_steps.append((pos, pos - 1 if k else None))
+
+    # Водители: индексы 0..D-1, поездки каждого водителя в порядке планового начала
+    driver_ids = np.unique(trip_driver[trip_driver >= 0])
+    model.driver_ids = driver_ids
+    owned = np.flatnonzero(trip_driver >= 0)
+    driver_index = np.searchsorted(driver_ids, trip_driver[owned])
+    driver_start = model.start - model.shift
+    order = np.lexsort((owned, driver_start[owned], driver_index))
+    sequence, sequence_driver = owned[order], driver_index[order]
+
+    # Пересадки: соседние поездки водителя на разных автобусах
+    same_driver = sequence_driver[1:] == sequence_driver[:-1]
+    changeover = same_driver & (trip_bus[sequence[1:]] != trip_bus[sequence[:-1]])
+    model.pair_prev = sequence[:-1][changeover]
+    model.pair_next = sequence[1:][changeover]
+    model.pair_bounds, model.pair_driver = _group_bounds(sequence_driver[1:][changeover])
+
+    # Перерывы шаблонов (повторённые для соседних суток, как в ShiftTemplate.compile) и поездки,
+    # которые могут в них зайти
+    rest_trip, rest_start, rest_end, rest_driver = [], [], [], []
+    sequence_end = driver_start[sequence] + model.duration[sequence]
+    for driver_pos in range(len(driver_ids)):
+        template = SHIFT_TEMPLATES.get(driver_by_id[int(driver_ids[driver_pos])].driver_type)
+        if template is None or not template.rests:
+            continue
+        lo, hi = np.searchsorted(sequence_driver, [driver_pos, driver_pos + 1])
+        trips, trip_starts, trip_ends = sequence[lo:hi], driver_start[sequence[lo:hi]], sequence_end[lo:hi]
+        for day_shift in (-1440, 0, 1440):
+            for start, end in template.rests:
+                start, end = start + day_shift, end + day_shift
+                # Поездка не начинается раньше плана, поэтому зайти в перерыв могут только более ранние поездки
+                near = (trip_starts < end) & (trip_ends > start - rest_margin)
+                rest_trip.append(trips[near])
+                rest_start.append(np.full(near.sum(), start, dtype=np.int32))
+                rest_end.append(np.full(near.sum(), end, dtype=np.int32))
+                rest_driver.append(np.full(near.sum(), driver_pos, dtype=np.int64))
+    concat = lambda parts, dtype: np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+    rest_driver = concat(rest_driver, np.int64)
+    order = np.argsort(rest_driver, kind="stable")
+    model.rest_trip = concat(rest_trip, np.int64)[order]
+    model.rest_start = concat(rest_start, np.int32)[order]
+    model.rest_end = concat(rest_end, np.int32)[order]
+    model.rest_bounds, model.rest_driver = _group_bounds(rest_driver[order])
+
+    # Непрерывное вождение: строки водителей по убыванию числа поездок, на k-м шаге активен префикс строк
+    rows, limits, breaks, row_driver = [], [], [], []
+    bounds, group_driver = _group_bounds(sequence_driver)
+    for lo, hi, driver_pos in zip(bounds, np.append(bounds[1:], len(sequence)), group_driver):
+        template = SHIFT_TEMPLATES.get(driver_by_id[int(driver_ids[driver_pos])].driver_type)
+        if template is not None and template.max_continuous is not None:
+            rows.append(sequence[lo:hi])
+            limits.append(template.max_continuous)
+            breaks.append(template.min_break)
+            row_driver.append(driver_pos)
+    by_length = sorted(range(len(rows)), key=lambda i: -len(rows[i]))
+    width = len(rows[by_length[0]]) if rows else 0
+    model.continuous_trips = np.full((len(rows), width), -1, dtype=np.int64)
+    for row, i in enumerate(by_length):
+        model.continuous_trips[row, :len(rows[i])] = rows[i]
+    lengths = np.array([len(rows[i]) for i in by_length], dtype=np.int64)
+    model.continuous_active = np.searchsorted(-lengths, -np.arange(width), side="left")
+    model.continuous_driver = np.array([row_driver[i] for i in by_length], dtype=np.int64)
+    model.max_continuous = np.array([limits[i] for i in by_length], dtype=np.int32)
+    model.min_break = np.array([breaks[i] for i in by_length], dtype=np.int32)
+
+    # Нарушения плана без задержек: в сценариях учитываются только новые
+    model.planned_conflicts = np.zeros(len(driver_ids), dtype=np.int64)
+    model.planned_missed = np.zeros(len(driver_ids), dtype=np.int64)
+    planned_start = model.start[:, None]
+    conflicts, missed = _violation_counts(model, planned_start, planned_start + model.duration[:, None])
+    model.planned_conflicts, model.planned_missed = conflicts[:, 0], missed[:, 0]
+    return model
+
+def _per_driver(model, events, bounds, group_driver):
+    """Суммирует события (событие x сценарий), упорядоченные по водителю, в матрицу (водитель x сценарий)."""
+    counts = np.zeros((len(model.driver_ids), events.shape[1]), dtype=np.int64)
+    if events.shape[0]:
+        counts[group_driver] = np.add.reduceat(events, bounds, axis=0)
+    return counts
+
+def _violation_counts(model, actual_start, actual_end):
+    """
+    Число нарушений каждого водителя в каждом сценарии: опоздания на пересадку и пропущенные перерывы
+    (заход поездки в перерыв шаблона или превышение непрерывного вождения).
+    actual_start, actual_end: матрицы (поездка x сценарий) на оси автобусов; строка поездки непрерывна
+    в памяти, поэтому выборка поездок водителей - копирование строк.
+    Возвращает две матрицы (водитель x сценарий).
+    """
+    shift = model.shift[:, None]
+    actual_start, actual_end = actual_start - shift, actual_end - shift
+    conflicts = _per_driver(
+        model, actual_start[model.pair_next] < actual_end[model.pair_prev] + model.min_changeover,
+        model.pair_bounds, model.pair_driver)
+
+    rest_start, rest_end = actual_start[model.rest_trip], actual_end[model.rest_trip]
+    missed = _per_driver(model, (rest_start < model.rest_end[:, None]) & (rest_end > model.rest_start[:, None]),
+                         model.rest_bounds, model.rest_driver)
+
+    num_rows = len(model.continuous_driver)
+    if num_rows:
+        scenarios = actual_start.shape[1]
+        work = np.zeros((num_rows, scenarios), dtype=np.int32)
+        last_end = np.zeros((num_rows, scenarios), dtype=np.int32)
+        exceeded = np.zeros((num_rows, scenarios), dtype=np.int64)
+        max_continuous, min_break = model.max_continuous[:, None], model.min_break[:, None]
+        for k, active in enumerate(model.continuous_active):
+            trips = model.continuous_trips[:active, k]
+            cur_start, cur_end = actual_start[trips], actual_end[trips]
+            cur_work = work[:active]
+            if k:
+                # Перерыв не короче min_break обнуляет накопленное время работы (как в driver_violations)
+                cur_work = np.where(cur_start - last_end[:active] >= min_break[:active], 0, cur_work)
+            cur_work = cur_work + (cur_end - cur_start)
+            over = cur_work > max_continuous[:active]
+            exceeded[:active] += over
+            work[:active] = np.where(over, 0, cur_work)
+            last_end[:active] = cur_end
+        np.add.at(missed, model.continuous_driver, exceeded)
+    return conflicts, missed
+
+def _simulate_chunk(model, seed_sequence, scenarios):
+    """
+    Моделирует пакет сценариев: отклонение длительности каждой поездки равномерно в ±variation минут,
+    автобус не отправляется раньше плана и не раньше конца предыдущей поездки плюс min_turnaround.
+    Возвращает суммы по пакету.
+    """
+    rng = np.random.default_rng(seed_sequence)
+    variation = model.variation[:, None]
+    delay = rng.integers(-variation, variation + 1, size=(model.num_trips, scenarios), dtype=np.int32)
+    duration = np.maximum(model.duration[:, None] + delay, 0)
+    actual_start = np.empty((model.num_trips, scenarios), dtype=np.int32)
+    actual_end = np.empty_like(actual_start)
+    for pos, prev in model.bus_steps:
+        if prev is None:
+            start = model.start[pos, None]
+        else:
+            start = np.maximum(model.start[pos, None], actual_end[prev] + model.min_turnaround)
+        actual_start[pos] = start
+        actual_end[pos] = start + duration[pos]
+
+    conflicts, missed = _violation_counts(model, actual_start, actual_end)
+    conflict = conflicts > model.planned_conflicts[:, None]
+    missed = missed > model.planned_missed[:, None]
+    return {
+        "scenarios": scenarios,
+        "conflict_scenarios": int(conflict.any(axis=0).sum()),
+        "missed_break_scenarios": int(missed.any(axis=0).sum()),
+        "driver_conflicts": conflict.sum(axis=1),
+        "driver_missed_breaks": missed.sum(axis=1),
+        "max_lateness": int((actual_end - (model.start + model.duration)[:, None]).max(initial=0)),
+    }
+
+# Модель задержек в процессе-воркере: передаётся один раз при запуске процесса
+_WORKER_DELAY_MODEL = None
+
+def _init_simulation_worker(model):
+    global _WORKER_DELAY_MODEL
+    _WORKER_DELAY_MODEL = model
+
+def _simulate_worker_chunk(seed_sequence, scenarios):
+    return _simulate_chunk(_WORKER_DELAY_MODEL, seed_sequence, scenarios)
+
+@instrumented("simulate_delays")
+def simulate_delays(drivers, buses, scenarios=1000, blocks=None, chunk_size=None, workers=None, seed=None,
+                    peak_hours=((7, 10), (17, 20)), min_turnaround=0, min_changeover=0):
+    """
+    Монте-Карло оценка устойчивости фиксированного назначения водителей к задержкам.
+    blocks: участки назначения по пунктам смены (assign_drivers_blocks(..., return_blocks=True)).
+    Сценарии обрабатываются пакетами по chunk_size (матрица поездка x сценарий; по умолчанию
+    около 8 млн элементов на пакет), пакеты распределяются между workers процессами.
+    Каждый пакет получает своё зерно из SeedSequence(seed), поэтому результат не зависит от числа процессов.
+    Возвращает словарь: вероятности хотя бы одного опоздания на пересадку (conflict_probability)
+    и хотя бы одного пропущенного перерыва (missed_break_probability) за сценарий, среднее число
+    затронутых водителей и вероятности по водителям (только ненулевые).
+    Нарушения, уже присутствующие в плане, выводятся отдельно и в вероятностях не учитываются.
+    """
+    start_time = time.perf_counter()
+    model = build_delay_model(drivers, buses, blocks=blocks, peak_hours=peak_hours, min_turnaround=min_turnaround,
+                              min_changeover=min_changeover)
+    chunk_size = chunk_size or max(1, min(scenarios, 8_000_000 // max(model.num_trips, 1)))
+    sizes = [min(chunk_size, scenarios - done) for done in range(0, scenarios, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_simulation_worker,
+                                 initargs=(model,)) as executor:
+            chunks = list(executor.map(_simulate_worker_chunk, seeds, sizes))
+    else:
+        chunks = [_simulate_chunk(model, seed_sequence, size) for seed_sequence, size in zip(seeds, sizes)]
+
+    driver_conflicts = sum(chunk["driver_conflicts"] for chunk in chunks)
+    driver_missed = sum(chunk["driver_missed_breaks"] for chunk in chunks)
+    driver_ids = model.driver_ids.tolist()
+    return {
+        "scenarios": scenarios,
+        "trips": model.num_trips,
+        "drivers": len(driver_ids),
+        "conflict_probability": sum(chunk["conflict_scenarios"] for chunk in chunks) / scenarios,
+        "missed_break_probability": sum(chunk["missed_break_scenarios"] for chunk in chunks) / scenarios,
+        "expected_conflict_drivers": float(driver_conflicts.sum()) / scenarios,
+        "expected_missed_break_drivers": float(driver_missed.sum()) / scenarios,
+        "driver_conflict_probability": {driver_ids[i]: float(driver_conflicts[i]) / scenarios
+                                        for i in np.flatnonzero(driver_conflicts)},
+        "driver_missed_break_probability": {driver_ids[i]: float(driver_missed[i]) / scenarios
+                                            for i in np.flatnonzero(driver_missed)},
+        "planned_conflicts": int(model.planned_conflicts.sum()),
+        "planned_missed_breaks": int(model.planned_missed.sum()),
+        "max_lateness": max(chunk["max_lateness"] for chunk in chunks),
+        "elapsed": time.perf_counter() - start_time,
+    }
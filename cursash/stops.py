@@ -0,0 +1,172 @@
+"""
+Расписание по остановкам для пассажирских запросов (NumPy).
+"""
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+from .models import minutes_to_time, STOP_TABLE, time_to_minutes, _STOP_INDEX
+
+
+class StopTimetable:
+    """
+    Расписание по остановкам для пассажирских запросов.
+    Для каждой остановки хранятся отсортированные минуты отправления всех автобусов всех маршрутов
+    (поиск ближайших отправлений - двоичный поиск). Для поиска маршрута поездки строится
+    список связей (перегонов между соседними остановками поездки), отсортированный по времени
+    отправления, и используется сканирование связей (Connection Scan Algorithm).
+    Минуты свёрнуты в сутки; связи дублируются на следующие сутки, чтобы поездки после полуночи
+    находились без отдельной обработки.
+    """
+    __slots__ = ("departures", "conn_dep", "conn_arr", "conn_from", "conn_to", "conn_trip",
+                 "trip_bus", "trip_route")
+
+    def __init__(self, buses):
+        stop_parts, minute_parts, bus_parts, route_parts = [], [], [], []
+        dep_parts, arr_parts, from_parts, to_parts, trip_parts = [], [], [], [], []
+        trip_bus, trip_route = [], []
+        for bus in buses:
+            schedule = bus.schedule
+            base = getattr(schedule, "base", schedule)
+            offsets = np.asarray(base.offsets, dtype=np.int64)
+            if len(offsets) < 2:
+                continue
+            minutes = np.asarray(base.times, dtype=np.int64) + getattr(schedule, "offset", 0)
+            if getattr(schedule, "perturbation", None) is not None:
+                minutes += np.asarray(schedule.perturbation, dtype=np.int64)
+            minutes %= 1440
+            stops = np.asarray(base.stops, dtype=np.int64)
+            num_trips = len(offsets) - 1
+            trip_of = np.repeat(np.arange(num_trips), np.diff(offsets)) + len(trip_bus)
+
+            # Поездка через полночь: минуты внутри поездки продолжают расти после 1440.
+            # Переходом через полночь считается только скачок больше чем на полсуток: отклонения
+            # времени остановок (bus_variation) могут сдвинуть остановку на несколько минут назад
+            wrap = np.zeros(len(minutes), dtype=np.int64)
+            step = np.diff(minutes)
+            same_trip = trip_of[1:] == trip_of[:-1]
+            wrap[1:] = ((step < -720).astype(np.int64) - (step > 720)) * same_trip
+            wrap = np.cumsum(wrap)
+            wrap -= np.repeat(wrap[offsets[:-1]], np.diff(offsets))
+            unfolded = minutes + 1440 * wrap
+
+            # Связь = перегон от позиции pos к pos + 1 внутри одной поездки
+            not_last = np.ones(len(minutes), dtype=bool)
+            not_last[offsets[1:] - 1] = False
+            pos = np.flatnonzero(not_last)
+            stop_parts.append(stops[pos])
+            minute_parts.append(minutes[pos])
+            bus_parts.append(np.full(len(pos), bus.bus_id, dtype=np.int64))
+            route_parts.append(np.full(len(pos), bus.route.route_id, dtype=np.int64))
+            dep_parts.append(unfolded[pos])
+            # Остановка, сдвинутая отклонением раньше предыдущей, не даёт прибытия раньше отправления
+            arr_parts.append(np.maximum(unfolded[pos + 1], unfolded[pos]))
+            from_parts.append(stops[pos])
+            to_parts.append(stops[pos + 1])
+            trip_parts.append(trip_of[pos])
+            trip_bus.extend([bus.bus_id] * num_trips)
+            trip_route.extend([bus.route.route_id] * num_trips)
+
+        def concat(parts):
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+        # Отправления по остановкам
+        stop_idx, minute = concat(stop_parts), concat(minute_parts)
+        bus_id, route_id = concat(bus_parts), concat(route_parts)
+        order = np.lexsort((minute, stop_idx))
+        stop_idx, minute, bus_id, route_id = stop_idx[order], minute[order], bus_id[order], route_id[order]
+        bounds = np.flatnonzero(np.diff(stop_idx)) + 1
+        self.departures = {}
+        for lo, hi in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(stop_idx)]))):
+            if hi > lo:
+                self.departures[int(stop_idx[lo])] = (minute[lo:hi], route_id[lo:hi], bus_id[lo:hi])
+
+        # Связи на двое суток, отсортированные по отправлению
+        num_trips = len(trip_bus)
+        dep, arr = concat(dep_parts), concat(arr_parts)
+        conn_from, conn_to, conn_trip = concat(from_parts), concat(to_parts), concat(trip_parts)
+        dep = np.concatenate((dep, dep + 1440))
+        arr = np.concatenate((arr, arr + 1440))
+        conn_from = np.concatenate((conn_from, conn_from))
+        conn_to = np.concatenate((conn_to, conn_to))
+        conn_trip = np.concatenate((conn_trip, conn_trip + num_trips))
+        order = np.argsort(dep, kind="stable")
+        self.conn_dep = array("i", dep[order].astype(np.int32).tobytes())
+        self.conn_arr = array("i", arr[order].astype(np.int32).tobytes())
+        self.conn_from = array("i", conn_from[order].astype(np.int32).tobytes())
+        self.conn_to = array("i", conn_to[order].astype(np.int32).tobytes())
+        self.conn_trip = array("i", conn_trip[order].astype(np.int32).tobytes())
+        self.trip_bus = trip_bus * 2
+        self.trip_route = trip_route * 2
+
+    @staticmethod
+    def _minute(moment):
+        return time_to_minutes(moment) if isinstance(moment, str) else moment
+
+    def next_departures(self, stop_name, after, n=5):
+        """
+        Ближайшие n отправлений с остановки начиная с момента after ('HH:MM' или минуты),
+        с переходом на следующие сутки. Возвращает список ('HH:MM', маршрут, автобус).
+        """
+        if stop_name not in _STOP_INDEX or _STOP_INDEX[stop_name] not in self.departures:
+            return []
+        minutes, routes, buses = self.departures[_STOP_INDEX[stop_name]]
+        start = int(np.searchsorted(minutes, self._minute(after) % 1440, side="left"))
+        result = []
+        for k in range(min(n, len(minutes))):
+            i = (start + k) % len(minutes)
+            result.append((minutes_to_time(int(minutes[i])), int(routes[i]), int(buses[i])))
+        return result
+
+    def earliest_arrival(self, origin, destination, depart, min_transfer=0, horizon=1440):
+        """
+        Самое раннее прибытие из origin в destination при отправлении не раньше depart
+        (сканирование связей). min_transfer: минимальное время пересадки в минутах;
+        horizon: сколько минут после depart просматривать.
+        Возвращает {"arrival": минута прибытия (больше 1440 - следующие сутки), "legs": [...]},
+        где каждый участок - (маршрут, автобус, откуда, 'HH:MM', куда, 'HH:MM'); None, если пути нет.
+        """
+        if origin not in _STOP_INDEX or destination not in _STOP_INDEX:
+            return None
+        source, target = _STOP_INDEX[origin], _STOP_INDEX[destination]
+        start = self._minute(depart) % 1440
+        if source == target:
+            return {"arrival": start, "legs": []}
+        dep, arr, conn_from, conn_to, conn_trip = self.conn_dep, self.conn_arr, self.conn_from, self.conn_to, self.conn_trip
+        infinity = float("inf")
+        earliest = {source: start}
+        reached_by = {}  # остановка -> связь, по которой достигнута
+        boarded = {}  # поездка -> связь, на которой в неё сели
+        limit = start + horizon
+        for i in range(bisect_left(dep, start), len(dep)):
+            departure = dep[i]
+            if departure >= earliest.get(target, infinity) or departure > limit:
+                break
+            trip = conn_trip[i]
+            if trip not in boarded:
+                stop = conn_from[i]
+                ready = earliest.get(stop, infinity)
+                if stop != source:
+                    ready += min_transfer
+                if ready > departure:
+                    continue
+                boarded[trip] = i
+            arrival = arr[i]
+            if arrival < earliest.get(conn_to[i], infinity):
+                earliest[conn_to[i]] = arrival
+                reached_by[conn_to[i]] = i
+
+        if target not in earliest:
+            return None
+        legs = []
+        stop = target
+        while stop != source:
+            last = reached_by[stop]
+            first = boarded[conn_trip[last]]
+            trip = conn_trip[last]
+            legs.append((self.trip_route[trip], self.trip_bus[trip], STOP_TABLE[conn_from[first]],
+                         minutes_to_time(dep[first]), STOP_TABLE[stop], minutes_to_time(arr[last])))
+            stop = conn_from[first]
+        legs.reverse()
+        return {"arrival": earliest[target], "legs": legs}
@@ -0,0 +1,324 @@
+"""
+Генерация маршрутов и расписаний движения автобусов.
+"""
+import heapq
+import random
+
+from .instrumentation import instrumented
+from .models import Bus, MOSCOW_STOPS, Route, Schedule, ScheduleView, Stop
+
+
+def generate_random_routes(num_routes=20, stops_pool=MOSCOW_STOPS, min_stops=5, max_stops=15,
+                           average_time_between_stops=5):
+    routes = []
+    for route_id in range(1, num_routes + 1):
+        # Выбор случайных остановок для маршрута без повторений
+        num_stops = random.randint(min_stops, max_stops)
+        stops = random.sample(stops_pool, num_stops)
+
+        # Генерация вариаций времени между остановками
+        peak_variation = 2  # ±2 минуты в пиковое время
+        offpeak_variation = 5  # ±5 минут в непиковое время
+
+        # Создание объекта Route
+        route = Route(
+            route_id=route_id,
+            stops=[Stop(name=stop) for stop in stops],
+            average_time_between_stops=average_time_between_stops,
+            peak_duration_variation=peak_variation,
+            offpeak_duration_variation=offpeak_variation
+        )
+
+        routes.append(route)
+
+    return routes
+
+@instrumented("generate_route_schedule")
+def generate_route_schedule(route, start_time_min, operation_hours=24, peak_hours=((7, 10), (17, 20)), fold=True):
+    """
+    Генерирует расписание для маршрута с учётом загруженности и стартового времени.
+    Добавляет как прямые, так и обратные поездки для возвратного маршрута.
+    peak_hours: кортеж кортежей, содержащих время начала и окончания пиковых часов.
+    start_time_min: количество минут с полуночи, определяющее начальное время первой поездки.
+    fold: сворачивать минуты в сутки; при fold=False поездки после полуночи продолжают отсчёт (1440, 1441, ...).
+    """
+    day = 1440 if fold else 1 << 16
+    schedule = Schedule()
+    current_time_min = start_time_min
+    end_time_min = start_time_min + operation_hours * 60
+
+    # Создаём список остановок для прямой и обратной поездки
+    forward_stops = route.stops
+    backward_stops = list(reversed(route.stops))[1:-1]  # Исключаем первый и последний, чтобы не повторять начальную остановку
+
+    while current_time_min < end_time_min:
+        # Прямая поездка
+        in_peak = False
+        for peak_start, peak_end in peak_hours:
+            peak_start_min = peak_start * 60
+            peak_end_min = peak_end * 60
+            current_time_mod = current_time_min % 1440  # Время в пределах суток
+            if peak_start_min <= current_time_mod < peak_end_min:
+                in_peak = True
+                break
+
+        if in_peak:
+            variation = random.randint(-route.peak_variation, route.peak_variation)  # Вариация в пиковое время
+        else:
+            variation = random.randint(-route.offpeak_variation, route.offpeak_variation)  # Вариация в непиковое время
+
+        # Расчёт общей длительности прямой поездки
+        trip_duration = len(forward_stops) * route.average_time_between_stops + variation
+        trip_start_min = current_time_min
+        trip_end_min = trip_start_min + trip_duration
+
+        # Генерация расписания по остановкам (прямая поездка)
+        trip_times_forward = []
+        trip_time = trip_start_min
+        for stop in forward_stops:
+            trip_times_forward.append(trip_time % day)
+            # Прибавляем среднее время между остановками с вариацией
+            travel_time_variation = random.randint(-2, 2)
+            trip_time += route.average_time_between_stops + travel_time_variation
+
+        schedule.append_trip([stop.index for stop in forward_stops], trip_times_forward)
+
+        # Обратная поездка
+        current_time_min = trip_end_min + 10  # Перерыв между маршрутами
+
+        in_peak = False
+        for peak_start, peak_end in peak_hours:
+            peak_start_min = peak_start * 60
+            peak_end_min = peak_end * 60
+            current_time_mod = current_time_min % 1440
+            if peak_start_min <= current_time_mod < peak_end_min:
+                in_peak = True
+                break
+
+        if in_peak:
+            variation = random.randint(-route.peak_variation, route.peak_variation)
+        else:
+            variation = random.randint(-route.offpeak_variation, route.offpeak_variation)
+
+        # Расчёт общей длительности обратной поездки
+        trip_duration = len(backward_stops) * route.average_time_between_stops + variation
+        trip_start_min = current_time_min
+        trip_end_min = trip_start_min + trip_duration
+
+        # Генерация расписания по остановкам (обратная поездка)
+        trip_times_backward = []
+        trip_time = trip_start_min
+        for stop in backward_stops:
+            trip_times_backward.append(trip_time % day)
+            travel_time_variation = random.randint(-2, 2)
+            trip_time += route.average_time_between_stops + travel_time_variation
+        # Возвращаемся на начальную остановку
+        trip_times_backward.append(trip_time % day)
+
+        schedule.append_trip([stop.index for stop in backward_stops] + [forward_stops[0].index], trip_times_backward)
+
+        current_time_min = trip_end_min + 10  # Перерыв между маршрутами
+
+    route.schedule = schedule
+    return schedule
+
+@instrumented("generate_city_schedules")
+def generate_city_schedules(routes, start_time_min=0, operation_hours=24, peak_hours=((7, 10), (17, 20)), seed=None):
+    """
+    Пакетная генерация расписаний всех маршрутов сразу с помощью NumPy.
+    Повторяет логику generate_route_schedule: пары прямой и обратной поездки, вариация длительности
+    в пиковое и непиковое время, случайное отклонение ±2 минуты между остановками.
+    Цикл идёт по номеру пары поездок, все маршруты обрабатываются одновременно.
+    seed: зерно numpy.random.Generator для воспроизводимости.
+    Возвращает список расписаний Schedule в порядке routes и записывает их в route.schedule.
+    """
+    import numpy as np  # Ядро пакета не зависит от NumPy: он загружается только для пакетной генерации
+    rng = np.random.default_rng(seed)
+    num_routes = len(routes)
+    if num_routes == 0:
+        return []
+    num_stops = np.array([len(route.stops) for route in routes])
+    avg = np.array([route.average_time_between_stops for route in routes])
+    peak_var = np.array([route.peak_variation for route in routes])
+    offpeak_var = np.array([route.offpeak_variation for route in routes])
+    max_stops = num_stops.max()
+    # Маска пиковых минут суток
+    peak_mask = np.zeros(1440, dtype=bool)
+    for peak_start, peak_end in peak_hours:
+        peak_mask[peak_start * 60:peak_end * 60] = True
+
+    end_time_min = start_time_min + operation_hours * 60
+    current = np.full(num_routes, start_time_min, dtype=np.int64)
+    column = np.arange(max_stops)
+    forward_times, backward_times, active_pairs = [], [], []
+
+    def trip_times(trip_start, stops_in_trip):
+        # Время прибытия на остановки: накопленная сумма средних интервалов с отклонениями
+        steps = avg[:, None] + rng.integers(-2, 3, size=(num_routes, max_stops))
+        times = trip_start[:, None] + np.cumsum(steps, axis=1) - steps
+        return np.where(column[None, :] < stops_in_trip[:, None], times, 0)
+
+    def variation():
+        in_peak = peak_mask[current % 1440]
+        limit = np.where(in_peak, peak_var, offpeak_var)
+        return rng.integers(-limit, limit + 1)
+
+    active = current < end_time_min
+    while active.any():
+        active_pairs.append(active)
+        # Прямая поездка
+        forward_times.append(trip_times(current, num_stops))
+        current = np.where(active, current + num_stops * avg + variation() + 10, current)
+        # Обратная поездка: все остановки, кроме конечной, и возврат на начальную
+        backward_times.append(trip_times(current, num_stops - 1))
+        current = np.where(active, current + (num_stops - 2) * avg + variation() + 10, current)
+        active = active & (current < end_time_min)
+
+    pairs = np.array(active_pairs)  # (число пар, число маршрутов)
+    forward_times = np.array(forward_times)
+    backward_times = np.array(backward_times)
+    schedules = []
+    for r, route in enumerate(routes):
+        num_pairs = int(pairs[:, r].sum())
+        n = num_stops[r]
+        stop_index = np.array([stop.index for stop in route.stops])
+        forward = forward_times[:num_pairs, r, :n]
+        backward = backward_times[:num_pairs, r, :n - 1]
+        times = np.concatenate([forward, backward], axis=1).ravel() % 1440
+        pattern = np.concatenate([stop_index, stop_index[::-1][1:-1], stop_index[:1]])
+        stops = np.tile(pattern, num_pairs)
+        offsets = np.concatenate([[0], np.cumsum(np.tile([n, n - 1], num_pairs))])
+        schedule = Schedule.from_arrays(stops, times, offsets)
+        route.schedule = schedule
+        schedules.append(schedule)
+    return schedules
+
+def _in_peak(minute, peak_hours):
+    minute %= 1440
+    return any(peak_start * 60 <= minute < peak_end * 60 for peak_start, peak_end in peak_hours)
+
+def plan_route_departures(route, peak_headway=12, offpeak_headway=20, start_time_min=0, operation_hours=24,
+                          peak_hours=((7, 10), (17, 20)), layover=10):
+    """
+    Рейсы маршрута (туда и обратно) с начальной остановки по целевым интервалам движения:
+    peak_headway в часы пик, offpeak_headway в остальное время.
+    Время хода как в generate_route_schedule: average_time_between_stops на перегон, обратно на два
+    перегона меньше; после каждого направления - отстой layover и резерв на максимальное отклонение
+    длительности своего периода (peak_variation или offpeak_variation), поэтому цепочка рейсов
+    выполнима при любом отклонении в этих пределах.
+    Возвращает список (отправление, начало обратного направления, освобождение автобуса) в минутах.
+    """
+    n = len(route.stops)
+    average = route.average_time_between_stops
+    end_time_min = start_time_min + operation_hours * 60
+    round_trips = []
+    departure = start_time_min
+    while departure < end_time_min:
+        forward_pad = route.peak_variation if _in_peak(departure, peak_hours) else route.offpeak_variation
+        backward = departure + n * average + forward_pad + layover
+        backward_pad = route.peak_variation if _in_peak(backward, peak_hours) else route.offpeak_variation
+        round_trips.append((departure, backward, backward + (n - 2) * average + backward_pad + layover))
+        departure += peak_headway if _in_peak(departure, peak_hours) else offpeak_headway
+    return round_trips
+
+def chain_vehicle_blocks(round_trips):
+    """
+    Цепочки рейсов для минимального числа автобусов. Рейсы в порядке отправления получает автобус,
+    освободившийся раньше всех (куча по времени освобождения); новый автобус нужен, только если
+    все заняты. Для интервалов это оптимально: автобусов столько, сколько рейсов выполняется одновременно.
+    Возвращает список цепочек индексов рейсов.
+    """
+    blocks = []
+    free = []  # (время освобождения, номер цепочки)
+    for index in sorted(range(len(round_trips)), key=lambda i: round_trips[i][0]):
+        departure, _, release = round_trips[index]
+        if free and free[0][0] <= departure:
+            _, block = heapq.heapreplace(free, (release, free[0][1]))
+        else:
+            block = len(blocks)
+            blocks.append([])
+            heapq.heappush(free, (release, block))
+        blocks[block].append(index)
+    return blocks
+
+def _append_round_trip(schedule, route, departure, backward):
+    average = route.average_time_between_stops
+    forward_stops = [stop.index for stop in route.stops]
+    backward_stops = forward_stops[-2:0:-1] + forward_stops[:1]
+    schedule.append_trip(forward_stops, [(departure + i * average) % 1440 for i in range(len(forward_stops))])
+    schedule.append_trip(backward_stops, [(backward + i * average) % 1440 for i in range(len(backward_stops))])
+
+@instrumented("size_fleet")
+def size_fleet(routes, peak_headway=12, offpeak_headway=20, start_time_min=0, operation_hours=24,
+               peak_hours=((7, 10), (17, 20)), layover=10):
+    """
+    Парк по спросу: для каждого маршрута строятся рейсы по целевым интервалам (plan_route_departures)
+    и сцепляются в минимальное число автобусов (chain_vehicle_blocks). Расписание автобуса содержит
+    только рейсы его цепочки, поэтому в межпиковое время автобусы простаивают, а не работают весь день.
+    Записывает в route.schedule полное расписание маршрута. Возвращает список автобусов.
+    """
+    buses = []
+    for route in routes:
+        round_trips = plan_route_departures(route, peak_headway, offpeak_headway, start_time_min,
+                                            operation_hours, peak_hours, layover)
+        timetable = Schedule()
+        for departure, backward, _ in round_trips:
+            _append_round_trip(timetable, route, departure, backward)
+        route.schedule = ScheduleView(timetable)
+        for block in chain_vehicle_blocks(round_trips):
+            schedule = Schedule()
+            for index in block:
+                _append_round_trip(schedule, route, *round_trips[index][:2])
+            bus = Bus(bus_id=len(buses) + 1, route=route)
+            bus.schedule = ScheduleView(schedule)
+            buses.append(bus)
+    return buses
+
+@instrumented("manage_buses")
+def manage_buses(routes, min_buses_per_route=10, bus_variation=0, vectorized=False, seed=None, headways=None,
+                 peak_hours=((7, 10), (17, 20))):
+    """
+    Управляет количеством автобусов, гарантируя минимальное количество автобусов на каждом маршруте.
+    Каждому автобусу назначается уникальное стартовое время для равномерного распределения поездок.
+    Расписание маршрута генерируется один раз; автобусы ссылаются на него со своим сдвигом.
+    bus_variation: если больше нуля, каждому автобусу добавляются собственные отклонения
+    ±bus_variation минут на каждой остановке.
+    vectorized: генерировать расписания всех маршрутов пакетно (generate_city_schedules) с зерном seed.
+    headways: (интервал в пик, интервал вне пика) в минутах; если задан, число автобусов каждого маршрута
+    определяется спросом (size_fleet с часами пик peak_hours), а min_buses_per_route не используется.
+    """
+    if headways is not None:
+        return size_fleet(routes, *headways, peak_hours=peak_hours)
+    buses = []
+    bus_id = 1
+    if vectorized:
+        bases = generate_city_schedules(routes, seed=seed)
+    for r, route in enumerate(routes):
+        # Общее расписание маршрута от полуночи, автобусы получают только сдвиг
+        base = bases[r] if vectorized else generate_route_schedule(route, 0)
+        route.schedule = ScheduleView(base, 480)
+        # Расчет интервала между стартами автобусов на маршруте
+        interval_min = 1440 / min_buses_per_route  # 1440 минут в сутках
+        for i in range(min_buses_per_route):
+            bus = Bus(bus_id=bus_id, route=route)
+            # Расчет стартового времени для автобуса
+            start_time_min = 480 + int(i * interval_min)  # Начало в 08:00 (480 минут)
+            bus.schedule = ScheduleView(base, start_time_min)
+            if bus_variation:
+                for pos in range(len(base.times)):
+                    bus.schedule.perturb(pos, random.randint(-bus_variation, bus_variation))
+            buses.append(bus)
+            bus_id += 1
+    return buses
+
+def fork_fleet(buses):
+    """
+    Возвращает копию парка для запуска другого алгоритма без глубокого копирования:
+    новые объекты Bus без назначенных водителей ссылаются на те же расписания маршрутов.
+    """
+    forked = []
+    for bus in buses:
+        copy_bus = Bus(bus_id=bus.bus_id, route=bus.route)
+        copy_bus.schedule = bus.schedule.fork()
+        forked.append(copy_bus)
+    return forked
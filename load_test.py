@@ -0,0 +1,106 @@
+"""
+Нагрузочный тест сервиса распределения водителей: пропускная способность и задержки (p50, p99).
+
+Примеры:
+    python load_test.py --requests 200 --concurrency 32
+    python load_test.py --host 127.0.0.1 --port 8765   # против запущенного schedule_service.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+from schedule_service import ScheduleService
+
+
+def make_request(request_id, engine, num_routes, buses_per_route):
+    return {"id": request_id, "engine": engine, "num_routes": num_routes,
+            "min_buses_per_route": buses_per_route, "seed": request_id}
+
+
+async def run_in_process(requests, concurrency, service_options):
+    """Запросы к ScheduleService в том же процессе."""
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+    async with ScheduleService(**service_options) as service:
+        async def one(request):
+            async with limit:
+                start = time.perf_counter()
+                result = await service.submit(request)
+                latencies.append(time.perf_counter() - start)
+                return result
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(request) for request in requests))
+        elapsed = time.perf_counter() - start
+        batches = service.stats["batches"]
+    return results, latencies, elapsed, batches
+
+
+async def run_over_tcp(requests, concurrency, host, port):
+    """Запросы к серверу schedule_service.serve по нескольким соединениям."""
+    latencies = []
+    results = []
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    async def connection():
+        reader, writer = await asyncio.open_connection(host, port)
+        while not queue.empty():
+            request = queue.get_nowait()
+            start = time.perf_counter()
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+            results.append(json.loads(await reader.readline()))
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    return results, latencies, time.perf_counter() - start, None
+
+
+def report(results, latencies, elapsed, batches):
+    errors = sum(1 for result in results if "error" in result)
+    latencies_ms = np.array(latencies) * 1000
+    print(f"Запросов: {len(results)}, ошибок: {errors}, время: {elapsed:.2f} сек")
+    print(f"Пропускная способность: {len(results) / elapsed:.1f} запросов/сек")
+    print(f"Задержка p50: {np.percentile(latencies_ms, 50):.1f} мс, p99: {np.percentile(latencies_ms, 99):.1f} мс, "
+          f"максимум: {latencies_ms.max():.1f} мс")
+    if batches:
+        print(f"Пакетов: {batches} (в среднем {len(results) / batches:.1f} запросов на пакет)")
+    return {"requests": len(results), "errors": errors, "throughput": len(results) / elapsed,
+            "p50_ms": float(np.percentile(latencies_ms, 50)), "p99_ms": float(np.percentile(latencies_ms, 99))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--engines", default="greedy,optimal,blocks", help="алгоритмы через запятую")
+    parser.add_argument("--num-routes", type=int, default=5)
+    parser.add_argument("--buses-per-route", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    parser.add_argument("--host", default=None, help="адрес запущенного сервиса; без него сервис запускается в процессе")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    requests = [make_request(i, random.choice(engines), args.num_routes, args.buses_per_route)
+                for i in range(args.requests)]
+    if args.host:
+        outcome = asyncio.run(run_over_tcp(requests, args.concurrency, args.host, args.port))
+    else:
+        options = {"workers": args.workers, "max_batch_size": args.batch_size, "batch_window": args.batch_window}
+        outcome = asyncio.run(run_in_process(requests, args.concurrency, options))
+    report(*outcome)
+
+
+if __name__ == "__main__":
+    main()
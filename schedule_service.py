@@ -0,0 +1,281 @@
+"""
+Асинхронный сервис распределения водителей для запросов диспетчеров.
+
+Запросы (описание маршрутов и парка) попадают в очередь, мелкие запросы объединяются
+в пакеты, пакеты решаются в пуле процессов вне цикла событий asyncio.
+Сервис можно использовать напрямую из asyncio (ScheduleService.submit) или по TCP:
+одна строка JSON на запрос, одна строка JSON на ответ (serve).
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import cursash
+
+# Запросы с числом автобусов не больше этого значения объединяются в пакеты
+SMALL_REQUEST_BUSES = 500
+
+
+def routes_from_definition(definitions):
+    """
+    Строит маршруты по описаниям:
+    [{"route_id": 1, "stops": ["Тверская", ...], "average_time_between_stops": 5,
+      "peak_variation": 2, "offpeak_variation": 5}, ...]
+    """
+    routes = []
+    for route_id, definition in enumerate(definitions, start=1):
+        routes.append(cursash.Route(
+            route_id=definition.get("route_id", route_id),
+            stops=[cursash.Stop(name=name) for name in definition["stops"]],
+            average_time_between_stops=definition.get("average_time_between_stops", 5),
+            peak_duration_variation=definition.get("peak_variation", 2),
+            offpeak_duration_variation=definition.get("offpeak_variation", 5),
+        ))
+    return routes
+
+
+# Целочисленные поля запроса и их допустимые границы: один запрос не должен надолго занимать очередь
+_INT_FIELDS = {"num_routes": (1, 1000), "min_buses_per_route": (1, 100), "population_size": (2, 500),
+               "generations": (0, 500)}
+# Наибольшее число автобусов в запросе; генетическому алгоритму - меньше, он оценивает популяцию поколениями
+MAX_REQUEST_BUSES = 20000
+MAX_GENETIC_BUSES = 2000
+# Числовые поля описания маршрута; генерация расписаний использует их в random.randint, поэтому только целые
+_ROUTE_INT_FIELDS = ("average_time_between_stops", "peak_variation", "offpeak_variation")
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_request(request):
+    """
+    Проверяет форму и типы запроса до постановки в очередь.
+    Возвращает текст ошибки или None, если запрос корректен.
+    """
+    if not isinstance(request, dict):
+        return "Запрос должен быть объектом JSON"
+    if not isinstance(request.get("engine", "greedy"), str):
+        return "engine должен быть строкой"
+    for field, (minimum, maximum) in _INT_FIELDS.items():
+        value = request.get(field, minimum)
+        if not _is_int(value) or not minimum <= value <= maximum:
+            return f"{field} должен быть целым числом от {minimum} до {maximum}"
+    seed = request.get("seed")
+    if seed is not None and not _is_int(seed):
+        return "seed должен быть целым числом"
+    if "routes" in request:
+        routes = request["routes"]
+        max_routes = _INT_FIELDS["num_routes"][1]
+        if not isinstance(routes, list) or not 1 <= len(routes) <= max_routes:
+            return f"routes должен быть списком от 1 до {max_routes} маршрутов"
+        for definition in routes:
+            if not isinstance(definition, dict):
+                return "Описание маршрута должно быть объектом JSON"
+            stops = definition.get("stops")
+            if not isinstance(stops, list) or len(stops) < 2 or not all(isinstance(name, str) for name in stops):
+                return "stops должен быть списком из не менее чем двух названий остановок"
+            for field in _ROUTE_INT_FIELDS:
+                value = definition.get(field, 0)
+                if not _is_int(value) or value < 0:
+                    return f"{field} должен быть неотрицательным целым числом"
+    limit = MAX_GENETIC_BUSES if request.get("engine") == "genetic" else MAX_REQUEST_BUSES
+    if request_size(request) > limit:
+        return f"Запрос содержит больше {limit} автобусов"
+    return None
+
+
+def request_size(request):
+    """Оценка числа автобусов в запросе для решения об объединении в пакет."""
+    num_routes = len(request["routes"]) if "routes" in request else request.get("num_routes", 20)
+    return num_routes * request.get("min_buses_per_route", 10)
+
+
+def solve_request(request):
+    """
+    Решает один запрос в текущем процессе и возвращает словарь с результатом.
+    request: {"engine": "greedy" | "optimal" | "blocks" | "genetic",
+              "routes": [...] или "num_routes": N, "min_buses_per_route": M, "seed": S,
+              "population_size": ..., "generations": ... (для genetic)}
+    """
+    start = time.perf_counter()
+    engine = request.get("engine", "greedy")
+    if engine not in cursash.BENCHMARK_ENGINES:
+        return {"id": request.get("id"), "error": f"Неизвестный алгоритм: {engine}"}
+    seed = request.get("seed")
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    if "routes" in request:
+        routes = routes_from_definition(request["routes"])
+    else:
+        routes = cursash.generate_random_routes(num_routes=request.get("num_routes", 20))
+    buses = cursash.manage_buses(routes, min_buses_per_route=request.get("min_buses_per_route", 10))
+    config = {"population_size": request.get("population_size", 50), "generations": request.get("generations", 50)}
+    drivers = cursash.BENCHMARK_ENGINES[engine](buses, config)
+    return {
+        "id": request.get("id"),
+        "engine": engine,
+        "buses": len(buses),
+        "drivers": len(drivers),
+        "assignment": {driver.driver_id: cursash.assigned_bus_ids(driver) for driver in drivers},
+        "solve_seconds": time.perf_counter() - start,
+    }
+
+
+def solve_batch(requests):
+    """Решает пакет запросов в одном процессе-воркере (одна передача данных на пакет)."""
+    results = []
+    for request in requests:
+        try:
+            results.append(solve_request(request))
+        except Exception as error:  # Ошибка одного запроса не должна ронять весь пакет
+            results.append({"id": request.get("id"), "error": repr(error)})
+    return results
+
+
+class ScheduleService:
+    """
+    Очередь запросов с пакетной обработкой в пуле процессов.
+    max_batch_size: максимум запросов в пакете; batch_window: сколько секунд ждать
+    дополнительные мелкие запросы после первого; workers: число процессов пула;
+    max_queue: ограничение очереди (submit ждёт, пока очередь заполнена).
+    """
+
+    def __init__(self, workers=None, max_batch_size=16, batch_window=0.005, max_queue=1000):
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.queue = None
+        self.executor = None
+        self.slots = None
+        self.dispatcher = None
+        self.inflight = set()
+        self.stats = {"requests": 0, "batches": 0}
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        workers = self.workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        # Не больше одного пакета на процесс пула одновременно: остальные копятся в очереди и объединяются
+        self.slots = asyncio.Semaphore(workers)
+        self.dispatcher = asyncio.create_task(self._dispatch())
+        return self
+
+    async def stop(self):
+        """Дожидается обработки очереди и завершает пул процессов."""
+        await self.queue.join()
+        self.dispatcher.cancel()
+        try:
+            await self.dispatcher
+        except asyncio.CancelledError:
+            pass
+        if self.inflight:
+            await asyncio.gather(*self.inflight)
+        self.executor.shutdown()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def submit(self, request):
+        """
+        Ставит запрос в очередь и возвращает результат solve_request, не блокируя цикл событий.
+        Некорректный запрос (validate_request) в очередь не попадает: сразу возвращается ошибка.
+        """
+        error = validate_request(request)
+        if error is not None:
+            return {"id": request.get("id") if isinstance(request, dict) else None, "error": error}
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future))
+        return await future
+
+    async def _next_batch(self):
+        request, future = await self.queue.get()
+        batch = [(request, future)]
+        if request_size(request) > SMALL_REQUEST_BUSES:
+            return batch
+        # Добираем мелкие запросы, пришедшие за batch_window
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            try:
+                item = self.queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self.queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            batch.append(item)
+            if request_size(item[0]) > SMALL_REQUEST_BUSES:
+                break
+        return batch
+
+    async def _dispatch(self):
+        while True:
+            await self.slots.acquire()
+            batch = await self._next_batch()
+            task = asyncio.create_task(self._run_batch(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, solve_batch, [request for request, _ in batch])
+        except Exception as error:
+            results = [{"id": request.get("id"), "error": repr(error)} for request, _ in batch]
+        finally:
+            self.slots.release()
+        self.stats["requests"] += len(batch)
+        self.stats["batches"] += 1
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+            self.queue.task_done()
+
+
+async def serve(host="127.0.0.1", port=8765, **service_options):
+    """
+    TCP-сервер: каждая строка - JSON-запрос, ответ - строка JSON с тем же "id".
+    Запросы одного соединения обрабатываются параллельно, ответы приходят по мере готовности.
+    """
+    service = await ScheduleService(**service_options).start()
+
+    async def handle(reader, writer):
+        lock = asyncio.Lock()
+
+        async def answer(line):
+            try:
+                result = await service.submit(json.loads(line))
+            except json.JSONDecodeError as error:
+                result = {"error": f"Некорректный JSON: {error}"}
+            async with lock:
+                writer.write((json.dumps(result, ensure_ascii=False) + "\n").encode())
+                await writer.drain()
+
+        tasks = set()
+        while line := await reader.readline():
+            task = asyncio.create_task(answer(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"Сервис распределения водителей: {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())